@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmarks for the collection, parsing and rendering hot paths.
+
+Each benchmark runs at several job counts (1k/10k/100k by default) on a
+reproducible synthetic workload. Collection goes through the real collector
+with recorded squeue/sacct/sstat output replayed by FakeSlurmRunner, and the
+UI benchmarks drive a headless Dashboard. Results are written as JSON so
+runs from different versions can be compared:
+
+    python benchmarks/run.py                       # writes benchmarks/results/<version>-<commit>.json
+    python benchmarks/run.py --sizes 1000 --only collect_history,efficiency
+    python benchmarks/run.py --compare benchmarks/results/0.1.0-abc1234.json
+
+Timings depend on the machine, so results stay out of version control:
+make a baseline on the same machine before comparing against it.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from slurmsmac.efficiency import with_active_efficiency, with_history_efficiency
+from slurmsmac.fake_slurm import FakeSlurmRunner
+from slurmsmac.parsing import USAGE_FIELDS, type_active_jobs, type_job_history
+from slurmsmac.rollups import HistoryRollups, summarize
+from slurmsmac.slurm_data import (
+    ACTIVE_COLUMNS, HISTORY_COLUMNS, BaseSlurmDataCollector, RealSlurmDataCollector, SlurmSnapshot,
+)
+from slurmsmac.synthetic import SyntheticCluster
+
+SIZES = [1_000, 10_000, 100_000]
+RESULTS_DIR = Path(__file__).parent / 'results'
+NOW = datetime(2025, 3, 3, 12, 0, 0)
+USERS = ['ann', 'bob', 'cat', 'dan']
+
+def _tile(frame: pd.DataFrame, size: int) -> pd.DataFrame:
+    """Repeat rows of a synthetic frame up to `size` rows with unique job ids."""
+    rows = frame.iloc[np.arange(size) % len(frame)].reset_index(drop=True)
+    rows['job_id'] = (np.arange(size) + 1_000_000).astype(str)
+    return rows
+
+def _parsable(frame: pd.DataFrame, columns: List[str]) -> str:
+    """Render a raw frame the way squeue/sacct print it with '|' separators."""
+    return frame[columns].to_csv(sep='|', header=False, index=False, quoting=csv.QUOTE_NONE)
+
+class Workload:
+    """Raw command output and typed frames for one job count."""
+    def __init__(self, size: int):
+        cluster = SyntheticCluster(USERS, jobs_per_day=20_000, seed=0, steps=False, clock=lambda: NOW)
+        self.size = size
+        self.raw_active = _tile(cluster.active_jobs(), size)
+        self.raw_history = _tile(cluster.job_history(days=1), size)
+        running = self.raw_active[self.raw_active['state'] == 'RUNNING']
+        self.squeue = _parsable(self.raw_active, ACTIVE_COLUMNS)
+        steps = running.assign(job_id=running['job_id'] + '.batch', max_rss=running['used_memory'])
+        self.sstat = _parsable(steps, ['job_id', 'max_rss', *USAGE_FIELDS])
+        self.sacct = _parsable(self.raw_history, HISTORY_COLUMNS)
+        self.active = with_active_efficiency(type_active_jobs(self.raw_active))
+        self.history = with_history_efficiency(type_job_history(self.raw_history))
+
+    def collector(self) -> RealSlurmDataCollector:
+        runner = FakeSlurmRunner(recordings={'squeue': self.squeue, 'sstat': self.sstat, 'sacct': self.sacct})
+        return RealSlurmDataCollector(use_store=False, users=USERS, runner=runner)
+
+    def snapshot(self) -> SlurmSnapshot:
+        return SlurmSnapshot(active=self.active, history=self.history, days=7,
+                             stats=BaseSlurmDataCollector.compute_stats(self.active, self.history))
+
+def _measure(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> List[float]:
+    """Wall time of `repeat` calls; `setup` runs untimed before each one."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return times
+
+def data_benchmarks(workload: Workload, repeat: int) -> Dict[str, List[float]]:
+    """Collection, parsing and efficiency benchmarks."""
+    collector = workload.collector()
+    rollups = HistoryRollups()
+    rollups.update(workload.history, NOW - timedelta(days=7), NOW)
+    return {
+        'collect_active': _measure(collector.get_active_jobs, repeat),
+        'collect_history': _measure(lambda: collector.get_job_history(days=7), repeat),
+        'clean_string': _measure(lambda: collector._clean_string(workload.sacct), repeat),
+        'efficiency': _measure(lambda: with_history_efficiency(workload.history), repeat),
+        'history_rollups': _measure(lambda: _refold(rollups, workload.history), repeat),
+    }
+
+def _refold(rollups: HistoryRollups, history: pd.DataFrame) -> None:
+    """A history refresh with no new jobs: fold the rows in again and summarize the window."""
+    since = NOW - timedelta(days=7)
+    rollups.update(history, since, NOW)
+    summarize(rollups.window(since, history))
+
+async def _ui_benchmarks(workload: Workload, repeat: int) -> Dict[str, List[float]]:
+    from textual.widgets import DataTable
+    from slurmsmac.main import Dashboard
+
+    app = Dashboard(users=USERS)
+    async with app.run_test(size=(200, 60)):
+        await app.workers.wait_for_complete()
+        # Keep background refreshes from replacing the benchmark data
+        for source in app.scheduler.sources:
+            app.scheduler.set_paused(source, True)
+        app.snapshot = workload.snapshot()
+        active_table = app.query_one('#active-jobs-table', DataTable)
+        history_table = app.query_one('#history-table', DataTable)
+        return {
+            # Tables are cleared first so every run populates them from scratch
+            'update_active_jobs': _measure(app.update_active_jobs, repeat, active_table.clear),
+            'update_job_history': _measure(app.update_job_history, repeat, history_table.clear),
+            'update_status_plot': _measure(app.update_status_plot, repeat),
+        }
+
+def ui_benchmarks(workload: Workload, repeat: int) -> Dict[str, List[float]]:
+    """Table population and status panel rendering in a headless Dashboard."""
+    return asyncio.run(_ui_benchmarks(workload, repeat))
+
+SUITES = {
+    data_benchmarks: ['collect_active', 'collect_history', 'clean_string', 'efficiency', 'history_rollups'],
+    ui_benchmarks: ['update_active_jobs', 'update_job_history', 'update_status_plot'],
+}
+BENCHMARKS = [name for names in SUITES.values() for name in names]
+
+def run_suite(sizes: List[int] = SIZES, repeat: int = 5, only: Optional[List[str]] = None,
+              progress: Callable[[str], None] = lambda line: None) -> List[Dict]:
+    """Run the benchmarks and return one result record per (benchmark, size)."""
+    results = []
+    for size in sizes:
+        workload = Workload(size)
+        for suite, names in SUITES.items():
+            if only and not set(names) & set(only):
+                continue
+            for name, times in suite(workload, repeat).items():
+                if only and name not in only:
+                    continue
+                median = statistics.median(times)
+                results.append({
+                    'name': name,
+                    'size': size,
+                    'repeat': repeat,
+                    'min': min(times),
+                    'median': median,
+                    'mean': statistics.fmean(times),
+                    'max': max(times),
+                    'jobs_per_second': size / median if median > 0 else None,
+                })
+                progress(f'{name:<20} {size:>8,} jobs  {median * 1000:10.2f} ms')
+    return results
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+def metadata() -> Dict:
+    """Version and machine details stored alongside the results."""
+    try:
+        package_version = version('slurmsmac')
+    except PackageNotFoundError:
+        package_version = None
+    return {
+        'version': package_version,
+        'commit': _commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Report median changes against a baseline run; returns the regressed benchmarks."""
+    previous = {(r['name'], r['size']): r for r in baseline['results']}
+    regressions = []
+    print(f"\nCompared with {baseline['metadata'].get('version')} ({baseline['metadata'].get('commit')}):")
+    for result in results:
+        before = previous.get((result['name'], result['size']))
+        if before is None:
+            continue
+        ratio = result['median'] / before['median'] if before['median'] > 0 else float('inf')
+        flag = ''
+        if ratio > threshold:
+            flag = '  REGRESSION'
+            regressions.append(f"{result['name']}@{result['size']}")
+        print(f"  {result['name']:<20} {result['size']:>8,} jobs  {ratio:6.2f}x{flag}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                        help='comma-separated job counts (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per benchmark (default: %(default)s)')
+    parser.add_argument('--only', help=f'comma-separated subset of: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--output', type=Path, help='results file (default: benchmarks/results/<version>-<commit>.json)')
+    parser.add_argument('--compare', type=Path, metavar='BASELINE', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio reported as a regression (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    # Read before the run, which may write to the same file
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    sizes = [int(size) for size in args.sizes.split(',')]
+    only = args.only.split(',') if args.only else None
+    results = run_suite(sizes, args.repeat, only, progress=print)
+    report = {'metadata': metadata(), 'results': results}
+
+    output = args.output
+    if output is None:
+        meta = report['metadata']
+        build = meta['commit'] or datetime.now().strftime('%Y%m%d%H%M%S')
+        output = RESULTS_DIR / f"{meta['version'] or 'dev'}-{build}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + '\n')
+    print(f'\nResults written to {output}')
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
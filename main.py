@@ -2,6 +2,7 @@
 """
 SlurmSMAc - Slurm Monitoring Application
 This is a wrapper script to run the application from the root directory.
+It takes the same options as the `slurmsmac` command.
 """
 import sys
 import os
@@ -9,8 +10,7 @@ import os
 # Add the src directory to the python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "src")))
 
-from slurmsmac.main import Dashboard
+from slurmsmac import main
 
 if __name__ == "__main__":
-    app = Dashboard()
-    app.run()
+    sys.exit(main())
@@ -1,12 +1,134 @@
 # -*- coding: utf-8 -*-
 """SlurmSMAc - Slurm Monitoring Application."""
 
+import argparse
 import os
 import sys
-from .main import Dashboard
 
-def main():
+def __getattr__(name):
+    # The dashboard pulls in Textual, so it is only imported when asked for
+    if name == "Dashboard":
+        from .main import Dashboard
+        return Dashboard
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _comma_list(value: str) -> list:
+    """Split a comma-separated option value."""
+    return [item for item in value.split(",") if item]
+
+def _cluster_list(value: str) -> list:
+    """Split 'NAME[:SECONDS],...' into (name, timeout or None) pairs."""
+    clusters = []
+    for item in _comma_list(value):
+        name, _, timeout = item.partition(":")
+        try:
+            clusters.append((name, float(timeout) if timeout else None))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid timeout for cluster {name!r}: {timeout!r}")
+    return clusters
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(prog="slurmsmac", description="Monitor Slurm jobs in the terminal.")
+    parser.add_argument("--active-interval", type=float, default=30, metavar="SECONDS",
+                        help="how often to poll squeue/sstat for active jobs (default: 30)")
+    parser.add_argument("--history-interval", type=float, default=120, metavar="SECONDS",
+                        help="how often to poll sacct for job history (default: 120)")
+    parser.add_argument("--once", action="store_true",
+                        help="write one snapshot as JSON Lines to stdout and exit (shorthand for `export`)")
+    selection = parser.add_argument_group("multi-user monitoring",
+                                          "watch several users, accounts or partitions with batched queries")
+    selection.add_argument("-u", "--user", dest="users", action="extend", type=_comma_list, metavar="USER[,USER...]",
+                           help="users to monitor (default: yourself)")
+    selection.add_argument("-A", "--account", dest="accounts", action="extend", type=_comma_list,
+                           metavar="ACCOUNT[,ACCOUNT...]", help="accounts to monitor")
+    selection.add_argument("-p", "--partition", dest="partitions", action="extend", type=_comma_list,
+                           metavar="PARTITION[,PARTITION...]", help="partitions to monitor")
+    federation = parser.add_argument_group("multi-cluster monitoring",
+                                           "query several clusters at once and merge them into one view")
+    federation.add_argument("-M", "--clusters", action="extend", type=_cluster_list, metavar="CLUSTER[:SECONDS][,...]",
+                            help="clusters to monitor, each optionally with its own timeout")
+    federation.add_argument("--cluster-timeout", type=float, default=20, metavar="SECONDS",
+                            help="longest a refresh waits for a cluster without its own timeout (default: 20)")
+
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    serve = commands.add_parser("serve", help="run the shared collector daemon",
+                                description="Poll Slurm once per interval for every user with a dashboard "
+                                            "open and publish snapshots to a shared cache directory.")
+    serve.add_argument("--interval", type=float, default=30, metavar="SECONDS",
+                       help="polling interval (default: 30)")
+    serve.add_argument("--history-days", type=int, default=7, metavar="DAYS",
+                       help="history window published to dashboards (default: 7)")
+    serve.add_argument("--shared-dir", metavar="PATH",
+                       help="shared cache directory, owned by the daemon's user (default: $SLURMSMAC_SHARED_DIR)")
+    export = commands.add_parser("export", help="write one snapshot as JSON Lines, CSV or Parquet",
+                                 description="Collect active jobs and history once, without the dashboard, "
+                                             "and write them with their efficiencies to stdout or files.")
+    export.add_argument("sources", nargs="*", choices=["active", "history", "steps", "stats"], metavar="SOURCE",
+                        help="what to write: active, history, steps, stats (default: active history stats)")
+    export.add_argument("-f", "--format", choices=["jsonl", "csv", "parquet"],
+                        help="output format (default: from the --output suffix, else jsonl)")
+    export.add_argument("-o", "--output", default="-", metavar="PATH",
+                        help="file, or directory for one file per source (default: stdout)")
+    export.add_argument("--history-days", type=int, default=7, metavar="DAYS",
+                        help="history window (default: 7)")
+    export.add_argument("--chunk-rows", type=int, default=50000, metavar="ROWS",
+                        help="rows encoded and written at a time (default: 50000)")
+    return parser
+
+def export(args) -> int:
+    """Export one snapshot; returns the exit status (1 if a Slurm query failed)."""
+    from .export import export_once
+    from .slurm_data import get_slurm_collector
+    collector = get_slurm_collector(users=args.users, accounts=args.accounts, partitions=args.partitions,
+                                    clusters=_cluster_timeouts(args))
+    try:
+        snapshot = export_once(collector, days=args.history_days, sources=args.sources, fmt=args.format,
+                               output=args.output, rows=args.chunk_rows)
+    except BrokenPipeError:
+        # Reader went away (e.g. `| head`); keep the interpreter from failing to flush stdout on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    for source, error in snapshot.errors.items():
+        print(f"slurmsmac: {source} query failed: {error}", file=sys.stderr)
+    return 1 if snapshot.errors else 0
+
+def _cluster_timeouts(args):
+    """Map each -M cluster to its timeout, or None without -M."""
+    if not args.clusters:
+        return None
+    return {name: args.cluster_timeout if timeout is None else timeout for name, timeout in args.clusters}
+
+def serve(args) -> None:
+    """Run the shared collector daemon until interrupted."""
+    from .daemon import SnapshotDaemon
+    daemon = SnapshotDaemon(directory=args.shared_dir, interval=args.interval, history_days=args.history_days)
+    print(f"Publishing snapshots to {daemon.directory} every {daemon.interval:g}s", flush=True)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
     """Run the SlurmSMAc dashboard."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.once and args.command is None:
+        args = parser.parse_args([*(sys.argv[1:] if argv is None else argv), "export"])
+    elif args.once and args.command != "export":
+        parser.error(f"--once cannot be combined with {args.command}")
+    if args.command == "serve":
+        try:
+            serve(args)
+        except (ValueError, PermissionError) as e:
+            parser.error(str(e))
+        return
+    if args.command == "export":
+        try:
+            sys.exit(export(args))
+        except ValueError as e:
+            parser.error(str(e))
+
     # Set terminal encoding and type
     if sys.platform != "win32":  # Only set for non-Windows platforms
         # Reconfigure stdin to handle decoding errors gracefully
@@ -31,7 +153,10 @@ def main():
         # This prevents crashes from non-UTF-8 bytes in mouse escape sequences
         os.environ["TEXTUAL_MOUSE"] = "0"
 
-    app = Dashboard()
+    from .main import Dashboard
+    app = Dashboard(active_interval=args.active_interval, history_interval=args.history_interval,
+                    users=args.users, accounts=args.accounts, partitions=args.partitions,
+                    clusters=_cluster_timeouts(args))
     app.run(mouse=False)  # Explicitly disable mouse support
 
 if __name__ == "__main__":
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""Headless collector daemon with a shared snapshot cache.
+
+`slurmsmac serve` polls Slurm once per interval for every user that has a
+dashboard open, using one batched squeue call, and publishes one snapshot
+file per user in a shared directory. History is kept per user, each with
+its own collector and job store, so a user joining or leaving does not
+make the others' history refetch: each poll only asks sacct for the jobs
+of each user that changed since the last one. Dashboards register interest
+by touching a file and read their snapshot instead of running their own
+squeue/sacct pipeline, so 40 open dashboards cost slurmctld/slurmdbd the
+same as one.
+
+Layout of the shared directory:
+    daemon.json          heartbeat: pid, interval, history window, last poll
+    interest/<user>      touched by clients; mtime marks the user as active
+    snapshots/<user>.json  latest snapshot for that user
+
+The directory has no default and is never under a path other users could
+create first: it is set with `serve --shared-dir` or SLURMSMAC_SHARED_DIR.
+Clients only trust it (and its heartbeat) when it is a real directory
+owned by root, themselves or SLURMSMAC_SHARED_OWNER (the daemon's user)
+and writable by its owner alone. Interest files count only when owned by
+the user they name, and each snapshot is a 0600 file owned by its user, so
+nobody can read another user's jobs through the daemon.
+"""
+import json
+import os
+import pwd
+import re
+import signal
+import stat
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+import pandas as pd
+from .job_steps import PARENT_COLUMN
+from .serialization import encode_frame, decode_frame
+from .slurm_data import BaseSlurmDataCollector, Progress, RealSlurmDataCollector, SlurmSnapshot, SOURCES
+
+# Users whose dashboards have not checked in for this long are no longer polled
+INTEREST_TTL = 600
+# A heartbeat or snapshot older than this many intervals counts as stale
+STALE_INTERVALS = 3
+
+# Interest files are named after users; anything else is ignored
+_USERNAME_RE = re.compile(r'^[A-Za-z0-9._][A-Za-z0-9._-]*$')
+
+def shared_dir() -> Optional[Path]:
+    """Return the shared cache directory from SLURMSMAC_SHARED_DIR (None when not configured)."""
+    directory = os.environ.get('SLURMSMAC_SHARED_DIR')
+    return Path(directory) if directory else None
+
+def user_id(user: str) -> Optional[int]:
+    """uid of a user name, None if there is no such user."""
+    try:
+        return pwd.getpwnam(user).pw_uid
+    except KeyError:
+        return None
+
+def trusted_owners() -> Set[int]:
+    """uids a shared directory may belong to: root, the current user and SLURMSMAC_SHARED_OWNER."""
+    owners = {0, os.getuid()}
+    owner = os.environ.get('SLURMSMAC_SHARED_OWNER', '')
+    uid = int(owner) if owner.isdigit() else user_id(owner) if owner else None
+    if uid is not None:
+        owners.add(uid)
+    return owners
+
+def _is_trusted_dir(path: Path, owners: Set[int]) -> bool:
+    """Whether `path` is a directory, not a symlink, owned by one of `owners` and writable by its owner only."""
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISDIR(info.st_mode) and info.st_uid in owners and not info.st_mode & 0o022
+
+def _read_trusted(path: Path, owners: Set[int], private: bool = False) -> Optional[str]:
+    """Read a regular file owned by one of `owners` that only its owner may write (or, if `private`, read).
+
+    Returns None for anything else, including a symlink, so a file swapped in
+    by another user is never read.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError:
+        return None
+    with os.fdopen(fd, encoding='utf-8') as f:
+        info = os.fstat(fd)
+        if (not stat.S_ISREG(info.st_mode) or info.st_uid not in owners
+                or info.st_mode & (0o077 if private else 0o022)):
+            return None
+        try:
+            return f.read()
+        except (OSError, ValueError):
+            return None
+
+def _ensure_dir(path: Path, mode: int) -> None:
+    """Create a directory for the daemon, or check that an existing one belongs to it.
+
+    Only a directory created here is chmodded (mkdir applies the umask); an
+    existing one must already be owned by the daemon, not be a symlink and
+    have no more permissions than `mode`.
+    """
+    try:
+        os.mkdir(path, mode)
+        created = True
+    except FileExistsError:
+        created = False
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+    except OSError as e:
+        raise PermissionError(f"{path} is not a directory: {e}")
+    try:
+        if created:
+            os.fchmod(fd, mode)
+        info = os.fstat(fd)
+    finally:
+        os.close(fd)
+    if info.st_uid != os.geteuid() or stat.S_IMODE(info.st_mode) & ~mode & 0o7777:
+        raise PermissionError(f"{path} must be owned by uid {os.geteuid()} with at most mode {mode:o}, "
+                              f"not uid {info.st_uid} mode {stat.S_IMODE(info.st_mode):o}")
+
+def _write_atomic(path: Path, text: str, mode: int = 0o644, owner: Optional[int] = None) -> None:
+    """Write a file so readers never see a partial snapshot, owned by `owner` if given."""
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.unlink(missing_ok=True)
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            if owner is not None and owner != os.geteuid():
+                os.fchown(fd, owner, -1)
+            os.fchmod(fd, mode)
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+class SnapshotDaemon:
+    """Polls Slurm for all interested users and publishes per-user snapshots.
+
+    Publishing for other users means making their snapshot files theirs,
+    which needs root; without it only the daemon's own user is served.
+    `user_ids` maps user names to uids (default: the passwd database).
+    """
+    def __init__(self, directory: Optional[Path] = None, interval: float = 30, history_days: int = 7,
+                 collector_factory: Callable[[List[str]], BaseSlurmDataCollector] = None,
+                 user_ids: Callable[[str], Optional[int]] = user_id):
+        directory = Path(directory) if directory is not None else shared_dir()
+        if directory is None:
+            raise ValueError("no shared directory: pass --shared-dir or set SLURMSMAC_SHARED_DIR")
+        self.directory = directory
+        self.interval = interval
+        self.history_days = history_days
+        self.collector_factory = collector_factory or (lambda users: RealSlurmDataCollector(users=users))
+        self.user_ids = user_ids
+        # Batched active-jobs collector for the current users, and a history collector per user
+        self._active = None
+        self._active_users: List[str] = []
+        self._history: Dict[str, BaseSlurmDataCollector] = {}
+        self._running = False
+
+        _ensure_dir(self.directory, 0o755)
+        _ensure_dir(self.directory / 'snapshots', 0o755)
+        # Everyone may register interest, like /tmp; only the daemon writes snapshots
+        _ensure_dir(self.directory / 'interest', 0o1777)
+
+    def interested_users(self) -> List[str]:
+        """Users whose dashboards checked in recently."""
+        cutoff = time.time() - INTEREST_TTL
+        users = []
+        for entry in (self.directory / 'interest').iterdir():
+            if not _USERNAME_RE.match(entry.name):
+                continue
+            try:
+                info = entry.lstat()
+            except OSError:
+                continue
+            # Users can only register themselves: the file must be theirs
+            if (stat.S_ISREG(info.st_mode) and info.st_uid == self.user_ids(entry.name)
+                    and info.st_mtime >= cutoff):
+                users.append(entry.name)
+        return sorted(users)
+
+    def _active_collector(self, users: List[str]) -> BaseSlurmDataCollector:
+        # squeue has nothing to sync, so only this collector follows changes in the user set
+        if self._active is None or users != self._active_users:
+            self._active = self.collector_factory(users)
+            self._active_users = users
+        return self._active
+
+    def _history_collector(self, user: str) -> BaseSlurmDataCollector:
+        # Kept while the user stays interested, so its job store and rollups stay incremental
+        if user not in self._history:
+            self._history[user] = self.collector_factory([user])
+        return self._history[user]
+
+    def poll_once(self) -> Dict[str, int]:
+        """Run one batched squeue and each user's history sync, and publish a snapshot per user.
+
+        Returns the number of active jobs published per user.
+        """
+        users = self.interested_users()
+        for user in set(self._history) - set(users):
+            del self._history[user]
+        published = {}
+        if users:
+            current = self._active_collector(users).get_snapshot(days=self.history_days, sources=['active'])
+            for user in users:
+                snapshot = self._history_collector(user).get_snapshot(days=self.history_days, sources=['history'])
+                snapshot.errors.update(current.errors)
+                active = current.active[current.active['user'] == user] if 'user' in current.active else current.active
+                # Steps are published with their jobs; readers fold them in again
+                history = pd.concat([snapshot.history, snapshot.steps.drop(columns=[PARENT_COLUMN], errors='ignore')])
+                try:
+                    self.publish(user, active, history, snapshot)
+                except PermissionError as e:
+                    print(f"{datetime.now():%H:%M:%S} cannot publish for {user}: {e}", flush=True)
+                    continue
+                published[user] = len(active)
+        self.write_heartbeat()
+        return published
+
+    def publish(self, user: str, active: pd.DataFrame, history: pd.DataFrame, snapshot: SlurmSnapshot) -> None:
+        """Write one user's snapshot file, readable by that user alone."""
+        payload = {
+            'user': user,
+            'collected_at': snapshot.collected_at.isoformat(),
+            'days': snapshot.days,
+            'errors': snapshot.errors,
+            'active': encode_frame(active.reset_index(drop=True)),
+            'history': encode_frame(history.reset_index(drop=True)),
+        }
+        _write_atomic(self.directory / 'snapshots' / f'{user}.json', json.dumps(payload),
+                      mode=0o600, owner=self.user_ids(user))
+
+    def write_heartbeat(self) -> None:
+        """Record that the daemon is alive and how often it polls."""
+        heartbeat = {
+            'pid': os.getpid(),
+            'interval': self.interval,
+            'history_days': self.history_days,
+            'updated_at': time.time(),
+        }
+        _write_atomic(self.directory / 'daemon.json', json.dumps(heartbeat))
+
+    def run(self) -> None:
+        """Poll until interrupted."""
+        self._running = True
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        while self._running:
+            started = time.monotonic()
+            try:
+                published = self.poll_once()
+                print(f"{datetime.now():%H:%M:%S} published {len(published)} snapshot(s) "
+                      f"in {time.monotonic() - started:.1f}s", flush=True)
+            except Exception as e:
+                print(f"{datetime.now():%H:%M:%S} poll failed: {e}", flush=True)
+            # Sleep in short steps so stop() takes effect promptly
+            while self._running and time.monotonic() - started < self.interval:
+                time.sleep(min(1.0, self.interval))
+
+    def stop(self) -> None:
+        """Stop the polling loop."""
+        self._running = False
+
+def read_heartbeat(directory: Optional[Path] = None) -> Optional[Dict]:
+    """Return the daemon heartbeat if a daemon is alive in a trusted directory, else None."""
+    directory = Path(directory) if directory is not None else shared_dir()
+    owners = trusted_owners()
+    if directory is None or not all(_is_trusted_dir(path, owners) for path in (directory, directory / 'snapshots')):
+        return None
+    text = _read_trusted(directory / 'daemon.json', owners)
+    try:
+        heartbeat = json.loads(text) if text is not None else None
+    except ValueError:
+        return None
+    if not isinstance(heartbeat, dict):
+        return None
+    if time.time() - heartbeat.get('updated_at', 0) > STALE_INTERVALS * heartbeat.get('interval', 30):
+        return None
+    return heartbeat
+
+class SharedSnapshotCollector(BaseSlurmDataCollector):
+    """Reads snapshots published by `slurmsmac serve`, falling back to direct collection.
+
+    Whenever the daemon's snapshot for this user is missing or stale (daemon
+    stopped, first check-in not yet served, or a wider history window than
+    the daemon keeps), the wrapped fallback collector queries Slurm directly.
+    """
+    def __init__(self, fallback: BaseSlurmDataCollector, user: str, directory: Path):
+        super().__init__()
+        self.fallback = fallback
+        self.user = user
+        self.directory = Path(directory)
+        self.register_interest()
+
+    def register_interest(self) -> None:
+        """Ask the daemon to keep polling this user."""
+        try:
+            # Not through a symlink someone else left under our name
+            fd = os.open(self.directory / 'interest' / self.user, os.O_WRONLY | os.O_CREAT | os.O_NOFOLLOW, 0o644)
+        except OSError:
+            return
+        try:
+            os.utime(fd)
+        finally:
+            os.close(fd)
+
+    def _read_snapshot(self) -> Optional[Dict]:
+        self.register_interest()
+        heartbeat = read_heartbeat(self.directory)
+        if heartbeat is None:
+            return None
+        # Only a snapshot made ours by the daemon, which nobody else can read
+        text = _read_trusted(self.directory / 'snapshots' / f'{self.user}.json', {os.getuid()}, private=True)
+        try:
+            payload = json.loads(text) if text is not None else None
+        except ValueError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+        age = (datetime.now() - datetime.fromisoformat(payload['collected_at'])).total_seconds()
+        if age > STALE_INTERVALS * heartbeat['interval']:
+            return None
+        return payload
+
+    def get_active_jobs(self) -> pd.DataFrame:
+        payload = self._read_snapshot()
+        if payload is None:
+            return self.fallback.get_active_jobs()
+        return decode_frame(payload['active'])
+
+    def get_job_history(self, days: int = 7, progress: Optional[Progress] = None) -> pd.DataFrame:
+        payload = self._read_snapshot()
+        if payload is None or days > payload['days']:
+            return self.fallback.get_job_history(days=days, progress=progress)
+        history = decode_frame(payload['history'])
+        if days < payload['days'] and not history.empty:
+            cutoff = pd.Timestamp.now() - pd.Timedelta(days=days)
+            history = history[history['end'].isna() | (history['end'] >= cutoff)]
+        return history.reset_index(drop=True)
+
+    def get_snapshot(self, days: int = 7, sources=SOURCES, previous: Optional[SlurmSnapshot] = None,
+                     progress: Optional[Progress] = None) -> SlurmSnapshot:
+        for source in sources:
+            self.fallback.source_errors.pop(source, None)
+        snapshot = super().get_snapshot(days=days, sources=sources, previous=previous, progress=progress)
+        # Surface direct-collection failures from the fallback too
+        snapshot.errors.update({s: e for s, e in self.fallback.source_errors.items() if s in sources})
+        return snapshot
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Vectorized job efficiency calculations.
+
+All functions work on whole typed frames (see parsing.py) with column
+operations, so a 100k-row history is handled in milliseconds.
+"""
+import numpy as np
+import pandas as pd
+
+GIB = 1024 ** 3
+
+# Columns added by with_history_efficiency / with_active_efficiency
+HISTORY_EFFICIENCY_COLUMNS = ['mem_eff', 'cpu_eff', 'wasted_core_hours', 'wasted_gb_hours']
+ACTIVE_EFFICIENCY_COLUMNS = ['mem_eff', 'live_cpu_eff', 'idle']
+
+# Running jobs using less than this share of their allocated CPUs are flagged idle
+IDLE_CPU_EFF = 0.05
+
+def requested_memory(jobs: pd.DataFrame) -> pd.Series:
+    """Total requested memory in bytes, resolving per-node ('n') and per-CPU ('c') ReqMem."""
+    req_mem = jobs['req_mem'].astype(float)
+    if 'req_mem_per' not in jobs:
+        return req_mem
+    per = jobs['req_mem_per']
+    nnodes = jobs['nnodes'] if 'nnodes' in jobs else pd.Series(1, index=jobs.index)
+    factor = np.where(per == 'c', jobs['ncpus'], np.where(per == 'n', nnodes.clip(lower=1), 1))
+    return req_mem * factor
+
+def _ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """Elementwise ratio that is NaN wherever the denominator is not positive."""
+    return numerator / denominator.where(denominator > 0)
+
+def history_efficiency(jobs: pd.DataFrame) -> pd.DataFrame:
+    """Compute memory/CPU efficiency and waste for finished or running sacct rows.
+
+    Returns a frame aligned with `jobs` holding mem_eff and cpu_eff (0-1
+    ratios, NaN when unknown), wasted_core_hours and wasted_gb_hours.
+    """
+    req_total = requested_memory(jobs)
+    elapsed_s = jobs['elapsed'].dt.total_seconds()
+    cpu_s = jobs['total_cpu'].dt.total_seconds()
+    core_s = elapsed_s * jobs['ncpus']
+
+    result = pd.DataFrame(index=jobs.index)
+    result['mem_eff'] = _ratio(jobs['max_rss'], req_total)
+    # CPU efficiency = TotalCPU / (Elapsed x NCPUS)
+    result['cpu_eff'] = _ratio(cpu_s, core_s)
+    result['wasted_core_hours'] = (core_s - cpu_s).clip(lower=0).fillna(0) / 3600
+    unused_bytes = (req_total - jobs['max_rss']).clip(lower=0)
+    result['wasted_gb_hours'] = (unused_bytes / GIB * elapsed_s / 3600).fillna(0)
+    return result
+
+def active_efficiency(jobs: pd.DataFrame) -> pd.DataFrame:
+    """Compute live efficiency for squeue rows with sstat usage.
+
+    mem_eff is used / requested memory. live_cpu_eff is the CPU rate
+    between the last two sstat samples (cpu_rate, CPU seconds per second)
+    per allocated CPU, and `idle` flags running jobs below IDLE_CPU_EFF.
+    """
+    running = jobs['state'] == 'RUNNING'
+    rate = jobs['cpu_rate'] if 'cpu_rate' in jobs else pd.Series(np.nan, index=jobs.index)
+    result = pd.DataFrame(index=jobs.index)
+    result['mem_eff'] = _ratio(jobs['used_memory'], jobs['memory']).where(running)
+    result['live_cpu_eff'] = _ratio(rate, jobs['cpus']).where(running)
+    result['idle'] = result['live_cpu_eff'] < IDLE_CPU_EFF
+    return result
+
+def with_history_efficiency(jobs: pd.DataFrame) -> pd.DataFrame:
+    """Return the history frame with efficiency columns added (or recomputed)."""
+    jobs = jobs.drop(columns=HISTORY_EFFICIENCY_COLUMNS, errors='ignore')
+    if jobs.empty:
+        return jobs.assign(mem_eff=pd.Series(dtype=float), cpu_eff=pd.Series(dtype=float),
+                           wasted_core_hours=pd.Series(dtype=float), wasted_gb_hours=pd.Series(dtype=float))
+    return pd.concat([jobs, history_efficiency(jobs)], axis=1)
+
+def with_active_efficiency(jobs: pd.DataFrame) -> pd.DataFrame:
+    """Return the active jobs frame with efficiency columns added (or recomputed)."""
+    jobs = jobs.drop(columns=ACTIVE_EFFICIENCY_COLUMNS, errors='ignore')
+    if jobs.empty:
+        return jobs.assign(mem_eff=pd.Series(dtype=float), live_cpu_eff=pd.Series(dtype=float),
+                           idle=pd.Series(dtype=bool))
+    return pd.concat([jobs, active_efficiency(jobs)], axis=1)
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""Headless export of collected jobs, for cron jobs and notebooks.
+
+`slurmsmac export` (or `slurmsmac --once`) runs one refresh through the
+collector pipeline the dashboard uses and writes the active jobs, the job
+history (one row per job, with efficiency columns), job steps and summary
+stats as JSON Lines, CSV or Parquet. The history is streamed: it is read
+from the job store or sacct's output a chunk of whole jobs at a time, and
+each chunk is written out and folded into the stats before the next is
+read, so memory use does not grow with the history window. Times are
+written as ISO 8601 and durations as seconds.
+"""
+import os
+import sys
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .rollups import KEY, aggregate, contributions, summarize
+from .slurm_data import BaseSlurmDataCollector, SlurmSnapshot
+
+FORMATS = {'jsonl': '.jsonl', 'csv': '.csv', 'parquet': '.parquet'}
+EXPORT_SOURCES = ('active', 'history', 'steps', 'stats')
+DEFAULT_SOURCES = ['active', 'history', 'stats']
+# Rows encoded at a time (and the Parquet row group size)
+CHUNK_ROWS = 50_000
+# Names the source of each row when several sources share one JSON Lines stream
+SOURCE_COLUMN = 'source'
+
+def stats_frame(snapshot: SlurmSnapshot) -> pd.DataFrame:
+    """The snapshot's scalar stats as one row, with when they were collected and the window in days."""
+    scalars = {key: value for key, value in snapshot.stats.items() if np.ndim(value) == 0}
+    return pd.DataFrame([{'collected_at': snapshot.collected_at, 'days': snapshot.days, **scalars}])
+
+def source_frame(snapshot: SlurmSnapshot, source: str) -> pd.DataFrame:
+    if source == 'stats':
+        return stats_frame(snapshot)
+    return getattr(snapshot, source)
+
+def plain_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    """Durations as seconds and categories as their labels, column types every format reads back the same.
+
+    Categories differ from chunk to chunk, their labels do not.
+    """
+    converted = {}
+    for column, dtype in frame.dtypes.items():
+        if pd.api.types.is_timedelta64_dtype(dtype):
+            converted[column] = frame[column].dt.total_seconds()
+        elif isinstance(dtype, pd.CategoricalDtype):
+            converted[column] = frame[column].astype(object)
+    return frame.assign(**converted) if converted else frame
+
+def chunks(frame: pd.DataFrame, rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Consecutive row slices with plain columns; an empty frame still yields one (empty) chunk."""
+    for start in range(0, max(len(frame), 1), rows):
+        yield plain_columns(frame.iloc[start:start + rows])
+
+def _pyarrow():
+    """pyarrow and pyarrow.parquet, an optional dependency."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export needs pyarrow: pip install 'slurmsmac[parquet]'")
+    return pa, pq
+
+class FrameWriter:
+    """Writes the frames of one source to a stream as they come, `rows` rows at a time.
+
+    JSON Lines rows are tagged with `source` if given. CSV gets one header
+    and Parquet one file with a row group per chunk, however many frames
+    are written; `close` finishes the file.
+    """
+    def __init__(self, stream: IO, fmt: str, rows: int = CHUNK_ROWS, source: Optional[str] = None):
+        self.stream = stream
+        self.fmt = fmt
+        self.rows = rows
+        self.source = source
+        self._header = True
+        self._parquet = None
+
+    def write(self, frame: pd.DataFrame) -> None:
+        for chunk in chunks(frame, self.rows):
+            if self.fmt == 'jsonl':
+                self._write_jsonl(chunk)
+            elif self.fmt == 'csv':
+                if chunk.empty and not self._header:
+                    continue
+                chunk.to_csv(self.stream, header=self._header, index=False, date_format='%Y-%m-%dT%H:%M:%S')
+                self._header = False
+            else:
+                self._write_parquet(chunk)
+
+    def _write_jsonl(self, chunk: pd.DataFrame) -> None:
+        if chunk.empty:
+            return
+        if self.source is not None:
+            chunk = chunk.assign(**{SOURCE_COLUMN: self.source})[[SOURCE_COLUMN, *chunk.columns]]
+        text = chunk.to_json(orient='records', lines=True, date_format='iso', date_unit='s')
+        self.stream.write(text if text.endswith('\n') else text + '\n')
+
+    def _write_parquet(self, chunk: pd.DataFrame) -> None:
+        pa, pq = _pyarrow()
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.stream, table.schema)
+        elif chunk.empty:
+            return
+        # Columns that are all missing in a chunk come out untyped
+        self._parquet.write_table(table.cast(self._parquet.schema))
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+
+def write_jsonl(frame: pd.DataFrame, stream: IO[str], rows: int = CHUNK_ROWS,
+                source: Optional[str] = None) -> None:
+    """Write one JSON object per row, tagged with `source` if given."""
+    FrameWriter(stream, 'jsonl', rows, source).write(frame)
+
+def write_csv(frame: pd.DataFrame, stream: IO[str], rows: int = CHUNK_ROWS) -> None:
+    """Write a header and then the rows."""
+    FrameWriter(stream, 'csv', rows).write(frame)
+
+def write_parquet(frame: pd.DataFrame, stream: IO[bytes], rows: int = CHUNK_ROWS) -> None:
+    """Write one row group per chunk (needs pyarrow)."""
+    writer = FrameWriter(stream, 'parquet', rows)
+    writer.write(frame)
+    writer.close()
+
+@contextmanager
+def _open_atomic(path: Path, binary: bool):
+    """Write to a temporary file next to `path` and move it into place once complete."""
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp, 'wb' if binary else 'w', **({} if binary else {'encoding': 'utf-8', 'newline': ''})) as f:
+            yield f
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+@contextmanager
+def _stdout(binary: bool):
+    stream = sys.stdout.buffer if binary else sys.stdout
+    yield stream
+    stream.flush()
+
+def plan_outputs(sources: List[str], fmt: Optional[str], output: Optional[str]) -> Tuple[str, Dict[str, Optional[Path]]]:
+    """Resolve the format and where each source goes (None for stdout).
+
+    `output` is stdout ('-' or None), a directory (existing, or ending in
+    '/') that gets one <source>.<ext> file per source, or a single file
+    whose suffix picks the format unless `fmt` is given. Only JSON Lines
+    can hold several sources in one stream.
+    """
+    target = None if output in (None, '-') else Path(output)
+    if target is not None and fmt is None:
+        fmt = next((name for name, suffix in FORMATS.items() if target.suffix == suffix), None)
+    fmt = fmt or 'jsonl'
+    if target is not None and (output.endswith(('/', os.sep)) or target.is_dir()):
+        return fmt, {source: target / f'{source}{FORMATS[fmt]}' for source in sources}
+    if len(sources) > 1 and fmt != 'jsonl':
+        raise ValueError(f"{fmt} holds one source per file: name a single source or give a directory as --output")
+    return fmt, {source: target for source in sources}
+
+@contextmanager
+def _writers(targets: Dict[str, Optional[Path]], fmt: str, rows: int) -> Iterator[Dict[str, FrameWriter]]:
+    """A FrameWriter per source, sharing one stream per target; files are moved into place on success."""
+    binary = fmt == 'parquet'
+    streams: Dict[Optional[Path], List[str]] = {}
+    for source, path in targets.items():
+        streams.setdefault(path, []).append(source)
+    writers = {}
+    with ExitStack() as stack:
+        for path, group in streams.items():
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+            stream = stack.enter_context(_open_atomic(path, binary) if path is not None else _stdout(binary))
+            for source in group:
+                # Rows of several sources in one stream are tagged with theirs
+                writers[source] = FrameWriter(stream, fmt, rows, source if len(group) > 1 else None)
+                # Finished before the stream is closed
+                stack.callback(writers[source].close)
+        yield writers
+
+def export_snapshot(snapshot: SlurmSnapshot, sources: Optional[List[str]] = None, fmt: Optional[str] = None,
+                    output: Optional[str] = None, rows: int = CHUNK_ROWS) -> Dict[str, Optional[Path]]:
+    """Write the snapshot's sources (default DEFAULT_SOURCES); returns where each one went."""
+    fmt, targets = plan_outputs(list(sources or DEFAULT_SOURCES), fmt, output)
+    with _writers(targets, fmt, rows) as writers:
+        for source, writer in writers.items():
+            writer.write(source_frame(snapshot, source))
+    return targets
+
+def _merge_buckets(buckets: Optional[pd.DataFrame], more: pd.DataFrame) -> pd.DataFrame:
+    if buckets is None:
+        return more
+    return pd.concat([buckets, more]).groupby(level=list(range(len(KEY))), sort=False).sum()
+
+def export_once(collector: BaseSlurmDataCollector, days: int = 7, sources: Optional[List[str]] = None,
+                fmt: Optional[str] = None, output: Optional[str] = None,
+                rows: int = CHUNK_ROWS) -> SlurmSnapshot:
+    """Collect what `sources` need and export it, streaming the history.
+
+    History comes from collector.iter_job_history a chunk of whole jobs at a
+    time; each chunk gets its efficiency columns, is written out and is
+    folded into the rollup buckets the stats are computed from, so memory
+    stays bounded by the chunk size. The returned snapshot holds the active
+    jobs and stats (not the history), and its errors tell which queries failed.
+    """
+    sources = list(sources or DEFAULT_SOURCES)
+    fmt, targets = plan_outputs(sources, fmt, output)
+    # Reject an unusable output before spending a sacct query on it
+    if fmt == 'parquet':
+        _pyarrow()
+    wanted = set(sources)
+    snapshot = collector.get_snapshot(days=days, sources=['active'] if wanted & {'active', 'stats'} else [])
+    with _writers(targets, fmt, rows) as writers:
+        if 'active' in writers:
+            writers['active'].write(snapshot.active)
+        buckets = None
+        if wanted & {'history', 'steps', 'stats'}:
+            collector.source_errors.pop('history', None)
+            history = collector.iter_job_history(days=days, rows=rows)
+            while True:
+                # Only a failing query counts as a history error; a failing write (e.g. a closed pipe) propagates
+                try:
+                    chunk = next(history, None)
+                except Exception as e:
+                    collector.source_errors['history'] = str(e)
+                    break
+                if chunk is None:
+                    break
+                jobs, steps = collector.history_frames(chunk)
+                if 'history' in writers:
+                    writers['history'].write(jobs)
+                if 'steps' in writers:
+                    writers['steps'].write(steps)
+                buckets = _merge_buckets(buckets, aggregate(contributions(jobs)))
+            if 'history' in collector.source_errors:
+                snapshot.errors['history'] = collector.source_errors['history']
+        if 'stats' in writers:
+            history_stats = summarize(buckets) if buckets is not None else None
+            snapshot.stats = collector.compute_stats(snapshot.active, snapshot.history, history_stats)
+            writers['stats'].write(stats_frame(snapshot))
+    return snapshot
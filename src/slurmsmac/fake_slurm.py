@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Stand-ins for squeue/sacct/sstat, for exercising the real collector offline.
+
+FakeSlurmRunner plugs into RealSlurmDataCollector in place of the subprocess
+runner. It answers each command with the pipe-separated text the real tool
+would print for the requested --format fields, rendered from a
+SyntheticCluster or replayed from recorded output, after a configurable
+artificial latency. The real parsing path, job store and refresh pipeline
+then run unchanged on a laptop.
+
+The module also works as a stand-in executable for scripts that shell out:
+
+    python -m slurmsmac.fake_slurm sacct --parsable2 --noheader --format=JobID,State -S 2025-01-01
+"""
+import getpass
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+import pandas as pd
+from .synthetic import SyntheticCluster
+from .slurm_data import CommandRunner, RealSlurmDataCollector, HISTORY_COLUMNS
+
+# squeue --format codes and sacct/sstat field names, mapped to synthetic columns
+SQUEUE_CODES = {
+    'i': 'job_id', 'j': 'name', 'T': 'state', 'M': 'time', 'N': 'nodes', 'C': 'cpus',
+    'm': 'memory', 'R': 'reason', 'u': 'user', 'a': 'account', 'P': 'partition',
+}
+SACCT_FIELDS = {
+    'JobID': 'job_id', 'JobName': 'name', 'State': 'state', 'Start': 'start', 'End': 'end',
+    'Elapsed': 'elapsed', 'MaxRSS': 'max_rss', 'MaxVMSize': 'max_vmsize', 'NCPUS': 'ncpus',
+    'NodeList': 'nodes', 'ReqMem': 'req_mem', 'TotalCPU': 'total_cpu', 'NNodes': 'nnodes',
+    'User': 'user', 'Account': 'account', 'Partition': 'partition',
+    'AveRSS': 'ave_rss', 'AveCPU': 'ave_cpu', 'NTasks': 'ntasks',
+    'MaxDiskRead': 'max_disk_read', 'MaxDiskWrite': 'max_disk_write',
+}
+
+def _options(args: Iterable[str]) -> Dict[str, str]:
+    """Collect '-x value', '--long=value' and bare flags from a command line."""
+    options, args = {}, list(args)
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.startswith('--') and '=' in arg:
+            key, value = arg.split('=', 1)
+            options[key] = value
+        elif arg.startswith('-') and len(arg) == 2 and i + 1 < len(args) and not args[i + 1].startswith('-'):
+            options[arg] = args[i + 1]
+            i += 1
+        else:
+            options[arg] = ''
+        i += 1
+    return options
+
+def _join(frame: pd.DataFrame, columns: List[Optional[str]]) -> str:
+    """Render rows as '|'-separated lines; unknown columns print empty."""
+    if frame.empty:
+        return ''
+    fields = [frame[c].astype(str) if c in frame else pd.Series('', index=frame.index) for c in columns]
+    lines = fields[0]
+    for field in fields[1:]:
+        lines = lines + '|' + field
+    return '\n'.join(lines) + '\n'
+
+class FakeSlurmRunner(CommandRunner):
+    """Answers Slurm commands from a synthetic cluster or recorded output.
+
+    `latency` is seconds per command, either one number or a per-program
+    dict; `jitter` adds up to that fraction at random. `recordings` maps a
+    program name to captured output (text or a file path) that is replayed
+    verbatim, and programs listed in `failing` exit with an error.
+    """
+    def __init__(self, cluster: Optional[SyntheticCluster] = None,
+                 latency: Union[float, Dict[str, float]] = 0.0, jitter: float = 0.0,
+                 recordings: Optional[Dict[str, Union[str, Path]]] = None,
+                 failing: Iterable[str] = ()):
+        self.cluster = cluster or SyntheticCluster([getpass.getuser()])
+        self.latency = latency
+        self.jitter = jitter
+        self.recordings = dict(recordings or {})
+        self.failing = set(failing)
+        self.calls: List[List[str]] = []
+
+    def _delay(self, program: str) -> float:
+        base = self.latency.get(program, 0.0) if isinstance(self.latency, dict) else self.latency
+        return base * (1 + random.uniform(0, self.jitter))
+
+    def _respond(self, cmd: List[str]) -> str:
+        program = os.path.basename(cmd[0])
+        self.calls.append(list(cmd))
+        handler = {'squeue': self.squeue, 'sacct': self.sacct, 'sstat': self.sstat}.get(program)
+        if handler is None and program not in self.recordings:
+            raise FileNotFoundError(2, 'No such file or directory', cmd[0])
+        if program in self.failing:
+            raise subprocess.CalledProcessError(1, cmd, output='', stderr=f'{program}: error: Slurm is unavailable')
+        if program in self.recordings:
+            recording = self.recordings[program]
+            return Path(recording).read_text() if isinstance(recording, Path) else recording
+        return handler(_options(cmd[1:]))
+
+    def run(self, cmd: List[str], timeout: Optional[float] = None) -> str:
+        delay = self._delay(os.path.basename(cmd[0]))
+        output = self._respond(cmd)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        time.sleep(delay)
+        return output
+
+    def stream(self, cmd: List[str], chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """Yield the output in chunks, spreading the latency across them."""
+        delay = self._delay(os.path.basename(cmd[0]))
+        output = self._respond(cmd).encode('latin-1', errors='replace')
+        chunks = range(0, len(output), chunk_size)
+        if not chunks:
+            time.sleep(delay)
+        for start in chunks:
+            time.sleep(delay / len(chunks))
+            yield output[start:start + chunk_size]
+
+    def _select(self, jobs: pd.DataFrame, options: Dict[str, str], partition_flag: str) -> pd.DataFrame:
+        mask = pd.Series(True, index=jobs.index)
+        if '-u' in options:
+            mask &= jobs['user'].isin(options['-u'].split(','))
+        elif '--allusers' not in options and '-a' not in options and partition_flag == '-r':
+            # sacct shows only the caller's jobs by default
+            mask &= jobs['user'] == getpass.getuser()
+        if '-A' in options:
+            mask &= jobs['account'].isin(options['-A'].split(','))
+        if partition_flag in options:
+            mask &= jobs['partition'].isin(options[partition_flag].split(','))
+        return jobs[mask]
+
+    def squeue(self, options: Dict[str, str]) -> str:
+        jobs = self._select(self.cluster.active_jobs(), options, '-p')
+        codes = options.get('--format', '%i|%j|%T|%M').split('|')
+        output = _join(jobs, [SQUEUE_CODES.get(code.lstrip('%').lstrip('.0123456789')) for code in codes])
+        if '-M' in options:
+            output = f"CLUSTER: {options['-M']}\n{output}"
+        return output
+
+    def sacct(self, options: Dict[str, str]) -> str:
+        now = self.cluster.clock()
+        days = 1.0
+        if '-S' in options:
+            days = (now - datetime.fromisoformat(options['-S'])).total_seconds() / 86400
+        jobs = self.cluster.job_history(days=max(days, 0), now=now)
+        if '-j' in options:
+            wanted = set(options['-j'].split(','))
+            allocation = jobs['job_id'].str.split('.').str[0]
+            jobs = jobs[allocation.isin(wanted) | allocation.str.split('_').str[0].isin(wanted)]
+        if '-E' in options:
+            # Jobs that started by the end of the range (roughly; sacct goes by eligibility)
+            jobs = jobs[pd.to_datetime(jobs['start'], errors='coerce') <= datetime.fromisoformat(options['-E'])]
+        jobs = self._select(jobs, options, '-r')
+        fields = options.get('--format', 'JobID,JobName,State').split(',')
+        return _join(jobs, [SACCT_FIELDS.get(field) for field in fields])
+
+    def sstat(self, options: Dict[str, str]) -> str:
+        active = self.cluster.active_jobs()
+        running = active[(active['state'] == 'RUNNING')
+                         & active['job_id'].isin(options.get('-j', '').split(','))]
+        steps = pd.concat([
+            running.assign(job_id=running['job_id'] + '.batch', max_rss=running['used_memory']),
+            running.assign(job_id=running['job_id'] + '.extern', max_rss='1024K', ave_rss='1024K',
+                           ave_cpu='00:00.000', ntasks='1', max_disk_read='0', max_disk_write='0'),
+        ]).sort_index(kind='stable')
+        fields = options.get('--format', 'JobID,MaxRSS').split(',')
+        return _join(steps, [SACCT_FIELDS.get(field) for field in fields])
+
+def fake_runner(users: Optional[List[str]] = None, accounts: Optional[List[str]] = None,
+                partitions: Optional[List[str]] = None, seed: Optional[int] = None,
+                first_job_id: int = 0) -> FakeSlurmRunner:
+    """FakeSlurmRunner configured from the environment.
+
+    The synthetic cluster holds the current user plus `users`, and the given
+    accounts and partitions.
+    SLURMSMAC_MOCK_JOBS/SEED/STEPS size it as in mock mode (`seed` overrides
+    the seed) and SLURMSMAC_FAKE_LATENCY sets the seconds each command takes.
+    Fake clusters merged into one view need distinct seeds; `first_job_id`
+    gives them disjoint job ids, as within a Slurm federation.
+    """
+    users = list(dict.fromkeys([getpass.getuser(), *(users or [])]))
+    jobs_per_week = float(os.environ.get('SLURMSMAC_MOCK_JOBS', 500 * len(users)))
+    cluster = SyntheticCluster(users, accounts, partitions, jobs_per_day=jobs_per_week / 7,
+                               seed=int(os.environ.get('SLURMSMAC_MOCK_SEED', 0)) if seed is None else seed,
+                               steps=os.environ.get('SLURMSMAC_MOCK_STEPS', '1') != '0', first_job_id=first_job_id)
+    return FakeSlurmRunner(cluster, latency=float(os.environ.get('SLURMSMAC_FAKE_LATENCY', 0.5)))
+
+def fake_collector(users: Optional[List[str]] = None, accounts: Optional[List[str]] = None,
+                   partitions: Optional[List[str]] = None, cluster: Optional[str] = None,
+                   seed: Optional[int] = None, first_job_id: int = 0) -> RealSlurmDataCollector:
+    """RealSlurmDataCollector wired to fake_runner().
+
+    The job store lives in its own file so fake jobs never mix with real ones.
+    A `cluster` name is passed to the fake commands with -M.
+    """
+    from .job_store import JobStore, default_cache_dir
+    store = None
+    if not os.environ.get('SLURMSMAC_NO_CACHE'):
+        store = JobStore(HISTORY_COLUMNS, path=default_cache_dir() / 'fake-jobs.sqlite')
+    return RealSlurmDataCollector(job_store=store, use_store=store is not None, users=users,
+                                  accounts=accounts, partitions=partitions, cluster=cluster,
+                                  runner=fake_runner(users, accounts, partitions, seed=seed, first_job_id=first_job_id))
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Print what the named Slurm command would, e.g. `fake_slurm squeue --format=%i|%T`."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print('usage: python -m slurmsmac.fake_slurm {squeue,sacct,sstat} [options]', file=sys.stderr)
+        return 2
+    runner = fake_runner()
+    runner.latency = 0.0
+    try:
+        sys.stdout.write(runner.run(argv))
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
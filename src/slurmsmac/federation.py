@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""One view over several Slurm clusters.
+
+A FederatedSlurmDataCollector holds a collector per cluster (a
+RealSlurmDataCollector asking that cluster with -M) and queries all of them
+at once, each on its own thread. A refresh waits for each cluster at most
+its own timeout, so one slow slurmctld or slurmdbd does not hold up the
+others: a cluster that fails or is still busy keeps its last good rows, and
+a fetch still running is picked up by a later refresh rather than started
+again. Rows are merged with a `cluster` column, and each cluster's latency
+and errors are kept in a ClusterHealth. Clusters hand out job ids
+independently, so merged rows are told apart by (cluster, job id); see
+job_steps.job_keys.
+"""
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+from copy import deepcopy
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from .job_steps import CLUSTER_COLUMN
+from .parsing import compact_jobs
+from .slurm_data import (
+    HISTORY_CHUNK_ROWS, SOURCES, BaseSlurmDataCollector, CommandRunner, MockSlurmDataCollector, Progress,
+    RealSlurmDataCollector, SlurmSnapshot,
+)
+
+# Seconds a refresh waits for a cluster that has no timeout of its own
+CLUSTER_TIMEOUT = 20
+
+@dataclass
+class ClusterHealth:
+    """How the latest queries of one cluster went, per source."""
+    name: str
+    # Seconds the last finished query took
+    latency: Dict[str, float] = field(default_factory=dict)
+    # Why the latest query failed or is late; cleared by the next good one
+    errors: Dict[str, str] = field(default_factory=dict)
+    # When the rows shown were collected
+    updated_at: Dict[str, datetime] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def describe(self) -> str:
+        """One-line status, e.g. 'hpc ✓ 0.4s' or 'gpu ✗ active: no answer within 20s (from 14:02:11)'."""
+        if self.ok:
+            latency = max(self.latency.values(), default=None)
+            return f"{self.name} ✓" + (f" {latency:.1f}s" if latency is not None else "")
+        parts = []
+        for source, error in self.errors.items():
+            updated = self.updated_at.get(source)
+            parts.append(f"{source}: {error}" + (f" (from {updated:%H:%M:%S})" if updated else ""))
+        return f"{self.name} ✗ " + "; ".join(parts)
+
+class FederatedSlurmDataCollector(BaseSlurmDataCollector):
+    """Merges the jobs of several clusters' collectors, tagged with a cluster column.
+
+    `timeouts` gives the seconds to wait per cluster (default `timeout`). A
+    source only counts as failed when every cluster failed; otherwise the
+    failing clusters show up in `health`. Job ids of different clusters may
+    be equal; the cluster column tells such rows apart.
+    """
+    def __init__(self, members: Dict[str, BaseSlurmDataCollector], timeouts: Optional[Dict[str, float]] = None,
+                 timeout: float = CLUSTER_TIMEOUT):
+        super().__init__()
+        self.members = dict(members)
+        self.timeouts = {name: (timeouts or {}).get(name, timeout) for name in self.members}
+        self.health = {name: ClusterHealth(name) for name in self.members}
+        # Last good rows and any unfinished query, per (source, cluster, history days)
+        self._frames: Dict[Tuple, pd.DataFrame] = {}
+        self._in_flight: Dict[Tuple, Future] = {}
+        # Guards health and serializes streamed history batches from the member threads
+        self._lock = threading.Lock()
+
+    @property
+    def clusters(self) -> List[str]:
+        return list(self.members)
+
+    @property
+    def is_multi_user(self) -> bool:
+        return any(member.is_multi_user for member in self.members.values())
+
+    def get_active_jobs(self) -> pd.DataFrame:
+        return self._gather('active', None, lambda member, name: member.get_active_jobs())
+
+    def get_job_history(self, days: int = 7, progress: Optional[Progress] = None) -> pd.DataFrame:
+        return self._gather('history', days, lambda member, name: member.get_job_history(
+            days=days, progress=self._tagged(progress, name)))
+
+    def iter_job_history(self, days: int = 7, rows: int = HISTORY_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Stream each cluster's history in turn, waiting for every cluster however long it takes.
+
+        There are no earlier rows to fall back on here, so any failing
+        cluster counts as a history error.
+        """
+        failures = {}
+        for name, member in self.members.items():
+            member.source_errors.pop('history', None)
+            try:
+                for chunk in member.iter_job_history(days=days, rows=rows):
+                    yield chunk.assign(**{CLUSTER_COLUMN: name})
+                if 'history' in member.source_errors:
+                    raise RuntimeError(member.source_errors['history'])
+            except Exception as e:
+                failures[name] = str(e)
+            with self._lock:
+                if name in failures:
+                    self.health[name].errors['history'] = failures[name]
+                else:
+                    self.health[name].errors.pop('history', None)
+                    self.health[name].updated_at['history'] = datetime.now()
+        if failures:
+            self.source_errors['history'] = '; '.join(f'{name}: {error}' for name, error in failures.items())
+
+    def get_snapshot(self, days: int = 7, sources=SOURCES, previous: Optional[SlurmSnapshot] = None,
+                     progress: Optional[Progress] = None) -> SlurmSnapshot:
+        snapshot = super().get_snapshot(days=days, sources=sources, previous=previous, progress=progress)
+        with self._lock:
+            snapshot.cluster_health = deepcopy(self.health)
+        return snapshot
+
+    def _tagged(self, progress: Optional[Progress], name: str) -> Optional[Progress]:
+        """Pass a cluster's streamed history batches on with its cluster column, one at a time."""
+        if progress is None:
+            return None
+
+        def report(batch: pd.DataFrame) -> None:
+            with self._lock:
+                progress(batch.assign(**{CLUSTER_COLUMN: name}))
+        return report
+
+    def _gather(self, source: str, days: Optional[int],
+                fetch: Callable[[BaseSlurmDataCollector, str], pd.DataFrame]) -> pd.DataFrame:
+        started = time.monotonic()
+        futures = {}
+        for name, member in self.members.items():
+            key = (source, name, days)
+            if key not in self._in_flight:
+                self._in_flight[key] = self._start(name, member, source, fetch)
+            futures[name] = self._in_flight[key]
+
+        frames, failures = [], {}
+        for name, future in futures.items():
+            key = (source, name, days)
+            timeout = self.timeouts[name]
+            try:
+                frame = future.result(timeout=max(0.0, started + timeout - time.monotonic()))
+            except Exception as e:
+                failures[name] = str(e) if future.done() else f'no answer within {timeout:g}s'
+            else:
+                self._frames[key] = frame
+            if future.done():
+                del self._in_flight[key]
+            if key in self._frames:
+                frames.append(self._frames[key])
+
+        with self._lock:
+            for name in self.members:
+                if name in failures:
+                    self.health[name].errors[source] = failures[name]
+                else:
+                    self.health[name].errors.pop(source, None)
+        if len(failures) == len(self.members):
+            self.source_errors[source] = '; '.join(f'{name}: {error}' for name, error in failures.items())
+        if not frames:
+            return pd.DataFrame()
+        return compact_jobs(pd.concat(frames, ignore_index=True))
+
+    def _start(self, name: str, member: BaseSlurmDataCollector, source: str,
+               fetch: Callable[[BaseSlurmDataCollector, str], pd.DataFrame]) -> Future:
+        """Query one cluster in the background; the result carries the cluster column."""
+        future = Future()
+
+        def run() -> None:
+            member.source_errors.pop(source, None)
+            started = time.monotonic()
+            try:
+                frame = fetch(member, name)
+                # Collectors degrade to empty rows on command failure, which must not replace good ones
+                if source in member.source_errors:
+                    raise RuntimeError(member.source_errors[source])
+            except Exception as e:
+                future.set_exception(e)
+                return
+            with self._lock:
+                self.health[name].latency[source] = time.monotonic() - started
+                self.health[name].updated_at[source] = datetime.now()
+            future.set_result(frame.assign(**{CLUSTER_COLUMN: name}))
+
+        # A daemon thread, so a cluster that never answers does not delay exit
+        threading.Thread(target=run, name=f'cluster-{name}', daemon=True).start()
+        return future
+
+def local_cluster(runner: Optional[CommandRunner] = None) -> Optional[str]:
+    """ClusterName of the cluster this host belongs to, from `scontrol show config` (None if unknown)."""
+    try:
+        output = (runner or CommandRunner()).run(['scontrol', 'show', 'config'], timeout=CLUSTER_TIMEOUT)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+        return None
+    match = re.search(r'^ClusterName\s*=\s*(\S+)', output, re.MULTILINE)
+    return match.group(1) if match else None
+
+def federated_collector(clusters: Dict[str, float], users: Optional[List[str]] = None,
+                        accounts: Optional[List[str]] = None,
+                        partitions: Optional[List[str]] = None) -> FederatedSlurmDataCollector:
+    """A collector per cluster name (mapped to its timeout), merged into one view.
+
+    As for a single cluster, SLURMSMAC_FAKE_SLURM=1 uses fake_slurm's
+    stand-in commands and a host without Slurm gets mock data, with a
+    workload of its own per cluster (whose job ids overlap, as independent
+    clusters' do). sstat only runs for the local cluster.
+    """
+    selection = {'users': users, 'accounts': accounts, 'partitions': partitions}
+    seed = int(os.environ.get('SLURMSMAC_MOCK_SEED', 0))
+    if os.environ.get('SLURMSMAC_FAKE_SLURM'):
+        from .fake_slurm import fake_collector
+        members = {name: fake_collector(**selection, cluster=name, seed=seed + i)
+                   for i, name in enumerate(clusters)}
+    elif shutil.which('sinfo') is None:
+        members = {name: MockSlurmDataCollector(**selection, seed=seed + i)
+                   for i, name in enumerate(clusters)}
+    else:
+        local = local_cluster()
+        members = {name: RealSlurmDataCollector(**selection, cluster=name, sample_usage=name == local)
+                   for name in clusters}
+    return FederatedSlurmDataCollector(members, timeouts=clusters)
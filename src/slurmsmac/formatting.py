@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Display formatting for typed job columns."""
+import math
+import numpy as np
+import pandas as pd
+
+_BYTE_UNITS = ['B', 'K', 'M', 'G', 'T', 'P']
+# Sparkline levels; the first marks a missing sample
+_SPARK_BLOCKS = np.array(list(' ▁▂▃▄▅▆▇█'))
+
+def format_bytes(value, missing: str = 'N/A') -> str:
+    """Format a byte count Slurm-style, e.g. 1.5G."""
+    if value is None or pd.isna(value):
+        return missing
+    value = float(value)
+    unit = 0
+    while abs(value) >= 1024 and unit < len(_BYTE_UNITS) - 1:
+        value /= 1024
+        unit += 1
+    if unit == 0:
+        return f'{value:.0f}{_BYTE_UNITS[unit]}'
+    return f'{value:.1f}{_BYTE_UNITS[unit]}'
+
+def format_duration(value, missing: str = 'N/A') -> str:
+    """Format a Timedelta as [D-]HH:MM:SS."""
+    if value is None or pd.isna(value):
+        return missing
+    total = int(pd.Timedelta(value).total_seconds())
+    days, rest = divmod(total, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if days:
+        return f'{days}-{hours:02d}:{minutes:02d}:{seconds:02d}'
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}'
+
+def format_timestamp(value, missing: str = 'Unknown') -> str:
+    """Format a timestamp the way sacct prints it."""
+    if value is None or pd.isna(value):
+        return missing
+    return pd.Timestamp(value).strftime('%Y-%m-%dT%H:%M:%S')
+
+def format_percent(value, missing: str = 'N/A') -> str:
+    """Format a 0-1 ratio as a percentage."""
+    if value is None or pd.isna(value) or math.isinf(value):
+        return missing
+    return f'{value * 100:.1f}%'
+
+def format_sparklines(values) -> np.ndarray:
+    """One sparkline per row of a 2-D array (or one for a 1-D array), scaled from zero to the row's peak."""
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    if values.shape[1] == 0:
+        return np.full(len(values), '', dtype=object)
+    missing = np.isnan(values)
+    peak = np.where(missing, -np.inf, values).max(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scaled = np.where(peak > 0, values / peak, 0.0)
+    levels = 1 + np.rint(np.clip(np.nan_to_num(scaled), 0, 1) * 7).astype(int)
+    levels[missing] = 0
+    # Rows of single characters read as one string each
+    return _SPARK_BLOCKS[levels].view(f'<U{values.shape[1]}').ravel()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Grouping of job table rows: per user, and child rows under their parent."""
+from typing import Collection
+import numpy as np
+import pandas as pd
+from .job_arrays import ARRAY_COLUMN, TASKS_COLUMN
+from .job_steps import PARENT_COLUMN, STEPS_COLUMN, job_keys
+
+def summarize_by_user(active: pd.DataFrame) -> pd.DataFrame:
+    """Running/pending job counts and cores in use per user, busiest first."""
+    columns = ['running', 'pending', 'cores']
+    if active.empty or 'user' not in active:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='user'))
+    running = active['state'] == 'RUNNING'
+    counts = pd.DataFrame({
+        'user': active['user'],
+        'running': running.astype(int),
+        'pending': (active['state'] == 'PENDING').astype(int),
+        'cores': active['cpus'].where(running, 0),
+    })
+    summary = counts.groupby('user', sort=False, observed=True)[columns].sum()
+    return summary.sort_values(['running', 'pending', 'cores'], ascending=False)
+
+def order_by_user(jobs: pd.DataFrame) -> pd.DataFrame:
+    """Group rows per user, keeping each user's jobs in their original order."""
+    if jobs.empty or 'user' not in jobs:
+        return jobs
+    return jobs.sort_values('user', kind='stable')
+
+def insert_children(rows: pd.DataFrame, children: pd.DataFrame, parent_column: str,
+                    expanded: Collection[str]) -> pd.DataFrame:
+    """Insert the children of expanded rows (steps, array tasks) right after them.
+
+    `expanded` holds job keys (see job_steps.job_keys).
+    """
+    if not expanded or children.empty or rows.empty:
+        return rows
+    row_keys = job_keys(rows)
+    parents = job_keys(children, children[parent_column])
+    mask = parents.isin(expanded) & parents.isin(row_keys)
+    shown = children[mask]
+    if shown.empty:
+        return rows
+    position = dict(zip(row_keys, range(len(rows))))
+    keys = np.concatenate([np.arange(len(rows)), parents[mask].map(position).to_numpy(dtype=float)])
+    # Stable ordering keeps each row ahead of its children
+    return pd.concat([rows, shown]).iloc[np.argsort(keys, kind='stable')]
+
+def job_labels(jobs: pd.DataFrame, expanded: Collection[str]) -> pd.Series:
+    """Job id column marking expandable (▸) and expanded (▾) rows and indenting children.
+
+    Array summaries show their task count; tasks and steps are indented
+    under their array or job.
+    """
+    labels = jobs['job_id'].astype(object)
+    is_expanded = job_keys(jobs).isin(expanded)
+    if STEPS_COLUMN in jobs:
+        has_steps = jobs[STEPS_COLUMN].fillna(0) > 0
+        labels = labels.mask(has_steps & is_expanded, labels + ' ▾').mask(has_steps & ~is_expanded, labels + ' ▸')
+    if TASKS_COLUMN in jobs:
+        tasks = jobs[TASKS_COLUMN].fillna(0)
+        is_array = tasks > 0
+        summary = jobs['job_id'].astype(object) + '_[' + tasks.astype(int).astype(str) + ' tasks]'
+        labels = labels.mask(is_array & is_expanded, summary + ' ▾').mask(is_array & ~is_expanded, summary + ' ▸')
+    if ARRAY_COLUMN in jobs:
+        labels = labels.mask(jobs[ARRAY_COLUMN].notna(), '  ' + labels)
+    if PARENT_COLUMN in jobs:
+        step = jobs[PARENT_COLUMN].notna()
+        indent = pd.Series('  └ ', index=jobs.index, dtype=object)
+        if ARRAY_COLUMN in jobs:
+            # Steps of a shown array task sit one level deeper
+            tasks = job_keys(jobs)[jobs[ARRAY_COLUMN].notna()]
+            indent = indent.mask(job_keys(jobs, jobs[PARENT_COLUMN]).isin(tasks), '    └ ')
+        labels = labels.mask(step, indent + jobs['job_id'].astype(object))
+    return labels
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Data-side paging for the job history table.
+
+Only a window of the (sorted, filtered) history frame is ever pushed into
+the DataTable. The window slides as the cursor approaches its edges, so
+tens of thousands of jobs cost no more widget work than a few hundred.
+Job arrays are shown as one summary row, and arrays and jobs can be
+expanded to show their tasks and steps directly below them.
+"""
+from typing import List, Optional, Set
+import pandas as pd
+from .grouping import insert_children, job_labels
+from .job_arrays import ARRAY_COLUMN, TASKS_COLUMN
+from .job_steps import PARENT_COLUMN, job_keys
+
+# Columns that can be sorted on, in the order the sort key cycles through them
+SORT_COLUMNS = ['start', 'end', 'elapsed', 'ncpus', 'max_rss', 'cpu_eff', 'mem_eff', 'job_id', 'name', 'state', 'user']
+
+# Columns searched by the text filter
+FILTER_COLUMNS = ['job_id', 'name', 'state', 'user']
+
+class HistoryPager:
+    """Sorted/filtered view of a history frame with a movable row window."""
+    def __init__(self, window_size: int = 100, edge: int = 5):
+        self.window_size = window_size
+        # How close to a window edge the cursor gets before the window slides
+        self.edge = edge
+        self.offset = 0
+        self.sort_column: Optional[str] = None
+        self.descending = False
+        self.filter_text = ''
+        # Keys (job_steps.job_keys) of arrays whose tasks and jobs whose steps are shown
+        self.expanded: Set[str] = set()
+        self._data = pd.DataFrame()
+        self._steps = pd.DataFrame()
+        self._tasks = pd.DataFrame()
+        self._view = self._data
+
+    @property
+    def total(self) -> int:
+        """Number of rows after filtering."""
+        return len(self._view)
+
+    def set_data(self, jobs: pd.DataFrame, steps: Optional[pd.DataFrame] = None,
+                 tasks: Optional[pd.DataFrame] = None) -> None:
+        """Replace the underlying frames, keeping sort, filter, position and expanded rows.
+
+        `jobs` holds the top-level rows (jobs and array summaries), `steps`
+        and `tasks` the rows they expand into.
+        """
+        self._data = jobs
+        self._steps = steps if steps is not None else pd.DataFrame()
+        self._tasks = tasks if tasks is not None else pd.DataFrame()
+        self._rebuild()
+
+    def toggle(self, key: str) -> bool:
+        """Expand or collapse an array's tasks or a job's steps, by job key; False if it has neither."""
+        if not any(not children.empty and (job_keys(children, children[column]) == key).any()
+                   for children, column in ((self._tasks, ARRAY_COLUMN), (self._steps, PARENT_COLUMN))):
+            return False
+        self.expanded ^= {key}
+        self._rebuild()
+        return True
+
+    def array_summary(self, key: str) -> Optional[pd.Series]:
+        """The summary row of an array shown in the table, if the job key names one."""
+        if TASKS_COLUMN not in self._data:
+            return None
+        rows = self._data[(job_keys(self._data) == key) & (self._data[TASKS_COLUMN] > 0)]
+        return rows.iloc[0] if not rows.empty else None
+
+    def set_filter(self, text: str) -> None:
+        """Show only rows whose job id, name, state or user contains text."""
+        self.filter_text = text.strip()
+        self.offset = 0
+        self._rebuild()
+
+    def cycle_sort(self) -> Optional[str]:
+        """Sort by the next sortable column, ending with the original order."""
+        columns = [c for c in SORT_COLUMNS if c in self._data.columns]
+        if self.sort_column is None:
+            self.sort_column = columns[0] if columns else None
+        elif self.sort_column in columns and columns.index(self.sort_column) + 1 < len(columns):
+            self.sort_column = columns[columns.index(self.sort_column) + 1]
+        else:
+            self.sort_column = None
+        self.offset = 0
+        self._rebuild()
+        return self.sort_column
+
+    def reverse(self) -> None:
+        """Flip the sort direction."""
+        self.descending = not self.descending
+        self.offset = 0
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        view = self._data
+        if self.filter_text and not view.empty:
+            mask = pd.Series(False, index=view.index)
+            for column in FILTER_COLUMNS:
+                if column in view:
+                    mask |= view[column].astype(str).str.contains(self.filter_text, case=False, regex=False)
+            view = view[mask]
+        if self.sort_column in view.columns:
+            view = view.sort_values(self.sort_column, ascending=not self.descending,
+                                    kind='stable', na_position='last')
+        elif self.descending:
+            view = view.iloc[::-1]
+        if self.expanded:
+            view = insert_children(view, self._tasks, ARRAY_COLUMN, self.expanded)
+            view = insert_children(view, self._steps, PARENT_COLUMN, self.expanded)
+        self._view = view
+        self.offset = max(0, min(self.offset, self.total - self.window_size))
+
+    def job_labels(self, jobs: pd.DataFrame) -> pd.Series:
+        """Job id column with expansion markers and indentation."""
+        return job_labels(jobs, self.expanded)
+
+    def window(self) -> pd.DataFrame:
+        """Rows currently materialized in the table."""
+        return self._view.iloc[self.offset:self.offset + self.window_size]
+
+    def slide_for_cursor(self, cursor_row: int) -> bool:
+        """Move the window if the cursor is near one of its edges; True if it moved."""
+        step = max(1, self.window_size // 2)
+        rows_in_window = min(self.window_size, self.total - self.offset)
+        new_offset = self.offset
+        if cursor_row >= rows_in_window - self.edge and self.offset + rows_in_window < self.total:
+            new_offset = min(self.offset + step, self.total - self.window_size)
+        elif cursor_row < self.edge and self.offset > 0:
+            new_offset = max(0, self.offset - step)
+        moved = new_offset != self.offset
+        self.offset = new_offset
+        return moved
+
+    def describe(self) -> str:
+        """Short position/sort summary for the table title."""
+        if not self.total:
+            return 'no jobs' if not self.filter_text else f'no jobs matching "{self.filter_text}"'
+        first = self.offset + 1
+        last = self.offset + len(self.window())
+        parts: List[str] = [f'rows {first}-{last} of {self.total:,}']
+        if self.sort_column:
+            parts.append(f'sorted by {self.sort_column} {"↓" if self.descending else "↑"}')
+        elif self.descending:
+            parts.append('newest first')
+        if self.filter_text:
+            parts.append(f'filter "{self.filter_text}"')
+        return ', '.join(parts)
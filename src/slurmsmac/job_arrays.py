@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Compression of job array tasks into one summary row per array.
+
+Array tasks (`123_7`, or squeue's pending `123_[8-5000%10]`) are replaced
+by a single row keyed by the array's job id, with task counts per state,
+totals for resources, medians for the displayed runtime and efficiency,
+and p10/p50/p90 columns for their distributions. The task rows are
+returned separately so a view can show them under the summary on demand.
+Tasks are grouped per (cluster, array id) when rows come from several
+clusters.
+"""
+import re
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from .formatting import format_duration, format_percent
+from .job_steps import STEPS_COLUMN, job_keys
+
+# Set on task rows: the array job id; on summary rows: how many tasks they stand for
+ARRAY_COLUMN = 'array_id'
+TASKS_COLUMN = 'num_tasks'
+
+# Percentiles reported for runtime and efficiency distributions
+PERCENTILES = (0.1, 0.5, 0.9)
+
+# squeue's compact state codes, used in the per-state task counts
+STATE_CODES = {
+    'PENDING': 'PD', 'RUNNING': 'R', 'COMPLETING': 'CG', 'COMPLETED': 'CD', 'FAILED': 'F',
+    'CANCELLED': 'CA', 'TIMEOUT': 'TO', 'OUT_OF_MEMORY': 'OOM', 'NODE_FAIL': 'NF',
+    'PREEMPTED': 'PR', 'SUSPENDED': 'S', 'REQUEUED': 'RQ',
+}
+
+# Aggregation per column for each view, and the columns whose distribution is kept
+HISTORY_AGGREGATES = {
+    'start': 'min', 'end': 'max', 'elapsed': 'median', 'total_cpu': 'sum', 'ncpus': 'sum',
+    'max_rss': 'max', 'max_vmsize': 'max', 'mem_eff': 'median', 'cpu_eff': 'median',
+    'wasted_core_hours': 'sum', 'wasted_gb_hours': 'sum',
+}
+HISTORY_DISTRIBUTIONS = ['elapsed', 'mem_eff', 'cpu_eff']
+ACTIVE_AGGREGATES = {
+    'time': 'median', 'cpus': 'sum', 'used_memory': 'max', 'mem_eff': 'median',
+    'live_cpu_eff': 'median', 'idle': 'all', 'disk_read': 'sum', 'disk_write': 'sum',
+}
+ACTIVE_DISTRIBUTIONS = ['time', 'mem_eff']
+
+_TASK_ID = r'^(\d+)_(?:\d+|\[[^\]]*\])$'
+_RANGE_PART = re.compile(r'^(\d+)(?:-(\d+)(?::(\d+))?)?$')
+
+def array_ids(job_ids: pd.Series) -> pd.Series:
+    """Array job id of each task id ('123_7' -> '123'), NaN for other jobs."""
+    return job_ids.str.extract(_TASK_ID, expand=False)
+
+def _range_size(spec: str) -> int:
+    """Number of tasks in an index spec such as '1-5000%10' or '1,3,5-9:2'."""
+    total = 0
+    for part in spec.split('%')[0].split(','):
+        match = _RANGE_PART.match(part.strip())
+        if match is None:
+            total += 1
+            continue
+        first, last, step = match.groups()
+        total += 1 if last is None else len(range(int(first), int(last) + 1, int(step or 1)))
+    return max(total, 1)
+
+def task_counts(job_ids: pd.Series) -> pd.Series:
+    """How many tasks each row stands for: 1, or the size of a pending range."""
+    counts = pd.Series(1, index=job_ids.index)
+    ranged = job_ids.str.endswith(']')
+    if ranged.any():
+        specs = job_ids[ranged].str.extract(r'_\[([^\]]*)\]$', expand=False)
+        counts[ranged] = specs.map(_range_size, na_action='ignore').fillna(1).astype(int)
+    return counts
+
+def _state_counts(states: pd.Series, arrays: pd.Series, weights: pd.Series) -> pd.Series:
+    """'4988 PD, 12 R' per array, most common state first."""
+    states = states.astype(str)
+    codes = states.map(STATE_CODES).fillna(states)
+    counts = weights.groupby([arrays, codes], sort=False).sum()
+    counts = counts.sort_values(ascending=False, kind='stable')
+    labels: Dict[str, List[str]] = {}
+    for (array, code), count in counts.items():
+        labels.setdefault(array, []).append(f'{count} {code}')
+    return pd.Series({array: ', '.join(parts) for array, parts in labels.items()}, dtype=object)
+
+def _compress(jobs: pd.DataFrame, aggregates: Dict[str, str], distributions: List[str],
+              task_values: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    rows = jobs.assign(**{TASKS_COLUMN: 0})
+    if jobs.empty or 'job_id' not in jobs:
+        return rows, jobs.assign(**{ARRAY_COLUMN: pd.Series(dtype=str)}).iloc[0:0]
+    arrays = array_ids(jobs['job_id'])
+    keys = job_keys(jobs, arrays)
+    weights = task_counts(jobs['job_id'])
+    totals = weights.groupby(keys).sum()
+    # Arrays with a single known task are left as plain rows
+    grouped = keys.isin(totals.index[totals > 1])
+    tasks = jobs[grouped].assign(**{ARRAY_COLUMN: arrays[grouped].astype('category')})
+    if tasks.empty:
+        return rows, tasks
+
+    values = task_values[grouped]
+    tasks_arrays = keys[grouped]
+    tasks_weights = weights[grouped]
+    by_array = values.groupby(tasks_arrays, sort=False)
+    first = ~tasks_arrays.duplicated()
+    summary = jobs[grouped][first.to_numpy()].copy()
+    summary.index = tasks_arrays[first]
+    summary['job_id'] = arrays[grouped][first].to_numpy()
+    summary['state'] = _state_counts(jobs.loc[grouped, 'state'], tasks_arrays, tasks_weights)
+    summary[TASKS_COLUMN] = tasks_weights.groupby(tasks_arrays, sort=False).sum()
+    if STEPS_COLUMN in summary:
+        summary[STEPS_COLUMN] = 0
+    for column, how in aggregates.items():
+        if column not in values:
+            continue
+        if how == 'sum':
+            # A pending range row stands for several tasks
+            summary[column] = (values[column] * tasks_weights).groupby(tasks_arrays, sort=False).sum()
+        else:
+            summary[column] = by_array[column].agg(how)
+    for column in distributions:
+        if column not in values:
+            continue
+        series = values[column]
+        is_duration = pd.api.types.is_timedelta64_dtype(series)
+        if is_duration:
+            series = series.dt.total_seconds()
+        quantiles = series.groupby(tasks_arrays, sort=False).quantile(list(PERCENTILES)).unstack()
+        for q in PERCENTILES:
+            quantile = quantiles[q]
+            summary[f'{column}_p{round(q * 100)}'] = pd.to_timedelta(quantile, unit='s') if is_duration else quantile
+
+    # Summaries take the place of the array's first task
+    positions = np.arange(len(jobs))
+    order = np.concatenate([positions[~grouped.to_numpy()], positions[grouped.to_numpy()][first.to_numpy()]])
+    combined = pd.concat([rows[~grouped.to_numpy()], summary.reset_index(drop=True)], ignore_index=True)
+    return combined.iloc[np.argsort(order, kind='stable')].reset_index(drop=True), tasks
+
+def compress_history_arrays(history: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Replace array tasks in a (step-collapsed) history frame by summaries.
+
+    Returns (rows, tasks); task rows carry their array's job id in ARRAY_COLUMN.
+    """
+    return _compress(history, HISTORY_AGGREGATES, HISTORY_DISTRIBUTIONS, history)
+
+def compress_active_arrays(active: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Replace array tasks in an active jobs frame by summaries.
+
+    Runtime and efficiency figures only count running tasks.
+    """
+    if active.empty or 'state' not in active:
+        return _compress(active, ACTIVE_AGGREGATES, ACTIVE_DISTRIBUTIONS, active)
+    running = active['state'] == 'RUNNING'
+    values = active.assign(**{column: active[column].where(running)
+                              for column in ('time', 'mem_eff', 'live_cpu_eff') if column in active})
+    return _compress(active, ACTIVE_AGGREGATES, ACTIVE_DISTRIBUTIONS, values)
+
+def _distribution(row: pd.Series, column: str, label: str, fmt) -> str:
+    values = [row.get(f'{column}_p{round(q * 100)}') for q in PERCENTILES]
+    if all(value is None or pd.isna(value) for value in values):
+        return ''
+    names = '/'.join(f'p{round(q * 100)}' for q in PERCENTILES)
+    return f'{label} {names} ' + ' / '.join(fmt(value) for value in values)
+
+def describe_array(row: pd.Series) -> str:
+    """One-line task and distribution summary of an array summary row."""
+    parts = [f"Array {row['job_id']}: {int(row[TASKS_COLUMN]):,} tasks ({row['state']})"]
+    for column, label in (('elapsed', 'runtime'), ('time', 'runtime')):
+        parts.append(_distribution(row, column, label, format_duration))
+    parts.append(_distribution(row, 'mem_eff', 'mem eff', format_percent))
+    parts.append(_distribution(row, 'cpu_eff', 'CPU eff', format_percent))
+    return ' · '.join(part for part in parts if part)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Grouping of sacct job steps under their parent job.
+
+sacct prints one row per allocation plus one per step (`.batch`, `.extern`,
+`.0`, ...). MaxRSS is only reported on the steps while ReqMem and the
+overall state belong to the allocation, so the rows are folded into one
+row per job with step peaks aggregated onto it. The step rows are kept
+separately so they can be shown under their job on demand.
+
+Clusters merged into one view hand out job ids independently, so rows with
+a cluster column are told apart by (cluster, job id); see job_keys.
+"""
+from typing import Iterable, Iterator, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Set on step rows: the job id of the allocation they belong to
+PARENT_COLUMN = 'parent_id'
+# Set on job rows: how many steps were folded into the job
+STEPS_COLUMN = 'num_steps'
+# Set on rows merged from several clusters: the cluster they came from
+CLUSTER_COLUMN = 'cluster'
+
+def job_keys(jobs: pd.DataFrame, ids: Optional[pd.Series] = None) -> pd.Series:
+    """Keys that tell the rows' jobs apart: the job id, as 'cluster:job_id' on rows with a cluster.
+
+    `ids` keys other ids of the same rows instead (e.g. their PARENT_COLUMN);
+    missing ids stay missing.
+    """
+    ids = jobs['job_id'] if ids is None else ids
+    if CLUSTER_COLUMN not in jobs:
+        return ids
+    return (jobs[CLUSTER_COLUMN].astype(str) + ':' + ids.astype(str)).where(ids.notna())
+
+def is_step(job_ids: pd.Series) -> pd.Series:
+    """Whether each job id names a step ('123.batch', '123_4.0')."""
+    return job_ids.str.contains('.', regex=False)
+
+def parent_ids(job_ids: pd.Series) -> pd.Series:
+    """Allocation job id of each step id ('123_4.batch' -> '123_4')."""
+    return job_ids.str.split('.', n=1).str[0]
+
+def whole_jobs(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Regroup chunks of history rows so that no job is split across two of them.
+
+    Rows must come as sacct prints them, each job directly followed by its
+    steps; the rows of the last job in a chunk are held back for the next.
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            carry = chunk
+            continue
+        parents = job_keys(chunk, parent_ids(chunk['job_id'])).to_numpy()
+        others = np.flatnonzero(parents != parents[-1])
+        start = others[-1] + 1 if len(others) else 0
+        if start:
+            yield chunk.iloc[:start]
+        carry = chunk.iloc[start:]
+    if carry is not None and not carry.empty:
+        yield carry
+
+def collapse_steps(history: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Fold step rows into their parent jobs.
+
+    Returns (jobs, steps). Each job's max_rss and max_vmsize become the
+    peak over the job and its steps, and total_cpu the larger of the job's
+    own value and the sum over its steps. Steps inherit a missing ReqMem
+    from their job. Steps whose job row is absent stay in `jobs` so no
+    rows are lost. Collapsing jobs together with their steps again gives
+    the same jobs.
+    """
+    if history.empty or 'job_id' not in history:
+        jobs = history.assign(**{STEPS_COLUMN: pd.Series(dtype=int)})
+        return jobs, history.assign(**{PARENT_COLUMN: pd.Series(dtype=str)}).iloc[0:0]
+
+    step_mask = is_step(history['job_id'])
+    steps = history[step_mask].assign(**{PARENT_COLUMN: parent_ids(history['job_id'][step_mask]).astype('category')})
+    jobs = history[~step_mask].drop(columns=[STEPS_COLUMN], errors='ignore')
+    parents = job_keys(steps, steps[PARENT_COLUMN])
+    orphans = ~parents.isin(job_keys(jobs))
+    if orphans.any():
+        jobs = pd.concat([jobs, steps[orphans].drop(columns=[PARENT_COLUMN])])
+        steps, parents = steps[~orphans], parents[~orphans]
+
+    by_parent = steps.groupby(parents, sort=False, observed=True)
+    ids = job_keys(jobs)
+    jobs = jobs.assign(**{STEPS_COLUMN: ids.map(by_parent.size()).fillna(0).astype(int)})
+    if steps.empty:
+        return jobs, steps
+
+    for column in ('max_rss', 'max_vmsize'):
+        if column in jobs:
+            jobs[column] = np.fmax(jobs[column], ids.map(by_parent[column].max()))
+    if 'total_cpu' in jobs:
+        step_cpu = ids.map(by_parent['total_cpu'].sum())
+        use_steps = step_cpu.notna() & ~(jobs['total_cpu'] >= step_cpu)
+        jobs['total_cpu'] = jobs['total_cpu'].mask(use_steps, step_cpu)
+
+    if 'req_mem' in steps:
+        requests = jobs.set_index(ids)
+        requests = requests[~requests.index.duplicated()]
+        missing = steps['req_mem'].isna()
+        if missing.any():
+            steps = steps.copy()
+            for column in ('req_mem', 'req_mem_per'):
+                if column in steps:
+                    inherited = parents[missing].map(requests[column])
+                    steps.loc[missing, column] = inherited
+    return jobs, steps
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Persistent local store for Slurm job history.
+
+Finished jobs never change, so they are kept on disk and sacct only has to
+be asked for jobs that changed since the last sync (the high-water mark).
+"""
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+import pandas as pd
+
+# States after which a job record no longer changes
+TERMINAL_STATES = {
+    'COMPLETED', 'FAILED', 'CANCELLED', 'TIMEOUT', 'OUT_OF_MEMORY', 'NODE_FAIL',
+    'PREEMPTED', 'BOOT_FAIL', 'DEADLINE', 'REVOKED',
+}
+
+# Re-query a little before the high-water mark to absorb slurmdbd write lag
+SYNC_OVERLAP = timedelta(minutes=5)
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+def default_cache_dir() -> Path:
+    """Return the per-user cache directory for slurmsmac."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'slurmsmac'
+
+def is_terminal_state(state: str) -> bool:
+    """Check whether a sacct state (e.g. 'CANCELLED by 1234') is final."""
+    words = str(state).split()
+    return bool(words) and words[0].rstrip('+') in TERMINAL_STATES
+
+class JobStore:
+    """SQLite-backed store of sacct rows, keyed by scope (e.g. username) and job id."""
+    def __init__(self, columns: List[str], path: Optional[Path] = None):
+        self.columns = list(columns)
+        self.path = Path(path) if path is not None else default_cache_dir() / 'jobs.sqlite'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        # A fresh connection per operation keeps the store safe to use from worker threads
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _init_schema(self) -> None:
+        cols = ', '.join(f'"{c}" TEXT' for c in self.columns if c != 'job_id')
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS jobs (scope TEXT NOT NULL, job_id TEXT NOT NULL, '
+                f'{cols}, terminal INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (scope, job_id))'
+            )
+            # Stores created by older versions may lack newly added columns
+            existing = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for column in self.columns:
+                if column not in existing:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN "{column}" TEXT')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sync (scope TEXT PRIMARY KEY, '
+                'coverage_start TEXT NOT NULL, last_seen TEXT NOT NULL)'
+            )
+
+    def query_ranges(self, scope: str, window_start: datetime) -> List[Tuple[datetime, Optional[datetime]]]:
+        """Return the sacct (start, end) ranges needed to bring the window up to date; None is up to now.
+
+        That is the whole window on the first sync, then the changes since the
+        last one. A window reaching further back than anything stored also
+        needs the part before the stored one.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT coverage_start, last_seen FROM sync WHERE scope = ?', (scope,)
+            ).fetchone()
+        if row is None:
+            return [(window_start, None)]
+        coverage_start, last_seen = (datetime.strptime(v, TIME_FORMAT) for v in row)
+        since = max(window_start, last_seen - SYNC_OVERLAP)
+        if window_start >= coverage_start:
+            return [(since, None)]
+        if since <= coverage_start:
+            # The two ranges meet
+            return [(window_start, None)]
+        return [(window_start, coverage_start), (since, None)]
+
+    def upsert(self, scope: str, jobs: pd.DataFrame) -> None:
+        """Insert or replace job rows."""
+        if jobs.empty:
+            return
+        cols = [c for c in self.columns if c in jobs.columns]
+        frame = jobs[cols].astype(str)
+        terminal = frame['state'].map(is_terminal_state).astype(int) if 'state' in frame else 0
+        frame = frame.assign(scope=scope, terminal=terminal)
+        names = ['scope'] + cols + ['terminal']
+        placeholders = ', '.join('?' for _ in names)
+        quoted = ', '.join(f'"{n}"' for n in names)
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                f'INSERT OR REPLACE INTO jobs ({quoted}) VALUES ({placeholders})',
+                frame[names].itertuples(index=False, name=None),
+            )
+
+    def unfinished_job_ids(self, scope: str) -> Set[str]:
+        """Return the ids of stored jobs that have not reached a terminal state."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                'SELECT job_id FROM jobs WHERE scope = ? AND terminal = 0', (scope,)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def mark_synced(self, scope: str, window_start: datetime, synced_at: datetime) -> None:
+        """Record that everything from window_start up to synced_at is stored."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                'SELECT coverage_start FROM sync WHERE scope = ?', (scope,)
+            ).fetchone()
+            coverage_start = window_start
+            if row is not None:
+                coverage_start = min(window_start, datetime.strptime(row[0], TIME_FORMAT))
+            conn.execute(
+                'INSERT OR REPLACE INTO sync (scope, coverage_start, last_seen) VALUES (?, ?, ?)',
+                (scope, coverage_start.strftime(TIME_FORMAT), synced_at.strftime(TIME_FORMAT)),
+            )
+
+    def load(self, scope: str, since: datetime) -> pd.DataFrame:
+        """Load jobs that were running at any point after `since`."""
+        quoted = ', '.join(f'"{c}"' for c in self.columns)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f'SELECT {quoted} FROM jobs WHERE scope = ? '
+                # Unfinished jobs have a non-date end time such as 'Unknown'
+                f'AND ("end" >= ? OR "end" NOT GLOB \'[0-9]*\') '
+                f'ORDER BY "start", job_id',
+                (scope, since.strftime(TIME_FORMAT)),
+            ).fetchall()
+        return pd.DataFrame(rows, columns=self.columns)
+
+    def iter_load(self, scope: str, since: datetime, rows: int) -> Iterator[pd.DataFrame]:
+        """Load the jobs `load` would, `rows` at a time, each job directly followed by its steps.
+
+        At least one (possibly empty) frame is yielded.
+        """
+        quoted = ', '.join(f'"{c}"' for c in self.columns)
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f'SELECT {quoted} FROM jobs WHERE scope = ? '
+                f'AND ("end" >= ? OR "end" NOT GLOB \'[0-9]*\') '
+                # Job id up to any step suffix, then the job before its steps
+                f"ORDER BY substr(job_id, 1, instr(job_id || '.', '.') - 1), job_id",
+                (scope, since.strftime(TIME_FORMAT)),
+            )
+            batch = cursor.fetchmany(rows)
+            yield pd.DataFrame(batch, columns=self.columns)
+            while len(batch) == rows:
+                batch = cursor.fetchmany(rows)
+                if batch:
+                    yield pd.DataFrame(batch, columns=self.columns)
+
+    def clear(self, scope: Optional[str] = None) -> None:
+        """Forget stored jobs, for one scope or all of them."""
+        with closing(self._connect()) as conn, conn:
+            if scope is None:
+                conn.execute('DELETE FROM jobs')
+                conn.execute('DELETE FROM sync')
+            else:
+                conn.execute('DELETE FROM jobs WHERE scope = ?', (scope,))
+                conn.execute('DELETE FROM sync WHERE scope = ?', (scope,))
@@ -1,10 +1,49 @@
 # -*- coding: utf-8 -*-
+import threading
+import time
+from datetime import datetime
+from functools import cached_property
+from textual import work
 from textual.app import App, ComposeResult
 from textual.containers import Container, Vertical, Horizontal
-from textual.widgets import Header, Footer, Static, DataTable, Tab, Tabs, TabPane, Select
+from textual.widgets import Header, Footer, Static, DataTable, Tab, Tabs, TabPane, Select, Input
+from textual.worker import get_current_worker
 from rich.table import Table
 from rich.text import Text
-from .slurm_data import get_slurm_collector, MockSlurmDataCollector
+from .table_sync import sync_table
+from .scheduler import RefreshScheduler
+from .profiler import RefreshProfiler, instrument_collector, profiled
+
+# Modules that need pandas are imported where they are used, so the first
+# frame is drawn before pandas has loaded; the first refresh worker loads
+# them (and detects Slurm) off the UI thread.
+
+# (column key, label) pairs; keys stay stable so rows can be updated in place
+ACTIVE_TABLE_COLUMNS = [
+    ("job_id", "Job ID"), ("name", "Name"), ("state", "State"), ("time", "Time"),
+    ("cpus", "CPUs"), ("memory", "Req Mem"), ("used_memory", "Used Mem"), ("mem_trend", "Mem Trend"),
+    ("mem_eff", "Mem Eff"), ("live_cpu_eff", "CPU Now"), ("disk_io", "Disk R/W"),
+]
+HISTORY_TABLE_COLUMNS = [
+    ("job_id", "Job ID"), ("name", "Name"), ("state", "State"), ("start", "Start"),
+    ("end", "End"), ("elapsed", "Elapsed"), ("ncpus", "CPUs"), ("max_rss", "Memory"),
+    ("req_mem", "Req Mem"), ("cpu_eff", "CPU Eff"), ("mem_eff", "Mem Eff"),
+]
+
+# Shown after the job id when monitoring several users or clusters
+USER_COLUMN = ("user", "User")
+CLUSTER_COLUMN = ("cluster", "Cluster")
+# Users listed in the multi-user summary before collapsing the rest
+USER_SUMMARY_ROWS = 15
+# Line describing the highlighted job array, per table
+ARRAY_DETAIL_IDS = {"active-jobs-table": "#active-array-detail", "history-table": "#history-array-detail"}
+# Refreshes shown in the active table's memory sparklines
+TREND_WIDTH = 10
+# Seconds between table updates while a large history query is still streaming
+PARTIAL_HISTORY_INTERVAL = 0.5
+# How much less often active jobs are polled while the History tab is shown; the
+# status panel's active counts and trends stay on screen
+HIDDEN_ACTIVE_SLOWDOWN = 4
 
 # Note: Mouse support is disabled in this application to ensure compatibility
 # with HPC environments. The previous driver patch for handling non-UTF-8 mouse
@@ -21,6 +60,12 @@ class Dashboard(App):
         ("tab", "switch_tab", "Switch Tab"),
         ("up", "cursor_up", "Up"),
         ("down", "cursor_down", "Down"),
+        ("s", "sort_history", "Sort History"),
+        ("o", "reverse_history", "Reverse"),
+        ("slash", "filter_history", "Filter"),
+        ("r", "refresh_now", "Refresh Now"),
+        ("p", "toggle_profiler", "Profiler"),
+        ("x", "export_profile", "Export Profile"),
     ]
 
     CSS = """
@@ -90,9 +135,59 @@ class Dashboard(App):
         width: 100%;
         margin-bottom: 1;
     }
+
+    #history-filter {
+        margin-bottom: 1;
+    }
+
+    #user-summary {
+        height: auto;
+        max-height: 18;
+        border: solid $secondary;
+    }
+
+    #user-summary.hidden {
+        display: none;
+    }
+
+    #cluster-health {
+        height: auto;
+        padding: 0 1;
+    }
+
+    #cluster-health.hidden {
+        display: none;
+    }
+
+    #refresh-status {
+        height: 1;
+        color: $text-muted;
+    }
+
+    #profiler-panel {
+        height: auto;
+        max-height: 16;
+        border: solid $accent;
+        padding: 0 1;
+    }
+
+    #profiler-panel.hidden {
+        display: none;
+    }
+
+    .array-detail {
+        height: auto;
+        padding: 0 1;
+        color: $text-muted;
+    }
+
+    .array-detail.hidden {
+        display: none;
+    }
     """
 
-    def __init__(self):
+    def __init__(self, active_interval: float = 30, history_interval: float = 120,
+                 users=None, accounts=None, partitions=None, clusters=None):
         # Disable mouse BEFORE calling super().__init__() to prevent driver from enabling it
         # These must be set on the class before Textual initializes the driver
         Dashboard.ENABLE_COMMAND_PALETTE = False
@@ -106,9 +201,30 @@ class Dashboard(App):
         except:
             pass
 
-        self.data_collector = get_slurm_collector()
-        self.refresh_interval = 30  # seconds
-        self.is_mock_mode = isinstance(self.data_collector, MockSlurmDataCollector)
+        # Set up by the first refresh worker, see load_collector()
+        self.data_collector = None
+        self.selection = {'users': users, 'accounts': accounts, 'partitions': partitions, 'clusters': clusters}
+        # Watching several users/accounts/partitions adds a user column and summary
+        self.multi_user = False
+        self.active_columns = list(ACTIVE_TABLE_COLUMNS)
+        self.history_columns = list(HISTORY_TABLE_COLUMNS)
+        # squeue/sstat and sacct are polled on their own cadences with backoff
+        self.scheduler = RefreshScheduler({'active': active_interval, 'history': history_interval},
+                                          paused_intervals={'active': active_interval * HIDDEN_ACTIVE_SLOWDOWN})
+        self.is_mock_mode = False
+        self.is_shared_mode = False
+        # Per-stage timings of each refresh, shown with 'p' and exported with 'x'
+        self.profiler = RefreshProfiler()
+        # Background refresh state. Cancelling a thread worker does not stop its thread,
+        # so a new collection waits until the previous one has actually returned
+        self._refresh_worker = None
+        self._collection_done = threading.Event()
+        self._collection_done.set()
+        self.last_updated = None
+        # Data from the most recent refresh cycle, shared by every view
+        self.snapshot = None
+        # Keys (job_steps.job_keys) of arrays in the active table whose tasks are shown
+        self.expanded_arrays = set()
         # Track current tab
         self.current_tab_index = 0
         self.tab_ids = ["current-tab", "history-tab"]
@@ -122,6 +238,51 @@ class Dashboard(App):
             ("All Time", 365)
         ]
 
+    @cached_property
+    def history_pager(self):
+        """Pager over the history; only a window of it is materialized in the table."""
+        from .history_view import HistoryPager
+        return HistoryPager()
+
+    @cached_property
+    def metrics(self):
+        """Trends of every active jobs refresh, for the sparklines."""
+        from .metrics import MetricsHistory
+        return MetricsHistory()
+
+    def load_collector(self):
+        """Detect Slurm and build the data collector (blocking; runs in a worker)."""
+        from .slurm_data import get_slurm_collector
+        return get_slurm_collector(**self.selection)
+
+    def attach_collector(self, collector) -> None:
+        """Start using a collector and adapt the layout to what it monitors."""
+        if self.data_collector is not None:
+            return
+        from .daemon import SharedSnapshotCollector
+        from .slurm_data import MockSlurmDataCollector
+        self.data_collector = collector
+        instrument_collector(collector, self.profiler)
+        self.multi_user = collector.is_multi_user
+        if self.multi_user:
+            self.active_columns.insert(1, USER_COLUMN)
+            self.history_columns.insert(1, USER_COLUMN)
+            self.query_one("#user-summary", Static).remove_class("hidden")
+        if collector.clusters:
+            self.active_columns.insert(1, CLUSTER_COLUMN)
+            self.history_columns.insert(1, CLUSTER_COLUMN)
+            self.query_one("#cluster-health", Static).remove_class("hidden")
+        # A federated collector is in mock mode when all of its clusters are
+        backends = getattr(collector, 'members', {None: collector}).values()
+        self.is_mock_mode = all(isinstance(backend, MockSlurmDataCollector) for backend in backends)
+        self.is_shared_mode = isinstance(collector, SharedSnapshotCollector)
+        if self.is_mock_mode:
+            self.mount(Static("⚠️ Running in mock mode - No Slurm detected", classes="mode-indicator"),
+                       before="#profiler-panel")
+        elif self.is_shared_mode:
+            self.mount(Static("Reading shared snapshots from slurmsmac serve", classes="mode-indicator"),
+                       before="#profiler-panel")
+
     def compose(self) -> ComposeResult:
         """Create child widgets for the app."""
         yield Header()
@@ -135,6 +296,8 @@ class Dashboard(App):
                 Vertical(
                     Static("Active Jobs", classes="section-title"),
                     DataTable(id="active-jobs-table"),
+                    Static(id="active-array-detail", classes="array-detail hidden"),
+                    Static(id="user-summary", classes="hidden"),
                     classes="stats-container"
                 ),
             ),
@@ -145,8 +308,10 @@ class Dashboard(App):
             Container(
                 Horizontal(
                     Vertical(
-                        Static("Job History", classes="section-title"),
+                        Static("Job History", classes="section-title", id="history-title"),
+                        Input(placeholder="Filter by job id, name, state or user", id="history-filter"),
                         DataTable(id="history-table"),
+                        Static(id="history-array-detail", classes="array-detail hidden"),
                         classes="stats-container",
                         id="history-table-container"
                     ),
@@ -161,8 +326,9 @@ class Dashboard(App):
             ),
             id="history-pane"
         )
-        if self.is_mock_mode:
-            yield Static("⚠️ Running in mock mode - No Slurm detected", classes="mode-indicator")
+        yield Static(id="profiler-panel", classes="hidden")
+        yield Static(id="cluster-health", classes="hidden")
+        yield Static("Waiting for first refresh...", id="refresh-status")
         yield Footer()
 
     def on_mount(self) -> None:
@@ -176,7 +342,13 @@ class Dashboard(App):
             # If mouse configuration fails, continue anyway
             pass
 
-        self.set_interval(self.refresh_interval, self.refresh_data)
+        for table in self.query(DataTable):
+            table.cursor_type = "row"
+            table.can_focus = True
+
+        # The scheduler decides which sources are actually due on each tick
+        self.set_interval(1, self.refresh_data)
+        self.scheduler.set_paused('history', True)
         self.refresh_data()
 
         # Focus the active jobs table initially
@@ -188,9 +360,59 @@ class Dashboard(App):
             
     def on_select_changed(self, event: Select.Changed) -> None:
         """Handle time filter selection change."""
-        if event.select.id == "time-filter":
+        if event.select.id == "time-filter" and int(event.value) != self.history_days:
             self.history_days = int(event.value)
-            self.refresh_data()
+            # Results for the old window are stale, so drop any in-flight refresh; the
+            # new window is collected once its thread has returned (see refresh_data)
+            self.workers.cancel_group(self, "refresh")
+            # Windows the history rollups cover are answered without sacct; wider ones still need their rows
+            snapshot = None
+            if self.snapshot is not None and self.data_collector is not None:
+                snapshot = self.data_collector.rewindow(self.snapshot, self.history_days)
+            if snapshot is not None:
+                self.snapshot = snapshot
+                if snapshot.days == self.history_days:
+                    self.update_job_history()
+                self.update_status_plot()
+            if snapshot is None or snapshot.days != self.history_days:
+                self.scheduler.force(['history'])
+                self.refresh_data()
+
+    def on_tabs_tab_activated(self, event: Tabs.TabActivated) -> None:
+        """Pause polling of history while its tab is hidden, and slow down active jobs while theirs is."""
+        showing_history = event.tab is not None and event.tab.id == "history-tab"
+        self.scheduler.set_paused('history', not showing_history)
+        self.scheduler.set_paused('active', showing_history)
+
+    def action_refresh_now(self) -> None:
+        """Refresh every source immediately."""
+        self.scheduler.force()
+        self.refresh_data()
+
+    def action_toggle_profiler(self) -> None:
+        """Show or hide the refresh profiler panel."""
+        panel = self.query_one("#profiler-panel", Static)
+        panel.toggle_class("hidden")
+        self.update_profiler_panel()
+
+    def action_export_profile(self) -> None:
+        """Write the recorded refresh profiles as JSON and CSV."""
+        from .job_store import default_cache_dir
+        stem = default_cache_dir() / f"profile-{datetime.now():%Y%m%d-%H%M%S}"
+        try:
+            stem.parent.mkdir(parents=True, exist_ok=True)
+            self.profiler.export_json(stem.with_suffix(".json"))
+            self.profiler.export_csv(stem.with_suffix(".csv"))
+        except OSError as e:
+            self.set_refresh_status(f"Profile export failed: {e}")
+            return
+        self.set_refresh_status(f"Profile exported to {stem}.json and .csv")
+
+    def update_profiler_panel(self) -> None:
+        """Refresh the profiler panel if it is visible."""
+        panel = self.query_one("#profiler-panel", Static)
+        if not panel.has_class("hidden"):
+            panel.update(Text(self.profiler.describe()))
 
     def action_quit(self) -> None:
         """Quit the application."""
@@ -238,106 +460,295 @@ class Dashboard(App):
             self.exit()
 
     def refresh_data(self) -> None:
-        """Refresh all data displays."""
-        self.update_active_jobs()
-        self.update_job_history()
-        self.update_status_plot()
+        """Start a background refresh of due sources unless one is already in flight.
 
-    def update_active_jobs(self) -> None:
-        """Update the active jobs table."""
-        table = self.query_one("#active-jobs-table")
-        table.clear(columns=True)
-        table.add_columns("Job ID", "Name", "State", "Time", "CPUs", "Req Mem", "Used Mem", "Mem Eff")
-        table.cursor_type = "row"
-        table.can_focus = True
-
-        active_jobs = self.data_collector.get_active_jobs()
-        for _, job in active_jobs.iterrows():
-            # Calculate memory efficiency for running jobs
-            mem_eff = "N/A"
-            if job['state'] == 'RUNNING' and 'used_memory' in job and job['used_memory'] != 'N/A':
+        A cancelled refresh counts as in flight until its thread returns, so
+        two collections never run at once; due sources stay due until then.
+        """
+        if not self._collection_done.is_set():
+            return
+        sources = self.scheduler.due()
+        if not sources:
+            return
+        self._collection_done.clear()
+        self.set_refresh_status(f"Refreshing {', '.join(sources)}...")
+        self.profiler.begin(sources)
+        self._refresh_worker = self.collect_data(self.history_days, sources)
+
+    @work(thread=True, group="refresh", exit_on_error=False)
+    def collect_data(self, days: int, sources) -> None:
+        """Run the Slurm commands in a worker thread and hand results to the UI.
+
+        A cancelled worker returns at the next stage boundary without
+        touching the UI.
+        """
+        worker = get_current_worker()
+        try:
+            if self.data_collector is None:
                 try:
-                    req_mem = float(job['memory'].replace('G', '').replace('M', '').replace('K', ''))
-                    # Normalize used_memory units if needed, assuming G for now based on mock
-                    used_mem_str = job['used_memory']
-                    if 'K' in used_mem_str:
-                        used_mem = float(used_mem_str.replace('K', '')) / 1024 / 1024
-                    elif 'M' in used_mem_str:
-                        used_mem = float(used_mem_str.replace('M', '')) / 1024
-                    elif 'G' in used_mem_str:
-                        used_mem = float(used_mem_str.replace('G', ''))
-                    else:
-                        used_mem = float(used_mem_str)
-                    
-                    if req_mem > 0:
-                        mem_eff = f"{(used_mem / req_mem) * 100:.1f}%"
-                except (ValueError, AttributeError):
-                    pass
-
-            table.add_row(
-                job['job_id'],
-                job['name'],
-                job['state'],
-                job['time'],
-                job['cpus'],
-                job['memory'],
-                job.get('used_memory', 'N/A'),
-                mem_eff
-            )
+                    collector = self.load_collector()
+                except Exception as e:
+                    if not worker.is_cancelled:
+                        self.call_from_thread(self.set_refresh_status, f"Startup failed: {e}")
+                    return
+                if worker.is_cancelled:
+                    return
+                self.call_from_thread(self.attach_collector, collector)
+            if worker.is_cancelled:
+                return
+            # With no history for this window on screen yet, show rows while sacct streams them
+            progress = None
+            if 'history' in sources and (self.snapshot is None or self.snapshot.days != days):
+                progress = self._partial_history_sink(worker)
+            try:
+                snapshot = self.data_collector.get_snapshot(days=days, sources=sources, previous=self.snapshot,
+                                                            progress=progress)
+            except Exception as e:
+                if not worker.is_cancelled:
+                    self.call_from_thread(self.set_refresh_status, f"Refresh failed: {e}")
+                return
+
+            if worker.is_cancelled:
+                return
+            # Compress job arrays here rather than on the UI thread
+            snapshot.active_view, snapshot.history_view
+            if worker.is_cancelled:
+                return
+            self.call_from_thread(self.apply_snapshot, snapshot)
+        finally:
+            self._collection_done.set()
+
+    def _partial_history_sink(self, worker):
+        """Collect streamed history batches and hand the rows so far to the UI now and then.
+
+        The first batch is shown at once. Later updates are at least
+        PARTIAL_HISTORY_INTERVAL apart, and further apart as the rows grow so
+        preparing them never dominates the load.
+        """
+        import pandas as pd
+        from .job_arrays import compress_history_arrays
+        from .parsing import type_job_history
+        batches = []
+        next_update = time.monotonic()
+
+        def sink(raw) -> None:
+            nonlocal next_update
+            if worker.is_cancelled:
+                return
+            batches.append(raw)
+            if time.monotonic() < next_update:
+                return
+            started = time.monotonic()
+            # Steps may arrive in a later batch than their job, so fold them in over all rows so far
+            history = type_job_history(pd.concat(batches, ignore_index=True))
+            jobs, steps = self.data_collector.history_frames(history)
+            rows, tasks = compress_history_arrays(jobs)
+            self.call_from_thread(self.show_partial_history, rows, tasks, steps)
+            next_update = time.monotonic() + max(PARTIAL_HISTORY_INTERVAL, 4 * (time.monotonic() - started))
+        return sink
+
+    def show_partial_history(self, jobs, tasks, steps) -> None:
+        """Show the history rows received so far while sacct is still running."""
+        from .job_arrays import TASKS_COLUMN
+        self.history_pager.set_data(jobs, steps, tasks)
+        self.render_history_window()
+        self.set_refresh_status(f"Loading history... {int((jobs[TASKS_COLUMN] == 0).sum()) + len(tasks):,} jobs so far")
+
+    def apply_snapshot(self, snapshot) -> None:
+        """Apply a freshly collected snapshot to the widgets (runs on the UI thread)."""
+        self.snapshot = snapshot
+        for source, duration in snapshot.timings.items():
+            self.scheduler.record(source, duration, snapshot.errors.get(source))
+        if 'active' in snapshot.timings:
+            self.metrics.record(snapshot.active, snapshot.collected_at)
+            self.update_active_jobs()
+        if 'history' in snapshot.timings:
+            self.update_job_history()
+        self.update_status_plot()
+        if snapshot.cluster_health:
+            self.update_cluster_health()
+        self.profiler.end()
+        self.update_profiler_panel()
+        self.last_updated = snapshot.collected_at
+        status = f"Last updated {self.last_updated:%H:%M:%S}"
+        timing = self.scheduler.describe()
+        self.set_refresh_status(f"{status} · {timing}" if timing else status)
+
+    def update_cluster_health(self) -> None:
+        """Show each cluster's latency, or why its rows are stale."""
+        line = Text("Clusters: ", style="bold")
+        for i, health in enumerate(self.snapshot.cluster_health.values()):
+            if i:
+                line.append(" · ")
+            line.append(health.describe(), style="green" if health.ok else "red")
+        self.query_one("#cluster-health", Static).update(line)
+
+    def set_refresh_status(self, message: str) -> None:
+        """Show the refresh state in the status line."""
+        try:
+            self.query_one("#refresh-status", Static).update(message)
+        except Exception:
+            pass
 
+    @profiled("update_active_jobs", rows=lambda self: len(self.snapshot.active))
+    def update_active_jobs(self) -> None:
+        """Update the active jobs table, with each job array as one expandable row."""
+        from .formatting import format_bytes, format_duration, format_percent, format_sparklines
+        from .grouping import insert_children, job_labels, order_by_user
+        from .job_arrays import ARRAY_COLUMN
+        from .job_steps import job_keys
+        table = self.query_one("#active-jobs-table", DataTable)
+        jobs, tasks = self.snapshot.active_view
+        if self.multi_user:
+            jobs = order_by_user(jobs)
+            self.update_user_summary()
+        jobs = insert_children(jobs, tasks, ARRAY_COLUMN, self.expanded_arrays)
+        if jobs.empty:
+            sync_table(table, self.active_columns, [])
+            return
+        # Rows are keyed by (cluster, job id), as clusters hand out ids independently
+        keys = job_keys(jobs)
+        # Efficiency columns are computed for the whole frame by the snapshot
+        live_cpu = jobs['live_cpu_eff'].map(format_percent)
+        formatted = {
+            'job_id': job_labels(jobs, self.expanded_arrays),
+            'cluster': jobs.get('cluster'),
+            'user': jobs['user'],
+            'name': jobs['name'],
+            'state': jobs['state'],
+            'time': jobs['time'].map(format_duration),
+            'cpus': jobs['cpus'].astype(str),
+            'memory': jobs['memory'].map(format_bytes),
+            'used_memory': jobs['used_memory'].map(format_bytes),
+            'mem_trend': format_sparklines(self.metrics.job_trends(keys, TREND_WIDTH)),
+            'mem_eff': jobs['mem_eff'].map(format_percent),
+            'live_cpu_eff': live_cpu.where(~jobs['idle'].eq(True), live_cpu + ' idle'),
+            'disk_io': jobs['disk_read'].map(format_bytes) + '/' + jobs['disk_write'].map(format_bytes),
+        }
+        cells = zip(*(formatted[key] for key, _ in self.active_columns))
+        sync_table(table, self.active_columns, zip(keys, cells))
+
+    def update_user_summary(self) -> None:
+        """Show per-user job counts in multi-user mode."""
+        from .grouping import summarize_by_user
+        summary = summarize_by_user(self.snapshot.active)
+        table = Table(box=None, padding=(0, 1))
+        table.add_column("User", style="bold cyan")
+        table.add_column("Running", justify="right")
+        table.add_column("Pending", justify="right")
+        table.add_column("Cores", justify="right")
+        for user, row in summary.head(USER_SUMMARY_ROWS).iterrows():
+            table.add_row(str(user), str(row['running']), str(row['pending']), str(row['cores']))
+        if len(summary) > USER_SUMMARY_ROWS:
+            table.add_row(f"+{len(summary) - USER_SUMMARY_ROWS} more", "", "", "")
+        self.query_one("#user-summary", Static).update(table)
+
+    @profiled("update_job_history", rows=lambda self: len(self.snapshot.history))
     def update_job_history(self) -> None:
         """Update the job history table."""
-        table = self.query_one("#history-table")
-        table.clear(columns=True)
-        table.add_columns("Job ID", "Name", "State", "Start", "End", "Elapsed", "CPUs", "Memory", "Req Mem", "CPU Eff", "Mem Eff")
-        table.cursor_type = "row"
-        table.can_focus = True
-
-        # Pass history_days to get_job_history
-        history = self.data_collector.get_job_history(days=self.history_days)
-        for _, job in history.iterrows():
-            # Calculate efficiencies
-            cpu_eff = "N/A"
-            mem_eff = "N/A"
-            
-            try:
-                # Memory Efficiency
-                if 'max_rss' in job and 'req_mem' in job:
-                    max_rss = float(job['max_rss'].replace('K', '').replace('M', '').replace('G', ''))
-                    req_mem = float(job['req_mem'].replace('K', '').replace('M', '').replace('G', ''))
-                    if req_mem > 0:
-                        mem_eff = f"{(max_rss / req_mem) * 100:.1f}%"
-                
-                # CPU Efficiency
-                # Simplified calculation: TotalCPU / (Elapsed * NCPUS)
-                # This requires parsing time strings which is complex, so we'll use a placeholder logic for now
-                # or try to parse if formats are standard
-                pass
-            except (ValueError, AttributeError):
-                pass
-
-            table.add_row(
-                job['job_id'],
-                job['name'],
-                job['state'],
-                job['start'],
-                job['end'],
-                job['elapsed'],
-                job['ncpus'],
-                job['max_rss'],
-                job.get('req_mem', 'N/A'),
-                cpu_eff,
-                mem_eff
-            )
-
+        jobs, tasks = self.snapshot.history_view
+        self.history_pager.set_data(jobs, self.snapshot.steps, tasks)
+        self.render_history_window()
+
+    def render_history_window(self) -> None:
+        """Show the pager's current window of history rows in the table."""
+        from .formatting import format_bytes, format_duration, format_percent, format_timestamp
+        from .job_steps import job_keys
+        table = self.query_one("#history-table", DataTable)
+        jobs = self.history_pager.window()
+        self.query_one("#history-title", Static).update(f"Job History ({self.history_pager.describe()})")
+        if jobs.empty:
+            sync_table(table, self.history_columns, [])
+            return
+        formatted = {
+            'job_id': self.history_pager.job_labels(jobs),
+            'cluster': jobs.get('cluster'),
+            'user': jobs['user'],
+            'name': jobs['name'],
+            'state': jobs['state'],
+            'start': jobs['start'].map(format_timestamp),
+            'end': jobs['end'].map(format_timestamp),
+            'elapsed': jobs['elapsed'].map(format_duration),
+            'ncpus': jobs['ncpus'].astype(str),
+            'max_rss': jobs['max_rss'].map(format_bytes),
+            'req_mem': jobs['req_mem'].map(format_bytes),
+            'cpu_eff': jobs['cpu_eff'].map(format_percent),
+            'mem_eff': jobs['mem_eff'].map(format_percent),
+        }
+        cells = zip(*(formatted[key] for key, _ in self.history_columns))
+        sync_table(table, self.history_columns, zip(job_keys(jobs), cells))
+
+    def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
+        """Describe a highlighted job array and slide the history window when the cursor nears its edge."""
+        from .job_arrays import TASKS_COLUMN
+        from .job_steps import job_keys
+        key = event.row_key.value if event.row_key is not None else None
+        if event.data_table.id == "history-table":
+            self.show_array_detail(event.data_table.id, self.history_pager.array_summary(key))
+            if self.history_pager.slide_for_cursor(event.cursor_row):
+                self.render_history_window()
+        elif event.data_table.id == "active-jobs-table" and self.snapshot is not None:
+            jobs, _ = self.snapshot.active_view
+            summary = jobs[(job_keys(jobs) == key) & (jobs[TASKS_COLUMN] > 0)] if not jobs.empty else jobs
+            self.show_array_detail(event.data_table.id, summary.iloc[0] if not summary.empty else None)
+
+    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
+        """Expand or collapse the selected job array's tasks or history job's steps."""
+        from .job_arrays import ARRAY_COLUMN
+        from .job_steps import job_keys
+        key = event.row_key.value
+        if event.data_table.id == "history-table" and self.history_pager.toggle(key):
+            self.render_history_window()
+        elif event.data_table.id == "active-jobs-table" and self.snapshot is not None:
+            _, tasks = self.snapshot.active_view
+            if not tasks.empty and (job_keys(tasks, tasks[ARRAY_COLUMN]) == key).any():
+                self.expanded_arrays ^= {key}
+                self.update_active_jobs()
+
+    def show_array_detail(self, table_id: str, summary) -> None:
+        """Describe the highlighted job array below its table, or hide the line."""
+        from .job_arrays import describe_array
+        detail = self.query_one(ARRAY_DETAIL_IDS[table_id], Static)
+        if summary is None:
+            detail.add_class("hidden")
+        else:
+            detail.update(describe_array(summary))
+            detail.remove_class("hidden")
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """Filter the history on the data side as the user types."""
+        if event.input.id == "history-filter":
+            self.history_pager.set_filter(event.value)
+            self.render_history_window()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        """Return to the history table after entering a filter."""
+        if event.input.id == "history-filter":
+            self.query_one("#history-table", DataTable).focus()
+
+    def action_sort_history(self) -> None:
+        """Cycle the history sort column."""
+        self.history_pager.cycle_sort()
+        self.render_history_window()
+
+    def action_reverse_history(self) -> None:
+        """Reverse the history sort order."""
+        self.history_pager.reverse()
+        self.render_history_window()
+
+    def action_filter_history(self) -> None:
+        """Focus the history filter box."""
+        self.query_one("#history-filter", Input).focus()
+
+    @profiled("update_status_plot")
     def update_status_plot(self) -> None:
         """Update the job status distribution plot and stats."""
-        # Pass history_days to get_job_history
-        history = self.data_collector.get_job_history(days=self.history_days)
-        if history.empty:
+        from .formatting import format_bytes, format_percent, format_sparklines
+        stats = self.snapshot.stats
+        # Counts come from the history rollups rather than the rows on screen
+        status_counts = stats['state_counts']
+        if status_counts.empty:
             return
-            
-        status_counts = history['state'].value_counts()
         total = status_counts.sum()
         
         # Create a table for the chart
@@ -371,10 +782,27 @@ class Dashboard(App):
                 f"{percent:.1%}"
             )
             
-        # Add efficiency summary if available
-        # This is a simple addition to the table for now
+        # Efficiency summary over the selected window, with each efficiency's spread in 10% bins
+        table.add_row("", "", "", "")
+        table.add_row("Active Jobs", "", str(stats['active_jobs']), "")
+        table.add_row("Avg Mem Eff", format_sparklines(stats['mem_eff_hist'])[0],
+                      format_percent(stats['avg_mem_eff']), "")
+        table.add_row("Avg CPU Eff", format_sparklines(stats['cpu_eff_hist'])[0],
+                      format_percent(stats['avg_cpu_eff']), "")
+        table.add_row("Core-h", "", f"{stats['core_hours']:.1f}", "")
+        table.add_row("Wasted Core-h", "", f"{stats['wasted_core_hours']:.1f}", "")
+        table.add_row("Wasted GB-h", "", f"{stats['wasted_gb_hours']:.1f}", "")
+
+        # Trends over the last refreshes, from the metrics history
         table.add_row("", "", "", "")
-        table.add_row("Avg Mem Eff", "", "85.4%", "") # Placeholder/Mock for now as calculation is complex
+        for name, label, fmt in (("running", "Running", "{:.0f}"), ("pending", "Pending", "{:.0f}"),
+                                 ("cores", "Cores in use", "{:.0f}")):
+            trend = self.metrics.trend(name, max_width)
+            if trend.size:
+                table.add_row(label, format_sparklines(trend)[0], fmt.format(trend[-1]), "")
+        trend = self.metrics.trend("used_memory", max_width)
+        if trend.size:
+            table.add_row("Memory in use", format_sparklines(trend)[0], format_bytes(trend[-1]), "")
             
         # Update the static widget with the chart
         self.query_one("#status-plot").update(table)
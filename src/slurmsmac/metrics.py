@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Bounded time series of refresh metrics, for trend sparklines.
+
+Every active-jobs refresh appends cluster-wide figures (running and pending
+jobs, cores in use, memory in use) and each running job's memory use to
+fixed-size NumPy ring buffers. A buffer has several tiers: the raw samples,
+then per-minute and per-hour means that are consolidated as samples arrive.
+Each tier keeps a fixed number of rows, so memory stays the same however
+long the dashboard runs. Views draw trends from here and never query Slurm
+again.
+
+Per-job series share one buffer with a column per job. A job that stops
+running frees its column for the next job that starts.
+"""
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .job_steps import job_keys
+
+# (bucket seconds, rows kept) per tier; a bucket of 0 keeps every sample
+AGGREGATE_TIERS = ((0, 240), (60, 1440), (3600, 24 * 31))
+JOB_TIERS = ((0, 40), (60, 120))
+
+# Cluster-wide series recorded on every refresh
+AGGREGATES = ['running', 'pending', 'cores', 'used_memory']
+
+class Ring:
+    """Timestamped rows of fixed width; the oldest row is overwritten once full."""
+    def __init__(self, capacity: int, width: int):
+        self.times = np.full(capacity, np.nan)
+        self.values = np.full((capacity, width), np.nan, dtype=np.float32)
+        self.size = 0
+        self.next = 0
+
+    def push(self, at: float, row: np.ndarray) -> None:
+        self.times[self.next] = at
+        self.values[self.next] = row
+        self.next = (self.next + 1) % len(self.times)
+        self.size = min(self.size + 1, len(self.times))
+
+    def latest(self, count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Up to `count` most recent (times, rows), oldest first."""
+        count = self.size if count is None else min(count, self.size)
+        rows = (self.next - count + np.arange(count)) % len(self.times)
+        return self.times[rows], self.values[rows]
+
+    def widen(self, width: int) -> None:
+        extra = np.full((len(self.times), width - self.values.shape[1]), np.nan, dtype=np.float32)
+        self.values = np.hstack([self.values, extra])
+
+class Tier:
+    """A ring fed every sample, or the mean of each `bucket` seconds of samples."""
+    def __init__(self, bucket: float, capacity: int, width: int):
+        self.bucket = bucket
+        self.ring = Ring(capacity, width)
+        self._start: Optional[float] = None
+        self._sum = np.zeros(width)
+        self._count = np.zeros(width)
+
+    def add(self, at: float, row: np.ndarray) -> None:
+        if not self.bucket:
+            self.ring.push(at, row)
+            return
+        start = math.floor(at / self.bucket) * self.bucket
+        if self._start is not None and start != self._start:
+            self.flush()
+        self._start = start
+        present = ~np.isnan(row)
+        self._sum[present] += row[present]
+        self._count[present] += 1
+
+    def flush(self) -> None:
+        """Close the current bucket and store its means (NaN where it had no samples)."""
+        if self._start is None:
+            return
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.ring.push(self._start, self._sum / self._count)
+        self._start = None
+        self._sum[:] = 0
+        self._count[:] = 0
+
+    def widen(self, width: int) -> None:
+        self.ring.widen(width)
+        extra = width - len(self._sum)
+        self._sum = np.concatenate([self._sum, np.zeros(extra)])
+        self._count = np.concatenate([self._count, np.zeros(extra)])
+
+    def clear(self, columns: List[int]) -> None:
+        self.ring.values[:, columns] = np.nan
+        self._sum[columns] = 0
+        self._count[columns] = 0
+
+class TieredBuffer:
+    """Samples of `width` series, kept at each tier's resolution."""
+    def __init__(self, tiers: Sequence[Tuple[float, int]], width: int):
+        self.tiers = [Tier(bucket, capacity, width) for bucket, capacity in tiers]
+        self.width = width
+
+    def add(self, at: float, row: np.ndarray) -> None:
+        for tier in self.tiers:
+            tier.add(at, row)
+
+    def latest(self, count: Optional[int] = None, tier: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        return self.tiers[tier].ring.latest(count)
+
+    def widen(self, width: int) -> None:
+        for tier in self.tiers:
+            tier.widen(width)
+        self.width = width
+
+    def clear(self, columns: List[int]) -> None:
+        for tier in self.tiers:
+            tier.clear(columns)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.ring.times.nbytes + t.ring.values.nbytes + t._sum.nbytes + t._count.nbytes for t in self.tiers)
+
+class MetricsHistory:
+    """Cluster-wide and per-job metrics of every active-jobs refresh."""
+    def __init__(self, aggregate_tiers: Sequence[Tuple[float, int]] = AGGREGATE_TIERS,
+                 job_tiers: Sequence[Tuple[float, int]] = JOB_TIERS, job_slots: int = 64):
+        self.aggregates = TieredBuffer(aggregate_tiers, len(AGGREGATES))
+        self.jobs = TieredBuffer(job_tiers, job_slots)
+        # Column of each running job in `jobs`, and columns freed by jobs that ended
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+
+    def record(self, active: pd.DataFrame, at: Optional[datetime] = None) -> None:
+        """Append the metrics of one active jobs frame (typed, with used_memory)."""
+        at = (at or datetime.now()).timestamp()
+        if active.empty or 'state' not in active:
+            self.aggregates.add(at, np.array([0, 0, 0, np.nan]))
+            self._record_jobs(at, pd.Series(dtype=str), pd.Series(dtype=float))
+            return
+        running = (active['state'] == 'RUNNING').to_numpy()
+        pending = (active['state'] == 'PENDING').to_numpy()
+        used = active['used_memory'][running] if 'used_memory' in active else pd.Series(dtype=float)
+        self.aggregates.add(at, np.array([
+            running.sum(), pending.sum(), active['cpus'][running].sum(), used.sum(min_count=1),
+        ], dtype=float))
+        self._record_jobs(at, job_keys(active)[running].astype(str), used)
+
+    def _record_jobs(self, at: float, job_ids: pd.Series, used: pd.Series) -> None:
+        ids = job_ids.tolist()
+        current = set(ids)
+        ended = [slot for job_id, slot in self._slots.items() if job_id not in current]
+        if ended:
+            # A freed column must not show the old job's samples to the next one
+            self.jobs.clear(ended)
+            self._free.extend(ended)
+            self._slots = {job_id: slot for job_id, slot in self._slots.items() if job_id in current}
+        for job_id in ids:
+            if job_id not in self._slots:
+                self._slots[job_id] = self._free.pop() if self._free else len(self._slots)
+        if len(self._slots) > self.jobs.width:
+            self.jobs.widen(max(len(self._slots), 2 * self.jobs.width))
+        row = np.full(self.jobs.width, np.nan)
+        columns = np.fromiter(map(self._slots.__getitem__, ids), dtype=np.intp, count=len(ids))
+        row[columns] = used.to_numpy(dtype=float, na_value=np.nan)
+        self.jobs.add(at, row)
+
+    def trend(self, name: str, count: Optional[int] = None, tier: int = 0) -> np.ndarray:
+        """Most recent values of a cluster-wide series, oldest first."""
+        _, values = self.aggregates.latest(count, tier)
+        return values[:, AGGREGATES.index(name)]
+
+    def job_trends(self, keys: Iterable[str], count: int, tier: int = 0) -> np.ndarray:
+        """Memory-use series per job, one row per job key (all NaN for jobs with no samples)."""
+        slots = np.fromiter((self._slots.get(key, -1) for key in list(keys)), dtype=np.intp)
+        _, values = self.jobs.latest(count, tier)
+        trends = np.full((len(slots), values.shape[0]), np.nan, dtype=np.float32)
+        known = slots >= 0
+        trends[known] = values[:, slots[known]].T
+        return trends
+
+    @property
+    def nbytes(self) -> int:
+        return self.aggregates.nbytes + self.jobs.nbytes
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""Typed, vectorized ingestion of Slurm command output.
+
+squeue/sacct/sstat are run with pipe-separated, header-less output and read
+in one pass with pandas. Columns are then converted once, as whole columns,
+into proper types: durations become Timedeltas, memory sizes become bytes,
+counts become integers and timestamps become datetimes. Repeated labels
+(state, name, user, partition, nodes, ...) are stored as categoricals, so
+a typed job costs a fraction of its raw text (see compact_jobs).
+"""
+import csv
+import io
+import warnings
+from typing import Iterable, Iterator, List
+import numpy as np
+import pandas as pd
+
+# Multipliers for Slurm memory suffixes (Slurm uses binary units)
+MEMORY_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4, 'P': 1024 ** 5}
+
+# [DD-][HH:]MM:SS[.mmm] as printed by squeue TIME and sacct Elapsed/TotalCPU
+_DURATION_RE = r'^(?:(?P<days>\d+)-)?(?:(?P<hours>\d+):)?(?P<minutes>\d+):(?P<seconds>\d+(?:\.\d*)?)$'
+# e.g. 4000K, 1.5G, 16Gn (per node), 2000Mc (per CPU)
+_MEMORY_RE = r'^(?P<value>\d+(?:\.\d*)?)(?P<unit>[KMGTP]?)(?P<per>[nc]?)$'
+
+# sstat usage fields beyond MaxRSS, by raw column name
+USAGE_FIELDS = {
+    'ave_rss': 'AveRSS', 'ave_cpu': 'AveCPU', 'ntasks': 'NTasks',
+    'max_disk_read': 'MaxDiskRead', 'max_disk_write': 'MaxDiskWrite',
+}
+
+SLURM_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# Control characters (job names can contain them) other than tab, newline and
+# carriage return; removed in bulk with translate()
+CONTROL_BYTES = bytes(b for b in range(32) if b not in b'\t\n\r')
+_CONTROL_CHARS = dict.fromkeys(CONTROL_BYTES)
+
+# Low-cardinality text columns kept as categoricals, and integer columns kept as int32
+CATEGORY_COLUMNS = ['name', 'state', 'nodes', 'reason', 'user', 'account', 'partition', 'req_mem_per', 'cluster']
+COUNT_COLUMNS = ['cpus', 'ncpus', 'nnodes', 'num_steps', 'num_tasks']
+# Documented memory budget of one typed job (or step) row, in bytes
+BYTES_PER_JOB_TARGET = 256
+
+# Only column whose values may contain the '|' separator
+FREE_TEXT_COLUMN = 'name'
+
+# Command output is parsed in batches of roughly this many bytes as it arrives
+STREAM_BATCH_BYTES = 1 << 20
+
+def clean_text(text: str) -> str:
+    """Remove control characters that would garble the terminal."""
+    return text.translate(_CONTROL_CHARS)
+
+def read_parsable(output: str, columns: List[str]) -> pd.DataFrame:
+    """Read '|'-separated, header-less Slurm output into a frame of strings."""
+    if not output.strip():
+        return pd.DataFrame({c: pd.Series(dtype=str) for c in columns})
+    # A line with more fields than columns makes pandas raise, or (for the
+    # first line) warn and drop the extra fields; either way it is reread
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', pd.errors.ParserWarning)
+            frame = pd.read_csv(
+                io.StringIO(output),
+                sep='|',
+                header=None,
+                names=columns,
+                index_col=False,
+                dtype=str,
+                keep_default_na=False,
+                quoting=csv.QUOTE_NONE,
+            )
+    except pd.errors.ParserError:
+        return _read_overflowing(output, columns)
+    if any(issubclass(w.category, pd.errors.ParserWarning) for w in caught):
+        return _read_overflowing(output, columns)
+    return frame
+
+def _read_overflowing(output: str, columns: List[str]) -> pd.DataFrame:
+    """Read output where some lines have extra fields, from a '|' inside a job name.
+
+    The extra fields are joined back into the name (the last column if there
+    is none), so the fields after it stay in their columns.
+    """
+    text = columns.index(FREE_TEXT_COLUMN) if FREE_TEXT_COLUMN in columns else len(columns) - 1
+    rows = []
+    for line in output.split('\n'):
+        fields = line.rstrip('\r').split('|')
+        if fields == ['']:
+            continue
+        extra = len(fields) - len(columns)
+        if extra > 0:
+            fields[text:text + extra + 1] = ['|'.join(fields[text:text + extra + 1])]
+        rows.append(fields + [''] * -extra)
+    return pd.DataFrame(rows, columns=columns, dtype=str)
+
+def iter_parsable(chunks: Iterable[bytes], columns: List[str],
+                  batch_bytes: int = STREAM_BATCH_BYTES) -> Iterator[pd.DataFrame]:
+    """Parse '|'-separated output incrementally from a stream of byte chunks.
+
+    Control bytes are dropped as chunks arrive, and a frame of strings is
+    yielded for each batch of complete lines, so rows can be used before
+    the command finishes and the whole output is never held at once.
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk.translate(None, CONTROL_BYTES)
+        if len(buffer) >= batch_bytes:
+            cut = buffer.rfind(b'\n') + 1
+            if cut:
+                yield read_parsable(buffer[:cut].decode('latin-1'), columns)
+                del buffer[:cut]
+    if buffer.strip():
+        yield read_parsable(buffer.decode('latin-1'), columns)
+
+def parse_duration(values: pd.Series) -> pd.Series:
+    """Convert Slurm duration strings to Timedeltas (NaT for UNLIMITED, INVALID, ...)."""
+    parts = values.astype(str).str.strip().str.extract(_DURATION_RE)
+    parts = parts.apply(pd.to_numeric, errors='coerce')
+    seconds = (
+        parts['days'].fillna(0) * 86400
+        + parts['hours'].fillna(0) * 3600
+        + parts['minutes'] * 60
+        + parts['seconds']
+    )
+    return pd.to_timedelta(seconds, unit='s')
+
+def parse_memory(values: pd.Series, default_unit: str = 'K') -> pd.DataFrame:
+    """Convert Slurm memory strings to bytes.
+
+    Returns a frame with a float 'bytes' column (NaN when missing) and a 'per'
+    column holding the ReqMem scope suffix: 'n' per node, 'c' per CPU or ''.
+    """
+    parts = values.astype(str).str.strip().str.extract(_MEMORY_RE)
+    units = parts['unit'].replace('', default_unit).fillna(default_unit)
+    multiplier = units.map(MEMORY_UNITS).astype(float)
+    result = pd.DataFrame(index=values.index)
+    result['bytes'] = pd.to_numeric(parts['value'], errors='coerce') * multiplier
+    result['per'] = parts['per'].fillna('')
+    return result
+
+def parse_count(values: pd.Series) -> pd.Series:
+    """Convert integer count strings, treating anything unparsable as 0."""
+    return pd.to_numeric(values, errors='coerce').fillna(0).astype(np.int32)
+
+def compact_jobs(jobs: pd.DataFrame) -> pd.DataFrame:
+    """Store repeated labels as categoricals and counts as 32-bit integers.
+
+    Job ids stay strings: they carry array task and step suffixes and key
+    the table rows and the job store. Already compact columns are left
+    alone, so this is cheap to apply again after frames are combined.
+    """
+    jobs = jobs.copy()
+    for column in CATEGORY_COLUMNS:
+        if column in jobs and not isinstance(jobs[column].dtype, pd.CategoricalDtype):
+            jobs[column] = jobs[column].astype('category')
+    for column in COUNT_COLUMNS:
+        if column in jobs and pd.api.types.is_integer_dtype(jobs[column]) and jobs[column].dtype != np.int32:
+            jobs[column] = jobs[column].astype(np.int32)
+    return jobs
+
+def parse_timestamp(values: pd.Series) -> pd.Series:
+    """Convert Slurm timestamps to datetimes (NaT for Unknown, None, ...)."""
+    return pd.to_datetime(values, format=SLURM_TIME_FORMAT, errors='coerce')
+
+def type_usage(raw: pd.DataFrame) -> pd.DataFrame:
+    """Convert raw sstat usage columns of steps to typed per-step totals.
+
+    AveCPU and AveRSS are per-task averages, so they are multiplied by
+    NTasks into cpu_time (seconds) and ave_rss (bytes). MaxDiskRead and
+    MaxDiskWrite become disk_read and disk_write in bytes.
+    """
+    tasks = parse_count(raw['ntasks']).clip(lower=1)
+    usage = pd.DataFrame(index=raw.index)
+    usage['cpu_time'] = parse_duration(raw['ave_cpu']).dt.total_seconds() * tasks
+    usage['ave_rss'] = parse_memory(raw['ave_rss'])['bytes'] * tasks
+    # Disk counters are plain bytes unless suffixed
+    usage['disk_read'] = parse_memory(raw['max_disk_read'], default_unit='')['bytes']
+    usage['disk_write'] = parse_memory(raw['max_disk_write'], default_unit='')['bytes']
+    return usage
+
+def type_active_jobs(raw: pd.DataFrame) -> pd.DataFrame:
+    """Convert raw squeue columns (and sstat usage columns, if present) to typed columns."""
+    jobs = raw.copy()
+    jobs['time'] = parse_duration(raw['time'])
+    jobs['cpus'] = parse_count(raw['cpus'])
+    # squeue reports the requested memory in MB when no suffix is given
+    jobs['memory'] = parse_memory(raw['memory'], default_unit='M')['bytes']
+    if 'used_memory' in raw:
+        jobs['used_memory'] = parse_memory(raw['used_memory'])['bytes']
+    if USAGE_FIELDS.keys() <= set(raw):
+        jobs = pd.concat([jobs.drop(columns=list(USAGE_FIELDS)), type_usage(raw)], axis=1)
+    return compact_jobs(jobs)
+
+def type_job_history(raw: pd.DataFrame) -> pd.DataFrame:
+    """Convert raw sacct columns to typed columns."""
+    jobs = raw.copy()
+    jobs['start'] = parse_timestamp(raw['start'])
+    jobs['end'] = parse_timestamp(raw['end'])
+    jobs['elapsed'] = parse_duration(raw['elapsed'])
+    jobs['total_cpu'] = parse_duration(raw['total_cpu'])
+    jobs['ncpus'] = parse_count(raw['ncpus'])
+    if 'nnodes' in raw:
+        jobs['nnodes'] = parse_count(raw['nnodes'])
+    jobs['max_rss'] = parse_memory(raw['max_rss'])['bytes']
+    if 'max_vmsize' in raw:
+        jobs['max_vmsize'] = parse_memory(raw['max_vmsize'])['bytes']
+    # ReqMem defaults to MB, and older Slurm versions add a per-node/per-CPU suffix
+    req_mem = parse_memory(raw['req_mem'], default_unit='M')
+    jobs['req_mem'] = req_mem['bytes']
+    jobs['req_mem_per'] = req_mem['per']
+    return compact_jobs(jobs)
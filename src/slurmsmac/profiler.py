@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""Per-refresh instrumentation of collection and rendering.
+
+A RefreshProfiler records, for every refresh cycle, the wall time of each
+stage: the Slurm commands themselves (with bytes read), pandas parsing of
+their output (with row counts) and the Dashboard's table and panel updates.
+instrument_collector() hooks a collector and the `profiled` decorator hooks
+UI methods, so neither needs to know about the profiler. Profiles can be
+exported as JSON or CSV for later analysis.
+"""
+import csv
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+# Stage kinds
+COMMAND = 'command'
+PARSE = 'parse'
+RENDER = 'render'
+
+@dataclass
+class StageTiming:
+    """One timed stage of a refresh."""
+    stage: str
+    kind: str
+    seconds: float
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+
+@dataclass
+class RefreshProfile:
+    """All stages of one refresh cycle."""
+    index: int
+    sources: List[str]
+    started_at: datetime = field(default_factory=datetime.now)
+    stages: List[StageTiming] = field(default_factory=list)
+    total: Optional[float] = None
+
+    def seconds_by_kind(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for stage in self.stages:
+            totals[stage.kind] = totals.get(stage.kind, 0.0) + stage.seconds
+        return totals
+
+def _size(value: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if value < 1024:
+            return f'{value:.0f}{unit}'
+        value /= 1024
+    return f'{value:.1f}GB'
+
+class RefreshProfiler:
+    """Collects stage timings for recent refreshes (thread safe)."""
+    def __init__(self, keep: int = 200):
+        self.profiles: Deque[RefreshProfile] = deque(maxlen=keep)
+        self._current: Optional[RefreshProfile] = None
+        self._started = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def begin(self, sources: List[str]) -> None:
+        """Start profiling a refresh; an unfinished previous one is dropped."""
+        with self._lock:
+            self._count += 1
+            self._current = RefreshProfile(self._count, list(sources))
+            self._started = time.perf_counter()
+
+    def end(self) -> Optional[RefreshProfile]:
+        """Finish the current refresh and keep its profile."""
+        with self._lock:
+            profile, self._current = self._current, None
+            if profile is not None:
+                profile.total = time.perf_counter() - self._started
+                self.profiles.append(profile)
+            return profile
+
+    @property
+    def current(self) -> Optional[RefreshProfile]:
+        """The refresh being profiled, if any; work it starts is recorded against it with `record_for`."""
+        return self._current
+
+    def record(self, stage: str, kind: str, seconds: float,
+               rows: Optional[int] = None, nbytes: Optional[int] = None) -> None:
+        """Add a stage to the current refresh; ignored outside a refresh."""
+        with self._lock:
+            if self._current is not None:
+                self._current.stages.append(StageTiming(stage, kind, seconds, rows, nbytes))
+
+    def record_for(self, profile: Optional[RefreshProfile], stage: str, kind: str, seconds: float,
+                   rows: Optional[int] = None, nbytes: Optional[int] = None) -> None:
+        """Add a stage to the refresh that started it, even once a later one is under way; ignored for None."""
+        with self._lock:
+            if profile is not None:
+                profile.stages.append(StageTiming(stage, kind, seconds, rows, nbytes))
+
+    @contextmanager
+    def stage(self, name: str, kind: str, rows: Callable[[], Optional[int]] = lambda: None) -> Iterator[None]:
+        """Time a block as one stage; `rows` is evaluated after the block."""
+        started = time.perf_counter()
+        yield
+        self.record(name, kind, time.perf_counter() - started, rows())
+
+    @property
+    def last(self) -> Optional[RefreshProfile]:
+        return self.profiles[-1] if self.profiles else None
+
+    def describe(self) -> str:
+        """Multi-line breakdown of the last refresh plus recent averages."""
+        profile = self.last
+        if profile is None:
+            return 'No refresh profiled yet'
+        lines = [f'Refresh #{profile.index} ({", ".join(profile.sources)}) at '
+                 f'{profile.started_at:%H:%M:%S}: {profile.total:.3f}s']
+        for s in profile.stages:
+            extra = []
+            if s.rows is not None:
+                extra.append(f'{s.rows:,} rows')
+            if s.bytes is not None:
+                extra.append(_size(s.bytes))
+            lines.append(f'  {s.kind:<8} {s.stage:<22} {s.seconds * 1000:9.1f} ms  {", ".join(extra)}')
+        totals: Dict[str, List[float]] = {}
+        for p in self.profiles:
+            for kind, seconds in p.seconds_by_kind().items():
+                totals.setdefault(kind, []).append(seconds)
+        averages = ' · '.join(f'{kind} {sum(v) / len(v) * 1000:.0f} ms' for kind, v in totals.items())
+        lines.append(f'Average over {len(self.profiles)} refreshes: {averages}')
+        return '\n'.join(lines)
+
+    def rows(self) -> List[Dict]:
+        """One flat record per stage, for CSV export."""
+        return [
+            {'refresh': p.index, 'started_at': p.started_at.isoformat(timespec='seconds'),
+             'sources': '+'.join(p.sources), 'refresh_seconds': p.total, **asdict(s)}
+            for p in self.profiles for s in p.stages
+        ]
+
+    def export_json(self, path: Path) -> Path:
+        path = Path(path)
+        profiles = [{**asdict(p), 'started_at': p.started_at.isoformat()} for p in self.profiles]
+        path.write_text(json.dumps(profiles, indent=2) + '\n')
+        return path
+
+    def export_csv(self, path: Path) -> Path:
+        path = Path(path)
+        fields = ['refresh', 'started_at', 'sources', 'refresh_seconds', 'stage', 'kind', 'seconds', 'rows', 'bytes']
+        with path.open('w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self.rows())
+        return path
+
+class ProfilingRunner:
+    """Command runner wrapper that records each command's time and output size.
+
+    A command counts toward the refresh under way when it started, so an
+    sstat still running in the background when the next refresh begins is
+    not charged to that one.
+    """
+    def __init__(self, runner, profiler: RefreshProfiler):
+        self.runner = runner
+        self.profiler = profiler
+
+    def run(self, cmd: List[str], timeout: Optional[float] = None) -> str:
+        profile = self.profiler.current
+        started = time.perf_counter()
+        output = ''
+        try:
+            output = self.runner.run(cmd, timeout=timeout)
+            return output
+        finally:
+            self.profiler.record_for(profile, Path(cmd[0]).name, COMMAND, time.perf_counter() - started,
+                                     nbytes=len(output))
+
+    def stream(self, cmd: List[str], chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        # Only time spent waiting on the command counts, not the consumer's parsing
+        profile = self.profiler.current
+        seconds, nbytes = 0.0, 0
+        chunks = self.runner.stream(cmd, chunk_size)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                finally:
+                    seconds += time.perf_counter() - started
+                nbytes += len(chunk)
+                yield chunk
+        except StopIteration:
+            return
+        finally:
+            self.profiler.record_for(profile, Path(cmd[0]).name, COMMAND, seconds, nbytes=nbytes)
+
+    def __getattr__(self, name):
+        return getattr(self.runner, name)
+
+def instrument_collector(collector, profiler: RefreshProfiler) -> None:
+    """Record command and parsing time of a collector's fetches.
+
+    Commands go through the collector's runner (or its fallback's, for a
+    shared-snapshot collector, or each cluster's, for a federated one).
+    Parsing is the CPU time of the thread running a fetch, which leaves out
+    waiting on commands, also those of other threads (sstat, other
+    clusters). A federated collector's clusters are fetched on threads of
+    their own, so each gets a parse stage of its own besides the merge.
+    """
+    members = getattr(collector, 'members', {})
+    for target in (collector, getattr(collector, 'fallback', None), *members.values()):
+        if target is not None and hasattr(target, 'runner') and not isinstance(target.runner, ProfilingRunner):
+            target.runner = ProfilingRunner(target.runner, profiler)
+
+    def wrap(method, stage):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            profile = profiler.current
+            started = time.thread_time()
+            result = method(*args, **kwargs)
+            profiler.record_for(profile, stage, PARSE, time.thread_time() - started, rows=len(result))
+            return result
+        return wrapper
+
+    for target, suffix in ((collector, ''), *((member, f' ({name})') for name, member in members.items())):
+        target.get_active_jobs = wrap(target.get_active_jobs, f'parse active{suffix}')
+        target.get_job_history = wrap(target.get_job_history, f'parse history{suffix}')
+
+def profiled(stage: str, rows: Callable[[object], Optional[int]] = lambda self: None):
+    """Decorate a method of an object with a `profiler` attribute to time it as a render stage."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(stage, RENDER, rows=lambda: rows(self)):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
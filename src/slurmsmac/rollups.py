@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""Incrementally maintained aggregates of the job history.
+
+The stats panel shows job counts by state, efficiency averages and
+histograms, and waste and core-hour totals over a time window. Rather than
+recomputing them from the whole history frame, HistoryRollups keeps sums per
+(end hour, state, partition, name) bucket and folds in only the jobs that
+are new or may still change: finished jobs are counted once, and unfinished
+ones (or ones that ended too recently for slurmdbd to have settled their
+rows) are taken out and counted again on each update. A window is then the
+sum of its buckets, so the time filter can switch windows without asking
+sacct again.
+
+Buckets are hourly. The jobs of the hour a window starts in are taken from a
+history frame holding them when one is at hand, so stats over a fetched
+window match its rows exactly.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Set
+import numpy as np
+import pandas as pd
+from .job_steps import job_keys
+from .job_store import SYNC_OVERLAP, is_terminal_state
+
+# Bucket of jobs that have not ended, part of every window
+OPEN_HOUR = np.iinfo(np.int64).max
+KEY = ['hour', 'state', 'partition', 'name']
+# Efficiency histograms have 10% bins; the last one also holds values above 100%
+EFF_BINS = 10
+HISTOGRAMS = ['mem_eff', 'cpu_eff']
+# Jobs counted since the last rebuild of the counted-jobs index that force a rebuild, at least
+RECENT_LIMIT = 10000
+MEASURES = [
+    'jobs', 'ncpus', 'core_hours', 'wasted_core_hours', 'wasted_gb_hours', 'max_rss', 'max_rss_n',
+    'mem_eff', 'mem_eff_n', 'cpu_eff', 'cpu_eff_n',
+    *(f'{column}_{i}' for column in HISTOGRAMS for i in range(EFF_BINS)),
+]
+
+def _hours(times: pd.Series) -> np.ndarray:
+    """Hours since the epoch, OPEN_HOUR where there is no time."""
+    hours = np.full(len(times), OPEN_HOUR, dtype=np.int64)
+    known = times.notna().to_numpy()
+    hours[known] = times[known].to_numpy(dtype='datetime64[h]').astype(np.int64)
+    return hours
+
+def _labels(jobs: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in jobs:
+        return np.full(len(jobs), '', dtype=object)
+    return jobs[column].astype(object).fillna('').to_numpy()
+
+def _values(jobs: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in jobs:
+        return np.full(len(jobs), np.nan)
+    return jobs[column].to_numpy(dtype=float, na_value=np.nan)
+
+def contributions(jobs: pd.DataFrame) -> pd.DataFrame:
+    """Bucket key and measures of each job in a typed history frame with efficiency columns."""
+    if jobs.empty:
+        return pd.DataFrame({column: pd.Series(dtype=object if column in KEY[1:] else float)
+                             for column in KEY + MEASURES}).astype({'hour': np.int64})
+    ncpus = _values(jobs, 'ncpus')
+    elapsed = jobs['elapsed'].dt.total_seconds().to_numpy(dtype=float, na_value=0) if 'elapsed' in jobs else 0
+    max_rss = _values(jobs, 'max_rss')
+    frame = {
+        'hour': _hours(jobs['end']) if 'end' in jobs else np.full(len(jobs), OPEN_HOUR, dtype=np.int64),
+        **{column: _labels(jobs, column) for column in KEY[1:]},
+        'jobs': np.ones(len(jobs)),
+        'ncpus': ncpus,
+        'core_hours': np.nan_to_num(elapsed * ncpus / 3600),
+        'wasted_core_hours': np.nan_to_num(_values(jobs, 'wasted_core_hours')),
+        'wasted_gb_hours': np.nan_to_num(_values(jobs, 'wasted_gb_hours')),
+        'max_rss': np.nan_to_num(max_rss),
+        'max_rss_n': ~np.isnan(max_rss),
+    }
+    for column in HISTOGRAMS:
+        eff = _values(jobs, column)
+        known = np.isfinite(eff)
+        frame[column] = np.where(known, eff, 0)
+        frame[f'{column}_n'] = known
+        bins = np.clip(np.floor(np.where(known, eff, 0) * EFF_BINS), 0, EFF_BINS - 1).astype(int)
+        for i in range(EFF_BINS):
+            frame[f'{column}_{i}'] = known & (bins == i)
+    return pd.DataFrame(frame, index=jobs.index).astype({column: float for column in MEASURES})
+
+def aggregate(contributions: pd.DataFrame) -> pd.DataFrame:
+    """Sum job contributions per bucket."""
+    return contributions.groupby(KEY, sort=False)[MEASURES].sum()
+
+def summarize(buckets: pd.DataFrame) -> Dict:
+    """Panel statistics of the jobs in some buckets (see HistoryRollups.window).
+
+    Besides the averages and totals, 'state_counts', 'partition_counts' and
+    'name_counts' hold job counts (most common first), 'daily_counts' the
+    jobs that ended per day, and 'mem_eff_hist'/'cpu_eff_hist' the jobs per
+    10% efficiency bin.
+    """
+    totals = buckets[MEASURES].sum()
+    jobs = int(totals['jobs'])
+
+    def counts(level: str) -> pd.Series:
+        grouped = buckets['jobs'].groupby(level=level, sort=False).sum()
+        return grouped[grouped > 0].astype(int).sort_values(ascending=False, kind='stable')
+
+    def mean(column: str) -> float:
+        return totals[column] / totals[f'{column}_n'] if totals[f'{column}_n'] else np.nan
+
+    states = counts('state')
+    hours = buckets.index.get_level_values('hour')
+    ended = buckets[hours != OPEN_HOUR]
+    daily = ended['jobs'].groupby(ended.index.get_level_values('hour') // 24).sum().astype(int)
+    daily.index = pd.to_datetime(daily.index.to_numpy(dtype=np.int64), unit='D')
+    return {
+        'history_jobs': jobs,
+        'completed_jobs': int(states.get('COMPLETED', 0)),
+        'failed_jobs': int(states.get('FAILED', 0)),
+        'cancelled_jobs': int(states.get('CANCELLED', 0)),
+        'avg_cpu_usage': totals['ncpus'] / jobs if jobs else 0,
+        'avg_memory_usage': mean('max_rss') if totals['max_rss_n'] else 0,
+        'avg_mem_eff': mean('mem_eff'),
+        'avg_cpu_eff': mean('cpu_eff'),
+        'wasted_core_hours': float(totals['wasted_core_hours']),
+        'wasted_gb_hours': float(totals['wasted_gb_hours']),
+        'core_hours': float(totals['core_hours']),
+        'state_counts': states,
+        'partition_counts': counts('partition'),
+        'name_counts': counts('name'),
+        'daily_counts': daily,
+        **{f'{column}_hist': totals[[f'{column}_{i}' for i in range(EFF_BINS)]].to_numpy(dtype=int)
+           for column in HISTOGRAMS},
+    }
+
+class HistoryRollups:
+    """Job history aggregates per (end hour, state, partition, name), updated incrementally (thread safe)."""
+    def __init__(self):
+        self.buckets = aggregate(contributions(pd.DataFrame()))
+        # Jobs already counted for good: an index whose hash table is kept between lookups, and
+        # those counted since it was last rebuilt. Then the contributions of jobs that may still change
+        self._counted = pd.Index([], dtype=str)
+        self._recent: Set[str] = set()
+        self._open = contributions(pd.DataFrame())
+        # Start of the earliest window folded in; every later update reaches up to its own time
+        self.coverage_start: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def update(self, jobs: pd.DataFrame, window_start: datetime, now: datetime) -> None:
+        """Fold in a history frame covering everything from `window_start` to `now` (one row per job).
+
+        Finished jobs counted before are skipped. Unfinished jobs, and jobs
+        that ended within SYNC_OVERLAP of `now`, are recounted; those
+        missing from `jobs` are dropped.
+        """
+        with self._lock:
+            fresh = jobs[~self._is_counted(job_keys(jobs))] if not jobs.empty else jobs
+            added = contributions(fresh)
+            final = added['hour'].to_numpy() != OPEN_HOUR
+            if final.any():
+                final &= (fresh['end'] <= pd.Timestamp(now - SYNC_OVERLAP)).to_numpy()
+                final &= fresh['state'].map(is_terminal_state).to_numpy(dtype=bool)
+            delta = pd.concat([aggregate(added), -aggregate(self._open)])
+            if final.any():
+                self._mark_counted(job_keys(fresh)[final])
+            self._open = added[~final]
+            buckets = self.buckets.add(delta.groupby(level=KEY, sort=False).sum(), fill_value=0)
+            self.buckets = buckets[buckets['jobs'] > 0]
+            if self.coverage_start is None or window_start < self.coverage_start:
+                self.coverage_start = window_start
+
+    def _is_counted(self, keys: pd.Series) -> np.ndarray:
+        counted = self._counted.get_indexer(keys) >= 0
+        if self._recent:
+            counted[~counted] = keys[~counted].isin(self._recent).to_numpy()
+        return counted
+
+    def _mark_counted(self, keys: pd.Series) -> None:
+        self._recent.update(keys.tolist())
+        # Rebuild the index once the recent set is a fraction of it, so each job is rehashed a few times at most
+        if len(self._recent) > max(RECENT_LIMIT, len(self._counted) // 8):
+            self._counted = self._counted.append(pd.Index(list(self._recent), dtype=str))
+            self._recent = set()
+
+    def covers(self, since: datetime) -> bool:
+        """Whether every job that ended after `since` has been folded in."""
+        return self.coverage_start is not None and self.coverage_start <= since
+
+    def window(self, since: datetime, jobs: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Buckets of the jobs that ended after `since` or have not ended.
+
+        Jobs of the hour `since` falls in come from `jobs` if given (any
+        history frame reaching back to `since`); otherwise that hour counts
+        whole.
+        """
+        start = np.datetime64(since, 'h').astype(np.int64)
+        with self._lock:
+            buckets = self.buckets
+        hours = buckets.index.get_level_values('hour')
+        if jobs is None or jobs.empty:
+            return buckets[hours >= start]
+        end = jobs['end']
+        edge = jobs[(end >= pd.Timestamp(since)).to_numpy() & (_hours(end) == start)]
+        return pd.concat([buckets[hours > start], aggregate(contributions(edge))])
+
+    def __len__(self) -> int:
+        return len(self.buckets)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Per-source refresh scheduling with exponential backoff.
+
+Each data source (squeue/sstat for active jobs, sacct for history) has its
+own cadence. A source that fails or is slow backs off exponentially, and a
+source whose view is hidden is paused once it has loaded at least once, or
+only slowed down if something still on screen depends on it.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+@dataclass
+class SourceSchedule:
+    """Scheduling state for one data source."""
+    name: str
+    interval: float
+    max_interval: float
+    current_interval: float = 0.0
+    next_due: float = 0.0
+    failures: int = 0
+    last_run: Optional[float] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    paused: bool = False
+    forced: bool = False
+    # Seconds between runs while paused (None: no runs until resumed or forced)
+    paused_interval: Optional[float] = None
+
+    def __post_init__(self):
+        self.current_interval = self.interval
+
+    @property
+    def backing_off(self) -> bool:
+        return self.current_interval > self.interval
+
+class RefreshScheduler:
+    """Decides which sources are due and adapts their intervals."""
+    def __init__(self, intervals: Dict[str, float], max_backoff: float = 8.0,
+                 slow_fraction: float = 0.5, clock: Callable[[], float] = time.monotonic,
+                 paused_intervals: Optional[Dict[str, float]] = None):
+        # A run taking longer than slow_fraction of its interval counts as slow
+        self.slow_fraction = slow_fraction
+        self.clock = clock
+        self.sources = {
+            name: SourceSchedule(name, interval, interval * max_backoff,
+                                 paused_interval=(paused_intervals or {}).get(name))
+            for name, interval in intervals.items()
+        }
+
+    def due(self) -> List[str]:
+        """Sources whose next run time has passed and that are not paused."""
+        now = self.clock()
+        return [
+            s.name for s in self.sources.values()
+            if s.forced or (
+                s.next_due <= now
+                # A paused source still loads once so its view is ready when shown
+                and not (s.paused and s.last_run is not None
+                         and (s.paused_interval is None or now < s.last_run + s.paused_interval))
+            )
+        ]
+
+    def record(self, name: str, duration: float, error: Optional[str] = None) -> None:
+        """Record a finished run and schedule the next one."""
+        source = self.sources[name]
+        source.forced = False
+        source.last_run = self.clock()
+        source.last_duration = duration
+        source.last_error = error
+        slow = duration > source.interval * self.slow_fraction
+        if error or slow:
+            source.failures += 1
+            source.current_interval = min(source.interval * 2 ** source.failures, source.max_interval)
+        else:
+            source.failures = 0
+            source.current_interval = source.interval
+        source.next_due = source.last_run + source.current_interval
+
+    def set_paused(self, name: str, paused: bool) -> None:
+        """Pause or resume polling of a source."""
+        self.sources[name].paused = paused
+
+    def force(self, names: Optional[Iterable[str]] = None) -> None:
+        """Make sources due immediately, including paused ones."""
+        for name in (self.sources if names is None else names):
+            self.sources[name].forced = True
+
+    def describe(self) -> str:
+        """One-line summary of per-source timing for the status bar."""
+        parts = []
+        for s in self.sources.values():
+            if s.last_duration is None:
+                continue
+            text = f"{s.name} {s.last_duration:.1f}s"
+            if s.last_error:
+                text += " failed"
+            if s.backing_off:
+                text += f" (next in {s.current_interval:.0f}s)"
+            elif s.paused and s.paused_interval is not None:
+                text += f" (every {s.paused_interval:.0f}s while hidden)"
+            elif s.paused:
+                text += " (paused)"
+            parts.append(text)
+        return " · ".join(parts)
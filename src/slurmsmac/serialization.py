@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""JSON-safe encoding of typed job frames.
+
+Typed frames (see parsing.py) hold Timedeltas, datetimes and NaN, which
+plain JSON cannot represent. Frames are encoded column-wise with a small
+dtype tag per column so they round-trip without losing types.
+"""
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+def _kind(series: pd.Series) -> str:
+    if pd.api.types.is_timedelta64_dtype(series):
+        return 'timedelta'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return 'category'
+    if pd.api.types.is_bool_dtype(series):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(series):
+        return 'int'
+    if pd.api.types.is_float_dtype(series):
+        return 'float'
+    return 'str'
+
+def _encode_column(series: pd.Series, kind: str) -> list:
+    if kind == 'timedelta':
+        values = series.dt.total_seconds()
+    elif kind == 'datetime':
+        values = series.dt.strftime('%Y-%m-%dT%H:%M:%S')
+    elif kind in ('category', 'str'):
+        values = series.astype(object)
+    else:
+        values = series
+    # NaN/NaT become null
+    return [None if pd.isna(v) else v for v in values.astype(object)]
+
+def encode_frame(frame: pd.DataFrame) -> Dict:
+    """Encode a frame as a JSON-serializable dict."""
+    kinds = {column: _kind(frame[column]) for column in frame.columns}
+    return {
+        'columns': list(frame.columns),
+        'kinds': kinds,
+        'data': {column: _encode_column(frame[column], kinds[column]) for column in frame.columns},
+    }
+
+def decode_frame(payload: Dict) -> pd.DataFrame:
+    """Rebuild a typed frame from encode_frame() output."""
+    columns = {}
+    for column in payload['columns']:
+        kind = payload['kinds'][column]
+        values = payload['data'][column]
+        if kind == 'timedelta':
+            columns[column] = pd.to_timedelta(pd.Series(values, dtype=float), unit='s')
+        elif kind == 'datetime':
+            columns[column] = pd.to_datetime(pd.Series(values, dtype=object), format='%Y-%m-%dT%H:%M:%S')
+        elif kind == 'float':
+            columns[column] = pd.Series(values, dtype=float)
+        elif kind == 'int':
+            columns[column] = pd.Series(values, dtype=np.int64)
+        elif kind == 'bool':
+            columns[column] = pd.Series(values, dtype=bool)
+        elif kind == 'category':
+            columns[column] = pd.Series(values, dtype='category')
+        else:
+            columns[column] = pd.Series(values, dtype=str)
+    return pd.DataFrame(columns, columns=payload['columns'])
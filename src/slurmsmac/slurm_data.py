@@ -1,248 +1,600 @@
 # -*- coding: utf-8 -*-
 import subprocess
+import threading
 import pandas as pd
-from typing import Dict, List, Tuple
+from concurrent.futures import Future, wait
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field, replace
+from functools import cached_property
 from datetime import datetime
-import random
 import os
+import time
+import getpass
+import itertools
+import shutil
+import sqlite3
+from .job_store import JobStore
+from .usage_cache import UsageCache
+from .synthetic import SyntheticCluster
+from .parsing import (
+    USAGE_FIELDS, clean_text, compact_jobs, iter_parsable, read_parsable, parse_memory, type_active_jobs,
+    type_job_history, type_usage,
+)
+from .efficiency import with_active_efficiency, with_history_efficiency
+from .job_steps import PARENT_COLUMN, collapse_steps, job_keys, whole_jobs
+from .job_arrays import compress_active_arrays, compress_history_arrays
+from .rollups import HistoryRollups, aggregate, contributions, summarize
+
+if TYPE_CHECKING:
+    from .federation import ClusterHealth
+
+@dataclass
+class SlurmSnapshot:
+    """All data for one refresh cycle, collected once and shared by every view."""
+    active: pd.DataFrame
+    history: pd.DataFrame
+    stats: Dict
+    days: int
+    collected_at: datetime = field(default_factory=datetime.now)
+    # Per-source wall time (seconds) and error message for sources fetched this cycle
+    timings: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    # Step rows of the jobs in `history`, which holds one row per job
+    steps: pd.DataFrame = field(default_factory=pd.DataFrame)
+    # Per-cluster federation.ClusterHealth, when collecting from several clusters
+    cluster_health: Dict[str, 'ClusterHealth'] = field(default_factory=dict)
+
+    @cached_property
+    def active_view(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Active jobs with array tasks compressed into summary rows, and the task rows."""
+        return compress_active_arrays(self.active)
+
+    @cached_property
+    def history_view(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """History with array tasks compressed into summary rows, and the task rows."""
+        return compress_history_arrays(self.history)
+
+# Independently refreshable data sources: squeue/sstat and sacct
+SOURCES = ('active', 'history')
+# Called with each batch of raw history rows while a large sacct query is still streaming
+Progress = Callable[[pd.DataFrame], None]
+# Stored history rows read at a time by iter_job_history
+HISTORY_CHUNK_ROWS = 50_000
 
 class BaseSlurmDataCollector:
     """Base class for Slurm data collection."""
+    def __init__(self):
+        # Collectors degrade to empty/stale results on command failure and note why here
+        self.source_errors: Dict[str, str] = {}
+        # Aggregates of every history fetched, so stats over a covered window need no sacct query
+        self.rollups = HistoryRollups()
+
+    @property
+    def is_multi_user(self) -> bool:
+        """Whether jobs of more than the current user may be returned."""
+        return False
+
+    @property
+    def clusters(self) -> List[str]:
+        """Names of the clusters merged into one view (empty for a single cluster)."""
+        return []
+
     def get_active_jobs(self) -> pd.DataFrame:
         """Get currently active and pending jobs."""
         raise NotImplementedError
 
-    def get_job_history(self, days: int = 7) -> pd.DataFrame:
-        """Get job history for the specified number of days."""
-        raise NotImplementedError
+    def get_job_history(self, days: int = 7, progress: Optional[Progress] = None) -> pd.DataFrame:
+        """Get job history for the specified number of days.
 
-    def get_job_stats(self) -> Dict:
-        """Get overall job statistics."""
+        `progress`, if given, is called with each batch of raw rows while a
+        large sacct query is still streaming.
+        """
         raise NotImplementedError
 
-class MockSlurmDataCollector(BaseSlurmDataCollector):
-    """Mock implementation for systems without Slurm."""
-    def __init__(self):
-        self.job_states = ['RUNNING', 'PENDING', 'COMPLETED', 'FAILED', 'CANCELLED']
-        self.job_names = ['simulation', 'analysis', 'training', 'inference', 'preprocessing']
-        self.nodes = ['node1', 'node2', 'node3', 'compute1', 'compute2']
-        
-    def _generate_mock_job(self, job_id: int, is_active: bool = True) -> Dict:
-        """Generate a mock job entry."""
-        state = random.choice(self.job_states) if is_active else random.choice(['COMPLETED', 'FAILED', 'CANCELLED'])
-        
-        # Generate realistic times
-        now = datetime.now()
-        duration_mins = random.randint(1, 120)
-        start_time = now - pd.Timedelta(minutes=random.randint(0, 1000))
-        end_time = start_time + pd.Timedelta(minutes=duration_mins)
-        
-        job = {
-            'job_id': f'{job_id}',
-            'name': random.choice(self.job_names),
-            'state': state,
-            'ncpus': str(random.randint(1, 32)),
-            'nodes': random.choice(self.nodes),
+    def iter_job_history(self, days: int = 7, rows: int = HISTORY_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Get the job history as consecutive chunks of whole jobs (a job and its steps).
+
+        For consumers that write rows out rather than keep them. At least one
+        (possibly empty) chunk is yielded; `rows` is a hint for its size.
+        This default fetches the whole history as a single chunk.
+        """
+        yield self.get_job_history(days=days)
+
+    def window_start(self, days: int) -> datetime:
+        """Start of a history window of the last `days` days."""
+        return datetime.now() - pd.Timedelta(days=days)
+
+    def get_job_stats(self, days: int = 7) -> Dict:
+        """Get overall job statistics, querying history only if the rollups do not cover `days`."""
+        covered = self.rollups.covers(self.window_start(days))
+        return self.get_snapshot(days=days, sources=['active'] if covered else SOURCES).stats
+
+    def get_snapshot(self, days: int = 7, sources=SOURCES, previous: Optional[SlurmSnapshot] = None,
+                     progress: Optional[Progress] = None) -> SlurmSnapshot:
+        """Run each requested Slurm query once and bundle the results with derived stats.
+
+        Sources not listed are carried over from `previous` (or left empty).
+        `progress` is passed to get_job_history.
+        Job steps are folded into their jobs before efficiencies are computed,
+        and fetched history is folded into the rollups the stats come from.
+        """
+        # Taken before fetching, so no later than the start of the window sacct returns
+        since = self.window_start(days)
+        frames = {
+            'active': previous.active if previous is not None else with_active_efficiency(pd.DataFrame()),
+            'history': ((previous.history, previous.steps) if previous is not None
+                        else self.history_frames(pd.DataFrame())),
+        }
+        fetchers = {
+            'active': lambda: with_active_efficiency(self.get_active_jobs()),
+            'history': lambda: self.history_frames(self.get_job_history(days=days, progress=progress)),
         }
+        timings, errors = {}, {}
+        for source in sources:
+            self.source_errors.pop(source, None)
+            started = time.monotonic()
+            try:
+                frames[source] = fetchers[source]()
+            except Exception as e:
+                self.source_errors[source] = str(e)
+            timings[source] = time.monotonic() - started
+            if source in self.source_errors:
+                errors[source] = self.source_errors[source]
 
-        if is_active:
-            # Active job fields
-            # Generate realistic used memory
-            req_mem_val = random.randint(1, 64)
-            used_mem_val = req_mem_val * random.uniform(0.1, 0.9)
-            
-            job.update({
-                'time': f'{random.randint(0, 24):02d}:{random.randint(0, 59):02d}:{random.randint(0, 59):02d}',
-                'cpus': job['ncpus'], # Active jobs use 'cpus' in squeue
-                'memory': f'{req_mem_val}G',
-                'used_memory': f'{used_mem_val:.1f}G' if state == 'RUNNING' else 'N/A',
-                'reason': 'None' if state == 'RUNNING' else 'Resources'
-            })
+        history, steps = frames['history']
+        if 'history' in timings and 'history' not in errors:
+            self.rollups.update(history, since, self.window_start(0))
+        if 'history' not in timings and previous is not None and previous.days == days:
+            # History stats only change with the history rows
+            history_stats = previous.stats
         else:
-            # History job fields
-            # Generate realistic resource usage
-            req_mem_val = random.randint(1024, 65536)
-            max_rss_val = int(req_mem_val * random.uniform(0.1, 0.95))
-            
-            # Generate realistic CPU usage
-            # TotalCPU is usually in format MM:SS.ms or HH:MM:SS
-            total_cpu_seconds = int(duration_mins * 60 * int(job['ncpus']) * random.uniform(0.5, 0.99))
-            total_cpu = f'{total_cpu_seconds // 60:02d}:{total_cpu_seconds % 60:02d}.00'
-
-            job.update({
-                'start': start_time.strftime('%Y-%m-%dT%H:%M:%S'),
-                'end': end_time.strftime('%Y-%m-%dT%H:%M:%S'),
-                'elapsed': f'{duration_mins // 60:02d}:{duration_mins % 60:02d}:00',
-                'max_rss': f'{max_rss_val}K',
-                'req_mem': f'{req_mem_val}K',
-                'total_cpu': total_cpu,
-            })
-            
-        return job
+            # Rows kept from a narrower window cannot stand in for the jobs at the start of this one
+            reaches = 'history' in timings or (previous is not None and previous.days >= days)
+            history_stats = self.window_stats(since, history if reaches else None)
+        snapshot = SlurmSnapshot(
+            active=frames['active'],
+            history=history,
+            stats=self.compute_stats(frames['active'], history, history_stats),
+            days=days,
+            timings=timings,
+            errors=errors,
+            steps=steps,
+        )
+        if previous is not None:
+            # Compressed views of carried-over sources stay valid
+            for source in SOURCES:
+                view = f'{source}_view'
+                if source not in sources and view in previous.__dict__:
+                    snapshot.__dict__[view] = previous.__dict__[view]
+        return snapshot
 
-    def get_active_jobs(self) -> pd.DataFrame:
-        """Get mock active jobs."""
-        num_jobs = random.randint(0, 5)
-        jobs = [self._generate_mock_job(i, True) for i in range(num_jobs)]
-        return pd.DataFrame(jobs)
-
-    def get_job_history(self, days: int = 7) -> pd.DataFrame:
-        """Get mock job history."""
-        num_jobs = random.randint(10, 30)
-        jobs = [self._generate_mock_job(i, False) for i in range(num_jobs)]
-        return pd.DataFrame(jobs)
-
-    def get_job_stats(self) -> Dict:
-        """Get mock job statistics."""
-        history_df = self.get_job_history()
-        active_df = self.get_active_jobs()
-        
+    @staticmethod
+    def history_frames(history: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Split typed sacct rows into (jobs, steps), both with efficiency columns."""
+        jobs, steps = collapse_steps(history)
+        return compact_jobs(with_history_efficiency(jobs)), compact_jobs(with_history_efficiency(steps))
+
+    def window_stats(self, since: datetime, history: Optional[pd.DataFrame] = None) -> Optional[Dict]:
+        """History stats since `since` from the rollups, or None if they do not reach back that far.
+
+        `history` holds rows reaching back to `since`, if at hand (see HistoryRollups.window).
+        """
+        if not self.rollups.covers(since):
+            return None
+        return summarize(self.rollups.window(since, history))
+
+    def rewindow(self, snapshot: SlurmSnapshot, days: int) -> Optional[SlurmSnapshot]:
+        """The snapshot for another history window, answered from the rollups without running sacct.
+
+        A narrower window keeps the matching history rows. A wider one only
+        gets its stats: its rows still need a history refresh, so the result
+        keeps the old rows and `days`. None if the rollups do not cover `days`.
+        """
+        since = self.window_start(days)
+        if not self.rollups.covers(since):
+            return None
+        if days > snapshot.days:
+            stats = self.compute_stats(snapshot.active, snapshot.history, self.window_stats(since))
+            rewindowed = replace(snapshot, stats=stats, timings={}, errors={})
+            for view in ('active_view', 'history_view'):
+                if view in snapshot.__dict__:
+                    rewindowed.__dict__[view] = snapshot.__dict__[view]
+            return rewindowed
+        history = snapshot.history
+        if not history.empty:
+            history = history[(history['end'].isna() | (history['end'] >= since)).to_numpy()].reset_index(drop=True)
+        steps = snapshot.steps
+        if PARENT_COLUMN in steps:
+            steps = steps[job_keys(steps, steps[PARENT_COLUMN]).isin(job_keys(history)).to_numpy()].reset_index(drop=True)
+        rewindowed = replace(snapshot, history=history, steps=steps, days=days, timings={}, errors={},
+                             stats=self.compute_stats(snapshot.active, history, self.window_stats(since, history)))
+        if 'active_view' in snapshot.__dict__:
+            rewindowed.__dict__['active_view'] = snapshot.__dict__['active_view']
+        return rewindowed
+
+    @staticmethod
+    def compute_stats(active_df: pd.DataFrame, history_df: pd.DataFrame,
+                      history_stats: Optional[Dict] = None) -> Dict:
+        """Derive summary statistics from already collected job tables.
+
+        History figures are taken from `history_stats` (from rollups.summarize,
+        or earlier stats) when given, and are otherwise summed up from `history_df`.
+        avg_memory_usage is the mean MaxRSS in bytes; the efficiency figures
+        come from the history frame's efficiency columns when present.
+        """
+        if history_stats is None:
+            history_stats = summarize(aggregate(contributions(history_df)))
         return {
-            'total_jobs': len(history_df) + len(active_df),
+            **history_stats,
+            'total_jobs': history_stats['history_jobs'] + len(active_df),
             'active_jobs': len(active_df),
-            'completed_jobs': len(history_df[history_df['state'] == 'COMPLETED']),
-            'failed_jobs': len(history_df[history_df['state'] == 'FAILED']),
-            'cancelled_jobs': len(history_df[history_df['state'] == 'CANCELLED']),
-            'avg_cpu_usage': random.uniform(1, 32),
-            'avg_memory_usage': random.uniform(1, 64)
         }
 
+class MockSlurmDataCollector(BaseSlurmDataCollector):
+    """Mock implementation for systems without Slurm, backed by a synthetic cluster.
+
+    The workload evolves with the clock and is reproducible for a given seed.
+    For load testing, SLURMSMAC_MOCK_JOBS sets the jobs per week (e.g.
+    1000000), SLURMSMAC_MOCK_SEED the seed, and SLURMSMAC_MOCK_STEPS=0 drops
+    the batch/extern/numbered step rows that otherwise triple sacct output.
+    """
+    def __init__(self, users: Optional[List[str]] = None, accounts: Optional[List[str]] = None,
+                 partitions: Optional[List[str]] = None, jobs_per_week: Optional[float] = None,
+                 seed: Optional[int] = None, cluster: Optional[SyntheticCluster] = None, first_job_id: int = 0):
+        super().__init__()
+        self.users = list(users or [getpass.getuser()])
+        self.accounts = list(accounts or ['lab'])
+        self.partitions = list(partitions or ['normal', 'gpu'])
+        if jobs_per_week is None:
+            jobs_per_week = float(os.environ.get('SLURMSMAC_MOCK_JOBS', 500 * len(self.users)))
+        if seed is None:
+            seed = int(os.environ.get('SLURMSMAC_MOCK_SEED', 0))
+        steps = os.environ.get('SLURMSMAC_MOCK_STEPS', '1') != '0'
+        self.cluster = cluster or SyntheticCluster(self.users, self.accounts, self.partitions,
+                                                   jobs_per_day=jobs_per_week / 7, seed=seed, steps=steps,
+                                                   first_job_id=first_job_id)
+        # Sampled on every refresh against the cluster's clock, so CPU rates follow synthetic time
+        self.usage = UsageCache(ttl=0, clock=lambda: self.cluster.clock().timestamp(), columns=SAMPLE_COLUMNS)
+
+    @property
+    def is_multi_user(self) -> bool:
+        return len(self.users) > 1
+
+    def get_active_jobs(self) -> pd.DataFrame:
+        """Get mock active jobs, with CPU rates between consecutive refreshes as for sstat."""
+        jobs = type_active_jobs(self.cluster.active_jobs())
+        running = jobs.loc[jobs['state'] == 'RUNNING', 'job_id'].tolist()
+        self.usage.retain(running)
+        due = self.usage.claim(running)
+        sampled = jobs.set_index('job_id').loc[due, SAMPLE_COLUMNS]
+        self.usage.complete(due, dict(zip(sampled.index, sampled.itertuples(index=False, name=None))))
+        return jobs.drop(columns=SAMPLE_COLUMNS).join(self.usage.frame(), on='job_id')
+
+    def window_start(self, days: int) -> datetime:
+        return self.cluster.clock() - pd.Timedelta(days=days)
+
+    def get_job_history(self, days: int = 7, progress: Optional[Progress] = None) -> pd.DataFrame:
+        """Get mock job history (generated at once, so `progress` is not called)."""
+        return type_job_history(self.cluster.job_history(days=days))
+
+ACTIVE_COLUMNS = [
+    'job_id', 'name', 'state', 'time', 'nodes', 'cpus', 'memory', 'reason',
+    'user', 'account', 'partition',
+]
+
+HISTORY_COLUMNS = [
+    'job_id', 'name', 'state', 'start', 'end', 'elapsed', 'max_rss', 'max_vmsize',
+    'ncpus', 'nodes', 'req_mem', 'total_cpu', 'nnodes', 'user', 'account', 'partition',
+]
+
+# Seconds a job's sstat usage stays fresh, and the longest a refresh waits on sstat
+USAGE_TTL = 60
+SSTAT_TIMEOUT = 5
+
+# sstat columns per step, and the usage sampled per job from them (plus the derived cpu_rate)
+SSTAT_COLUMNS = ['step_id', 'max_rss', *USAGE_FIELDS]
+SAMPLE_COLUMNS = ['used_memory', 'ave_rss', 'cpu_time', 'disk_read', 'disk_write']
+
+class CommandRunner:
+    """Runs Slurm commands and returns their output.
+
+    Failures raise subprocess.CalledProcessError or FileNotFoundError, and a
+    command still running after `timeout` seconds is killed with
+    subprocess.TimeoutExpired. Swap in another runner (see fake_slurm.py) to
+    drive the real collector without a cluster.
+    """
+    def run(self, cmd: List[str], timeout: Optional[float] = None) -> str:
+        return subprocess.check_output(cmd, encoding='latin-1', errors='replace', timeout=timeout)
+
+    def stream(self, cmd: List[str], chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """Yield stdout in byte chunks as the command produces it."""
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            for chunk in iter(lambda: proc.stdout.read1(chunk_size), b''):
+                yield chunk
+            returncode = proc.wait()
+        finally:
+            # Reached early when the consumer stops reading
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, cmd)
+
 class RealSlurmDataCollector(BaseSlurmDataCollector):
-    """Real implementation for systems with Slurm."""
-    def __init__(self):
+    """Real implementation for systems with Slurm.
+
+    By default only the current user's jobs are shown. Given users, accounts
+    and/or partitions, all of them are fetched with one batched squeue and
+    one sacct call using comma-separated lists.
+
+    Usage of running jobs comes from one batched sstat call through a
+    UsageCache: a job is queried again only once its sample is `usage_ttl`
+    seconds old, and a refresh waits at most `sstat_timeout` seconds before
+    showing the last known samples.
+
+    Given a `cluster`, squeue and sacct ask that cluster (`-M`). sstat has
+    no such option and only reaches the local cluster's nodes, so
+    `sample_usage=False` turns it off for remote clusters.
+    """
+    def __init__(self, job_store: Optional[JobStore] = None, use_store: bool = True,
+                 users: Optional[List[str]] = None, accounts: Optional[List[str]] = None,
+                 partitions: Optional[List[str]] = None, runner: Optional[CommandRunner] = None,
+                 usage_ttl: float = USAGE_TTL, sstat_timeout: float = SSTAT_TIMEOUT,
+                 cluster: Optional[str] = None, sample_usage: bool = True):
+        super().__init__()
+        self.runner = runner or CommandRunner()
+        self.cluster = cluster
+        self.sample_usage = sample_usage
+        self.usage = UsageCache(ttl=usage_ttl, columns=SAMPLE_COLUMNS)
+        self.sstat_timeout = sstat_timeout
         self.username = self._get_username()
+        self.users = list(users or [])
+        self.accounts = list(accounts or [])
+        self.partitions = list(partitions or [])
+        if not (self.users or self.accounts or self.partitions):
+            self.users = [self.username]
+        self.job_store = job_store
+        if self.job_store is None and use_store and not os.environ.get('SLURMSMAC_NO_CACHE'):
+            try:
+                self.job_store = JobStore(HISTORY_COLUMNS)
+            except (OSError, sqlite3.Error):
+                # Read-only or missing home directory: query sacct directly
+                self.job_store = None
 
     def _get_username(self) -> str:
-        """Get the current username."""
-        return subprocess.check_output(['whoami']).decode().strip()
+        """Get the current username (from the environment, without forking `whoami`)."""
+        return getpass.getuser()
+
+    @property
+    def is_multi_user(self) -> bool:
+        return self.users != [self.username]
+
+    @property
+    def scope(self) -> str:
+        """Key for this selection (and cluster) in the job store."""
+        if not self.is_multi_user:
+            scope = self.username
+        else:
+            scope = ';'.join(
+                f'{kind}={",".join(sorted(values))}'
+                for kind, values in (('users', self.users), ('accounts', self.accounts),
+                                     ('partitions', self.partitions))
+                if values
+            )
+        return f'cluster={self.cluster};{scope}' if self.cluster else scope
+
+    def _selection_args(self, command: str) -> List[str]:
+        """Cluster and user/account/partition filters for squeue or sacct."""
+        args = ['-M', self.cluster] if self.cluster else []
+        if self.users:
+            args += ['-u', ','.join(self.users)]
+        elif command == 'sacct':
+            # sacct only reports the calling user unless told otherwise
+            args.append('--allusers')
+        if self.accounts:
+            args += ['-A', ','.join(self.accounts)]
+        if self.partitions:
+            args += ['-p' if command == 'squeue' else '-r', ','.join(self.partitions)]
+        return args
 
     def _clean_string(self, s: str) -> str:
-        """Clean a string by removing or replacing problematic characters."""
-        # Remove control characters and other problematic characters
-        return ''.join(char for char in s if ord(char) >= 32 or char in '\n\r\t')
+        """Clean a string by removing control characters."""
+        return clean_text(s)
 
     def get_active_jobs(self) -> pd.DataFrame:
         """Get currently active and pending jobs."""
-        cmd = ['squeue', '-u', self.username, '--format=%i|%j|%t|%M|%N|%C|%m|%R']
+        # Jobs that were running at the last refresh are queried with sstat while squeue runs
+        fetches = [self._fetch_usage(due) for due in [self.usage.claim(self.usage.running)] if due]
+        cmd = ['squeue', *self._selection_args('squeue'), '--noheader',
+               '--format=%i|%j|%T|%M|%N|%C|%m|%R|%u|%a|%P']
         try:
-            output = subprocess.check_output(cmd, encoding='latin-1', errors='replace').strip()
+            output = self.runner.run(cmd).strip()
             output = self._clean_string(output)
-        except subprocess.CalledProcessError:
-            return pd.DataFrame()
-        
-        # Parse the output
-        lines = output.split('\n')[1:]  # Skip header
-        data = []
-        for line in lines:
-            if not line.strip():
-                continue
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            self.source_errors['active'] = f'squeue failed: {e}'
+            return type_active_jobs(read_parsable('', ACTIVE_COLUMNS)).join(self.usage.frame().iloc[0:0], on='job_id')
+
+        if self.cluster:
+            # squeue -M heads its output with a 'CLUSTER: name' line
+            output = '\n'.join(line for line in output.splitlines() if not line.startswith('CLUSTER: '))
+        jobs = read_parsable(output, ACTIVE_COLUMNS)
+        jobs = jobs.apply(lambda col: col.str.strip())
+
+        # Then the jobs that started since, and ended jobs leave the cache
+        running_jobs = jobs.loc[jobs['state'] == 'RUNNING', 'job_id'].tolist()
+        if not self.sample_usage:
+            # Nothing is tracked, so sstat never runs
+            running_jobs = []
+        self.usage.retain(running_jobs)
+        started = self.usage.claim(running_jobs)
+        if started:
+            fetches.append(self._fetch_usage(started))
+        # A fetch held up by a slow node finishes in the background and shows on a later refresh
+        wait(fetches, timeout=self.sstat_timeout)
+
+        jobs = type_active_jobs(jobs)
+        return jobs.join(self.usage.frame(), on='job_id')
+
+    def _fetch_usage(self, job_ids: List[str]) -> Future:
+        """Query sstat for the given jobs in the background; results go to the usage cache."""
+        future = Future()
+
+        def fetch() -> None:
             try:
-                job_id, name, state, time, nodes, cpus, mem, reason = line.split('|')
-                data.append({
-                    'job_id': job_id.strip(),
-                    'name': name.strip(),
-                    'state': state.strip(),
-                    'time': time.strip(),
-                    'nodes': nodes.strip(),
-                    'cpus': cpus.strip(),
-                    'memory': mem.strip(),
-                    'reason': reason.strip()
-                })
-            except ValueError:
-                continue
-        
-        # Fetch resource usage for running jobs
-        running_jobs = [j['job_id'] for j in data if j['state'] == 'RUNNING']
-        usage_map = {}
-        if running_jobs:
+                usage = self._query_sstat(job_ids)
+            except Exception as e:
+                self.usage.fail(job_ids)
+                future.set_exception(e)
+                return
+            self.usage.complete(job_ids, usage)
+            future.set_result(usage)
+
+        # A daemon thread, so an sstat stuck on a slow node never delays exit
+        threading.Thread(target=fetch, name='sstat', daemon=True).start()
+        return future
+
+    def _query_sstat(self, job_ids: List[str]) -> Dict[str, Tuple[float, ...]]:
+        """Usage per job over its steps (.batch, .0, ...): peak memory, and summed CPU time, memory and disk I/O."""
+        fields = ','.join(['JobID', 'MaxRSS', *USAGE_FIELDS.values()])
+        cmd = ['sstat', '-j', ','.join(job_ids), f'--format={fields}', '-n', '-P']
+        # Past the TTL a late answer would be stale anyway
+        output = self.runner.run(cmd, timeout=max(self.usage.ttl, self.sstat_timeout)).strip()
+        raw = read_parsable(self._clean_string(output), SSTAT_COLUMNS)
+        steps = type_usage(raw)
+        steps['used_memory'] = parse_memory(raw['max_rss'])['bytes']
+        by_job = steps.groupby(raw['step_id'].str.split('.').str[0])
+        totals = by_job[SAMPLE_COLUMNS[1:]].sum(min_count=1)
+        usage = pd.concat([by_job['used_memory'].max(), totals], axis=1)
+        return dict(zip(usage.index, usage.itertuples(index=False, name=None)))
+
+    def get_job_history(self, days: int = 7, progress: Optional[Progress] = None) -> pd.DataFrame:
+        """Get job history for the specified number of days."""
+        window_start = self.window_start(days)
+        if self.job_store is not None:
+            scope = self.scope
+            try:
+                self._sync_store(scope, window_start, progress)
+                return type_job_history(self.job_store.load(scope, window_start))
+            except sqlite3.Error:
+                pass
+        history = self._query_sacct(['-S', window_start.strftime('%Y-%m-%dT%H:%M:%S')], progress)
+        return type_job_history(history if history is not None else read_parsable('', HISTORY_COLUMNS))
+
+    def iter_job_history(self, days: int = 7, rows: int = HISTORY_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Get job history in chunks: from the job store `rows` at a time, or per sacct output batch."""
+        window_start = self.window_start(days)
+        if self.job_store is not None:
+            scope = self.scope
             try:
-                # sstat -j <job_list> --format=JobID,MaxRSS
-                cmd_sstat = ['sstat', '-j', ','.join(running_jobs), '--format=JobID,MaxRSS', '-n', '-P']
-                output_sstat = subprocess.check_output(cmd_sstat, encoding='latin-1', errors='replace').strip()
-                for line in output_sstat.split('\n'):
-                    if line.strip():
-                        parts = line.split('|')
-                        if len(parts) >= 2:
-                            jid = parts[0].split('.')[0] # Remove .batch or .0
-                            usage_map[jid] = parts[1]
-            except (subprocess.CalledProcessError, FileNotFoundError):
+                self._sync_store(scope, window_start)
+                stored = self.job_store.iter_load(scope, window_start, rows)
+                first = next(stored)
+            except sqlite3.Error:
                 pass
+            else:
+                for chunk in whole_jobs(itertools.chain([first], stored)):
+                    yield type_job_history(chunk)
+                return
 
-        # Enrich data with usage info
-        for job in data:
-            job['used_memory'] = usage_map.get(job['job_id'], 'N/A')
+        found = False
+        try:
+            for chunk in whole_jobs(self._stream_sacct(['-S', window_start.strftime('%Y-%m-%dT%H:%M:%S')])):
+                found = True
+                yield type_job_history(chunk)
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            self.source_errors['history'] = f'sacct failed: {e}'
+        if not found:
+            yield type_job_history(read_parsable('', HISTORY_COLUMNS))
 
-        return pd.DataFrame(data)
+    def _sync_store(self, scope: str, window_start: datetime, progress: Optional[Progress] = None) -> None:
+        """Bring the job store's rows from `window_start` on up to date with sacct.
 
-    def get_job_history(self, days: int = 7) -> pd.DataFrame:
-        """Get job history for the specified number of days."""
-        start_time = (datetime.now() - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+        Only a query of the whole window is streamed to `progress`; before
+        smaller ones, `progress` gets the stored window at once instead.
+        """
+        synced_at = datetime.now()
+        ranges = self.job_store.query_ranges(scope, window_start)
+        if ranges != [(window_start, None)] and progress is not None:
+            progress(self.job_store.load(scope, window_start))
+            progress = None
+        seen = set()
+        for start, end in ranges:
+            selection = ['-S', start.strftime('%Y-%m-%dT%H:%M:%S')]
+            if end is not None:
+                selection += ['-E', end.strftime('%Y-%m-%dT%H:%M:%S')]
+            changed = self._query_sacct(selection, progress)
+            if changed is None:
+                return
+            self.job_store.upsert(scope, changed)
+            seen.update(changed['job_id'])
+        # Jobs we last saw unfinished but that sacct did not report this time
+        stale = sorted(self.job_store.unfinished_job_ids(scope) - seen)
+        if stale:
+            parents = sorted({job_id.split('.')[0] for job_id in stale})
+            refreshed = self._query_sacct(['-j', ','.join(parents)])
+            if refreshed is not None:
+                self.job_store.upsert(scope, refreshed)
+        self.job_store.mark_synced(scope, window_start, synced_at)
+
+    def _stream_sacct(self, selection: List[str]) -> Iterator[pd.DataFrame]:
+        """Run sacct with the given job/time selection, parsing raw rows in batches while it runs."""
         cmd = [
             'sacct',
-            '-u', self.username,
-            '-S', start_time,
-            '--format=JobID,JobName,State,Start,End,Elapsed,MaxRSS,MaxVMSize,NCPUS,NodeList,ReqMem,TotalCPU'
+            *self._selection_args('sacct'),
+            *selection,
+            '--parsable2', '--noheader',
+            '--format=JobID,JobName,State,Start,End,Elapsed,MaxRSS,MaxVMSize,NCPUS,NodeList,ReqMem,TotalCPU,NNodes,User,Account,Partition'
         ]
+        return iter_parsable(self.runner.stream(cmd), HISTORY_COLUMNS)
+
+    def _query_sacct(self, selection: List[str], progress: Optional[Progress] = None) -> Optional[pd.DataFrame]:
+        """Run sacct with the given job/time selection.
+
+        Output is parsed in batches while sacct is still running, and each
+        batch is passed to `progress` if given. Returns the raw (untyped)
+        rows, or None if the command fails.
+        """
+        batches = []
         try:
-            output = subprocess.check_output(cmd, encoding='latin-1', errors='replace').strip()
-            output = self._clean_string(output)
-        except subprocess.CalledProcessError:
-            return pd.DataFrame()
-        
-        # Parse the output
-        lines = output.split('\n')[1:]  # Skip header
-        data = []
-        for line in lines:
-            if not line.strip():
-                continue
-            try:
-                fields = line.split()
-                if len(fields) >= 12:
-                    data.append({
-                        'job_id': fields[0].strip(),
-                        'name': fields[1].strip(),
-                        'state': fields[2].strip(),
-                        'start': fields[3].strip(),
-                        'end': fields[4].strip(),
-                        'elapsed': fields[5].strip(),
-                        'max_rss': fields[6].strip(),
-                        'max_vmsize': fields[7].strip(),
-                        'ncpus': fields[8].strip(),
-                        'nodes': fields[9].strip(),
-                        'req_mem': fields[10].strip(),
-                        'total_cpu': fields[11].strip()
-                    })
-            except (ValueError, IndexError):
-                continue
-        
-        return pd.DataFrame(data)
-
-    def get_job_stats(self) -> Dict:
-        """Get overall job statistics."""
-        history_df = self.get_job_history()
-        active_df = self.get_active_jobs()
-        
-        # Filter out header rows and convert values safely
-        valid_ncpus = history_df[history_df['ncpus'] != '----------']['ncpus'].astype(float)
-        valid_memory = history_df[history_df['max_rss'] != '----------']['max_rss'].str.replace('K', '').astype(float)
-        
-        stats = {
-            'total_jobs': len(history_df) + len(active_df),
-            'active_jobs': len(active_df),
-            'completed_jobs': len(history_df[history_df['state'] == 'COMPLETED']),
-            'failed_jobs': len(history_df[history_df['state'] == 'FAILED']),
-            'cancelled_jobs': len(history_df[history_df['state'] == 'CANCELLED']),
-            'avg_cpu_usage': valid_ncpus.mean() if not valid_ncpus.empty else 0,
-            'avg_memory_usage': valid_memory.mean() if not valid_memory.empty else 0
-        }
-        
-        return stats
-
-def get_slurm_collector() -> BaseSlurmDataCollector:
-    """Get the appropriate Slurm data collector based on system availability."""
-    try:
-        # Try to run a simple slurm command to check if it's available
-        subprocess.run(['sinfo', '--version'], capture_output=True, check=True)
-        return RealSlurmDataCollector()
-    except (subprocess.SubprocessError, FileNotFoundError):
-        return MockSlurmDataCollector() 
\ No newline at end of file
+            for batch in self._stream_sacct(selection):
+                batches.append(batch)
+                if progress is not None:
+                    progress(batch)
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            self.source_errors['history'] = f'sacct failed: {e}'
+            return None
+
+        if not batches:
+            return read_parsable('', HISTORY_COLUMNS)
+        return pd.concat(batches, ignore_index=True)
+
+def get_slurm_collector(users: Optional[List[str]] = None, accounts: Optional[List[str]] = None,
+                        partitions: Optional[List[str]] = None,
+                        clusters: Optional[Dict[str, float]] = None) -> BaseSlurmDataCollector:
+    """Get the appropriate Slurm data collector based on system availability.
+
+    SLURMSMAC_FAKE_SLURM=1 runs the real collector against fake_slurm's
+    stand-in commands instead, for benchmarking without a cluster. Given
+    `clusters` (name -> timeout in seconds), each one gets its own collector
+    and they are merged by a FederatedSlurmDataCollector.
+    """
+    if clusters:
+        from .federation import federated_collector
+        return federated_collector(clusters, users=users, accounts=accounts, partitions=partitions)
+    if os.environ.get('SLURMSMAC_FAKE_SLURM'):
+        from .fake_slurm import fake_collector
+        return fake_collector(users=users, accounts=accounts, partitions=partitions)
+    # Slurm counts as available when its commands are on PATH; running one just to check costs a fork
+    if shutil.which('sinfo') is None:
+        return MockSlurmDataCollector(users=users, accounts=accounts, partitions=partitions)
+    collector = RealSlurmDataCollector(users=users, accounts=accounts, partitions=partitions)
+    # Default single-user view: read snapshots from a running `slurmsmac serve` if one is configured
+    # and its directory passes the ownership checks
+    if not collector.is_multi_user and not os.environ.get('SLURMSMAC_NO_DAEMON'):
+        from .daemon import SharedSnapshotCollector, read_heartbeat, shared_dir
+        directory = shared_dir()
+        if directory is not None and read_heartbeat(directory) is not None:
+            return SharedSnapshotCollector(collector, collector.username, directory)
+    return collector
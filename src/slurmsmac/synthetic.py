@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""Seeded synthetic Slurm workload for mock mode and load testing.
+
+SyntheticCluster generates jobs with NumPy in fixed submission time blocks,
+each seeded from (seed, block number). The workload at any moment is a pure
+function of the seed and the clock, so refreshes see jobs move from PENDING
+to RUNNING to a final state, and the same seed and time reproduce the same
+frames offline. Frames hold the raw strings squeue/sacct print (job arrays,
+batch/extern/numbered steps, mixed memory units), so they go through the
+same parsing path as output from a real cluster.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# Blocks hold about this many jobs, between one hour and one day of submissions
+JOBS_PER_BLOCK = 5000
+# Block numbering origin; job ids grow with submission time from here
+EPOCH = np.datetime64('2024-01-01T00:00:00', 's').astype(np.int64)
+
+MEAN_WAIT = 600
+MAX_WAIT = 6 * 3600
+MAX_RUNTIME = 2 * 86400
+# Oldest submission that can still be queued or running
+LOOKBACK = MAX_WAIT + MAX_RUNTIME
+
+STATES = np.array(['PENDING', 'RUNNING', 'COMPLETED', 'FAILED', 'CANCELLED', 'TIMEOUT', 'OUT_OF_MEMORY'])
+PENDING, RUNNING, COMPLETED, FAILED, CANCELLED, TIMEOUT, OUT_OF_MEMORY = range(len(STATES))
+OUTCOMES = np.array([COMPLETED, FAILED, CANCELLED, TIMEOUT, OUT_OF_MEMORY])
+OUTCOME_WEIGHTS = [0.82, 0.08, 0.05, 0.03, 0.02]
+
+REASONS = np.array(['Priority', 'Resources', 'JobArrayTaskLimit'])
+JOB_NAMES = np.array(['simulation', 'analysis', 'training', 'inference', 'preprocessing',
+                      'align', 'assemble', 'postprocess'])
+
+CPU_CHOICES = np.array([1, 2, 4, 8, 16, 32, 64])
+CPU_WEIGHTS = [0.25, 0.2, 0.2, 0.15, 0.1, 0.06, 0.04]
+MEM_PER_CPU = np.array([0.5, 1, 2, 4, 8]) * 1024 ** 3
+
+ARRAY_FRACTION = 0.1
+MAX_ARRAY_TASKS = 20
+# Expected array tasks per submission, used to hit the requested job rate
+TASKS_PER_SUBMISSION = 1 + ARRAY_FRACTION * ((2 + MAX_ARRAY_TASKS) / 2 - 1)
+
+MIB = 1024 ** 2
+GIB = 1024 ** 3
+
+# Share of running jobs that stall: their CPU time and I/O stop growing after five minutes
+STALLED_FRACTION = 0.05
+# Disk bytes read per busy CPU-second; about half as much is written
+DISK_RATE = 2 * MIB
+
+# Zero-padded digit strings, indexed instead of formatting each value
+_TWO_DIGITS = np.array([f'{i:02d}' for i in range(100)], dtype=object)
+_THREE_DIGITS = np.array([f'{i:03d}' for i in range(1000)], dtype=object)
+
+def _as_text(values, template: str = '{}') -> np.ndarray:
+    return np.array(list(map(template.format, np.asarray(values).tolist())), dtype=object)
+
+def _format_durations(seconds, fractional: bool = False) -> np.ndarray:
+    """Render seconds as [D-]HH:MM:SS, or MM:SS.mmm below an hour when fractional."""
+    seconds = np.maximum(np.nan_to_num(np.asarray(seconds, dtype=float)), 0)
+    whole = seconds.astype(np.int64)
+    days = whole // 86400
+    minutes = _TWO_DIGITS[whole % 3600 // 60]
+    secs = _TWO_DIGITS[whole % 60]
+    text = _TWO_DIGITS[whole % 86400 // 3600] + ':' + minutes + ':' + secs
+    multi_day = days > 0
+    text[multi_day] = _as_text(days[multi_day]) + '-' + text[multi_day]
+    if fractional:
+        short = whole < 3600
+        millis = np.minimum(np.round((seconds - whole) * 1000), 999).astype(np.int64)
+        text[short] = minutes[short] + ':' + secs[short] + '.' + _THREE_DIGITS[millis[short]]
+    return text
+
+def _format_timestamps(seconds, missing: str = 'Unknown') -> np.ndarray:
+    """Render epoch seconds as Slurm timestamps; NaN becomes `missing`."""
+    seconds = np.asarray(seconds, dtype=float)
+    valid = ~np.isnan(seconds)
+    stamps = np.where(valid, seconds, 0).astype(np.int64).astype('datetime64[s]').astype(str)
+    return np.where(valid, stamps, missing).astype(object)
+
+def _format_memory(nbytes, units, suffix: str = '') -> np.ndarray:
+    """Render byte counts in K/M/G units ('' where the size is unknown)."""
+    nbytes = np.asarray(nbytes, dtype=float)
+    units = np.broadcast_to(np.asarray(units, dtype=object), nbytes.shape)
+    scale = np.select([units == 'K', units == 'M'], [1024, MIB], GIB)
+    values = np.nan_to_num(nbytes / scale)
+    text = _as_text(np.round(values).astype(np.int64))
+    # Whole GiB print without decimals, like sacct does
+    gib = (units == 'G') & (np.round(values) != np.round(values, 2))
+    text[gib] = _as_text(values[gib], '{:.2f}')
+    return np.where(np.isnan(nbytes), '', text + units + suffix)
+
+def _format_nodelists(first, count) -> np.ndarray:
+    """Render node ranges as node0001 or node[0001-0004]."""
+    first = np.asarray(first)
+    last = first + np.asarray(count) - 1
+    digits = np.array([f'{i:04d}' for i in range(int(last.max(initial=0)) + 1)], dtype=object)
+    text = 'node' + digits[first]
+    multi = last > first
+    text[multi] = 'node[' + digits[first[multi]] + '-' + digits[last[multi]] + ']'
+    return text
+
+class SyntheticCluster:
+    """Deterministic, evolving synthetic workload.
+
+    `jobs_per_day` counts array tasks as jobs. Blocks are generated on first
+    use and kept while they can still appear in a requested window, so
+    repeated refreshes only pay for rendering. Job ids start at
+    `first_job_id`, so several clusters can hand out distinct ids.
+    """
+    def __init__(self, users: List[str], accounts: Optional[List[str]] = None,
+                 partitions: Optional[List[str]] = None, jobs_per_day: float = 100, seed: int = 0,
+                 num_nodes: int = 512, steps: bool = True, clock: Callable[[], datetime] = datetime.now,
+                 first_job_id: int = 0):
+        self.users = np.array(users)
+        self.accounts = np.array(accounts or ['lab'])
+        self.partitions = np.array(partitions or ['normal', 'gpu'])
+        self.jobs_per_day = jobs_per_day
+        self.seed = seed
+        self.num_nodes = num_nodes
+        self.steps = steps
+        self.clock = clock
+        self.first_job_id = first_job_id
+        # A few heavy users submit most jobs
+        weights = 1.0 / np.arange(1, len(self.users) + 1)
+        self.user_weights = weights / weights.sum()
+        hours = int(np.clip(JOBS_PER_BLOCK / max(jobs_per_day, 1) * 24, 1, 24))
+        self.block_seconds = hours * 3600
+        submissions = jobs_per_day * self.block_seconds / 86400 / TASKS_PER_SUBMISSION
+        self.id_stride = 10 ** int(np.ceil(np.log10(submissions * 4 + 10)))
+        self._blocks: Dict[int, Dict[str, np.ndarray]] = {}
+
+    def _generate_block(self, block: int) -> Dict[str, np.ndarray]:
+        rng = np.random.default_rng([self.seed, block])
+        n = rng.poisson(self.jobs_per_day * self.block_seconds / 86400 / TASKS_PER_SUBMISSION)
+        is_array = rng.random(n) < ARRAY_FRACTION
+        tasks = np.where(is_array, rng.integers(2, MAX_ARRAY_TASKS + 1, n), 1)
+        ncpus = rng.choice(CPU_CHOICES, n, p=CPU_WEIGHTS)
+        submissions = {
+            'job_id': self.first_job_id + block * self.id_stride + np.arange(n, dtype=np.int64),
+            'submit': EPOCH + block * self.block_seconds + np.sort(rng.uniform(0, self.block_seconds, n)),
+            'array': is_array,
+            'user': rng.choice(len(self.users), n, p=self.user_weights).astype(np.int16),
+            'name': rng.integers(0, len(JOB_NAMES), n).astype(np.int16),
+            'partition': rng.integers(0, len(self.partitions), n).astype(np.int16),
+            'ncpus': ncpus.astype(np.int32),
+            'nnodes': np.where(ncpus >= 32, rng.integers(1, 5, n), 1).astype(np.int16),
+            'mem_per_cpu': rng.choice(MEM_PER_CPU, n),
+            # ReqMem rendering: total M, total G, per-CPU Mc, per-node Gn
+            'mem_style': rng.integers(0, 4, n).astype(np.int8),
+        }
+        jobs = {key: np.repeat(values, tasks) for key, values in submissions.items()}
+        m = len(jobs['job_id'])
+        task = np.arange(m) - np.repeat(np.cumsum(tasks) - tasks, tasks)
+        jobs['task'] = task.astype(np.int32)
+
+        # Later array tasks queue behind earlier ones
+        wait = np.minimum(rng.exponential(MEAN_WAIT, m) * (1 + task * 0.25), MAX_WAIT)
+        runtime = np.clip(rng.lognormal(np.log(1800), 1.2, m), 30, MAX_RUNTIME)
+        outcome = rng.choice(OUTCOMES, m, p=OUTCOME_WEIGHTS)
+        cancelled_pending = (outcome == CANCELLED) & (rng.random(m) < 0.5)
+        start = jobs['submit'] + wait
+        jobs['start'] = np.where(cancelled_pending, np.nan, start)
+        jobs['end'] = np.where(cancelled_pending, jobs['submit'] + wait * rng.random(m), start + runtime)
+        jobs['outcome'] = outcome.astype(np.int8)
+        mem_frac = rng.beta(2, 3, m)
+        jobs['mem_frac'] = np.where(outcome == OUT_OF_MEMORY, 1.0, mem_frac).astype(np.float32)
+        jobs['cpu_frac'] = rng.beta(5, 2, m).astype(np.float32)
+        jobs['node'] = rng.integers(0, self.num_nodes - jobs['nnodes'] + 1).astype(np.int32)
+        reason = rng.integers(0, 2, m)
+        jobs['reason'] = np.where(jobs['array'] & (task >= 4), 2, reason).astype(np.int8)
+        jobs['steps'] = rng.integers(0, 4, m).astype(np.int8)
+        jobs['step_seed'] = rng.random(m).astype(np.float32)
+        return jobs
+
+    def _block_of(self, seconds: float) -> int:
+        return int((seconds - EPOCH) // self.block_seconds)
+
+    def _jobs_between(self, first_s: float, last_s: float) -> pd.DataFrame:
+        """All jobs submitted in blocks overlapping [first_s, last_s]."""
+        blocks = range(self._block_of(first_s), self._block_of(last_s) + 1)
+        for block in blocks:
+            if block not in self._blocks:
+                self._blocks[block] = self._generate_block(block)
+        return pd.DataFrame({
+            key: np.concatenate([self._blocks[b][key] for b in blocks])
+            for key in self._blocks[blocks[0]]
+        })
+
+    def _forget_before(self, first_s: float) -> None:
+        first = self._block_of(first_s)
+        for block in [b for b in self._blocks if b < first]:
+            del self._blocks[block]
+
+    def _now(self, now: Optional[datetime]) -> float:
+        return float(np.datetime64(now or self.clock(), 's').astype(np.int64))
+
+    def _job_ids(self, jobs: pd.DataFrame) -> pd.Series:
+        base = jobs['job_id'].astype(str).reset_index(drop=True)
+        task = jobs['task'].astype(str).reset_index(drop=True)
+        return (base + '_' + task).where(jobs['array'].to_numpy(), base)
+
+    def _labels(self, jobs: pd.DataFrame) -> Dict[str, np.ndarray]:
+        user = jobs['user'].to_numpy()
+        return {
+            'user': self.users[user],
+            'account': self.accounts[user % len(self.accounts)],
+            'partition': self.partitions[jobs['partition'].to_numpy()],
+        }
+
+    def active_jobs(self, now: Optional[datetime] = None) -> pd.DataFrame:
+        """squeue-style rows (plus sstat usage of the batch step) for queued and running jobs."""
+        now_s = self._now(now)
+        jobs = self._jobs_between(now_s - LOOKBACK, now_s)
+        jobs = jobs[(jobs['submit'] <= now_s) & ~(jobs['end'] <= now_s)].reset_index(drop=True)
+        running = (jobs['start'] <= now_s).to_numpy()
+        run_s = np.where(running, now_s - jobs['start'].to_numpy(), 0)
+        req_total = (jobs['ncpus'] * jobs['mem_per_cpu']).to_numpy()
+        # Memory use ramps up over the first five minutes
+        used = req_total * jobs['mem_frac'].to_numpy() * np.minimum(1, run_s / 300)
+        stalled = jobs['step_seed'].to_numpy() < STALLED_FRACTION
+        busy_s = np.where(stalled, np.minimum(run_s, 300), run_s) * jobs['ncpus'].to_numpy()
+        cpu_s = busy_s * jobs['cpu_frac'].to_numpy()
+        frame = pd.DataFrame({
+            'job_id': self._job_ids(jobs),
+            'name': JOB_NAMES[jobs['name'].to_numpy()],
+            'state': np.where(running, 'RUNNING', 'PENDING'),
+            'time': _format_durations(run_s),
+            'nodes': np.where(running, _format_nodelists(jobs['node'], jobs['nnodes']), ''),
+            'cpus': jobs['ncpus'].astype(str),
+            'memory': _format_memory(req_total, np.where(req_total >= GIB, 'G', 'M')),
+            'reason': np.where(running, 'None', REASONS[jobs['reason'].to_numpy()]),
+            **self._labels(jobs),
+            'used_memory': np.where(running, _format_memory(used, 'K'), 'N/A'),
+            'ave_rss': np.where(running, _format_memory(used * 0.8, 'K'), ''),
+            'ave_cpu': np.where(running, _format_durations(cpu_s, fractional=True), ''),
+            'ntasks': np.where(running, '1', ''),
+            'max_disk_read': np.where(running, _format_memory(cpu_s * DISK_RATE, 'M'), ''),
+            'max_disk_write': np.where(running, _format_memory(cpu_s * DISK_RATE / 2, 'M'), ''),
+        })
+        return frame
+
+    def job_history(self, days: int = 7, now: Optional[datetime] = None) -> pd.DataFrame:
+        """sacct-style rows for jobs (and their steps) active within the last `days`."""
+        now_s = self._now(now)
+        since_s = now_s - days * 86400
+        self._forget_before(since_s - LOOKBACK)
+        jobs = self._jobs_between(since_s - LOOKBACK, now_s)
+        jobs = jobs[(jobs['submit'] <= now_s) & ~(jobs['end'] < since_s)].reset_index(drop=True)
+
+        start = jobs['start'].to_numpy()
+        end = jobs['end'].to_numpy()
+        started = start <= now_s
+        ended = end <= now_s
+        state = np.where(ended, jobs['outcome'], np.where(started, RUNNING, PENDING))
+        elapsed = np.where(started, np.minimum(end, now_s) - start, 0)
+        total_cpu = np.where(started & ended, elapsed * jobs['ncpus'] * jobs['cpu_frac'], 0)
+        peak = (jobs['ncpus'] * jobs['mem_per_cpu'] * jobs['mem_frac']).to_numpy()
+
+        parents = pd.DataFrame({
+            'job_id': self._job_ids(jobs),
+            'name': JOB_NAMES[jobs['name'].to_numpy()],
+            'state': STATES[state],
+            'start': _format_timestamps(np.where(started, start, np.nan)),
+            'end': _format_timestamps(np.where(ended, end, np.nan)),
+            'elapsed': _format_durations(elapsed),
+            'max_rss': '',
+            'max_vmsize': '',
+            'ncpus': jobs['ncpus'].astype(str),
+            'nodes': np.where(started, _format_nodelists(jobs['node'], jobs['nnodes']), 'None assigned'),
+            'req_mem': self._format_req_mem(jobs),
+            'total_cpu': _format_durations(total_cpu, fractional=True),
+            'nnodes': jobs['nnodes'].astype(str),
+            **self._labels(jobs),
+        })
+        if not self.steps or not started.any():
+            return parents
+        steps = self._step_rows(parents, jobs, started, ended, elapsed, total_cpu, peak)
+        # sacct lists each job's steps right after its allocation row
+        order = np.concatenate([np.arange(len(parents)), steps.pop('_parent').to_numpy()])
+        combined = pd.concat([parents, steps], ignore_index=True)
+        return combined.iloc[np.argsort(order, kind='stable')].reset_index(drop=True)
+
+    @staticmethod
+    def _format_req_mem(jobs: pd.DataFrame) -> np.ndarray:
+        per_cpu = jobs['mem_per_cpu'].to_numpy()
+        total = jobs['ncpus'].to_numpy() * per_cpu
+        per_node = total / jobs['nnodes'].to_numpy()
+        style = jobs['mem_style'].to_numpy()
+        text = np.empty(len(jobs), dtype=object)
+        for code, (values, unit, suffix) in enumerate([(total, 'M', ''), (total, 'G', ''),
+                                                       (per_cpu, 'M', 'c'), (per_node, 'G', 'n')]):
+            rows = style == code
+            text[rows] = _format_memory(values[rows], unit, suffix)
+        return text
+
+    def _step_rows(self, parents: pd.DataFrame, jobs: pd.DataFrame, started, ended,
+                   elapsed, total_cpu, peak) -> pd.DataFrame:
+        """batch, extern and 0..n numbered step rows for every started job."""
+        positions = np.flatnonzero(started)
+        numbered = jobs['steps'].to_numpy()[positions]
+        counts = 2 + numbered
+        parent = np.repeat(positions, counts)
+        slot = np.arange(len(parent)) - np.repeat(np.cumsum(counts) - counts, counts)
+        numbered = np.repeat(numbered, counts)
+        seed = jobs['step_seed'].to_numpy()[parent]
+        is_batch, is_extern = slot == 0, slot == 1
+        last_numbered = slot - 2 == numbered - 1
+
+        step_name = np.where(is_batch, 'batch', np.where(is_extern, 'extern', (slot - 2).astype(str)))
+        # The job's peak memory comes from its last step; earlier steps use less
+        mem_share = np.where(is_batch, np.where(numbered == 0, 1.0, 0.1 + 0.2 * seed),
+                             np.where(last_numbered, 1.0, 0.5 + 0.5 * (seed * (slot + 1) * 7.31 % 1)))
+        max_rss = np.where(is_extern, MIB, peak[parent] * mem_share)
+        max_rss = np.where(ended[parent], max_rss, np.nan)
+        cpu_share = np.where(is_extern, 0, np.where(is_batch, np.where(numbered == 0, 1.0, 0.05),
+                                                    0.95 / np.maximum(numbered, 1)))
+        ncpus = jobs['ncpus'].to_numpy()[parent]
+        nnodes = jobs['nnodes'].to_numpy()[parent]
+        # Vary units the way sacct output does across sites and versions, fixed per job across queries
+        units = np.array(['K', 'M', 'G'])[(seed * 3).astype(int) % 3]
+
+        rows = parents.iloc[parent].reset_index(drop=True)
+        rows['job_id'] = rows['job_id'] + '.' + step_name
+        rows['name'] = np.where(is_batch | is_extern, step_name, rows['name'])
+        rows['state'] = np.where(is_extern & ended[parent], 'COMPLETED', rows['state'])
+        rows['max_rss'] = _format_memory(max_rss, units)
+        rows['max_vmsize'] = _format_memory(max_rss * 1.25, units)
+        rows['ncpus'] = np.where(is_batch, np.maximum(ncpus // nnodes, 1), ncpus).astype(str)
+        rows['total_cpu'] = _format_durations(total_cpu[parent] * cpu_share, fractional=True)
+        rows['nnodes'] = np.where(is_batch, 1, nnodes).astype(str)
+        rows['_parent'] = parent
+        return rows
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Keyed reconciliation of DataTable contents.
+
+Instead of clearing and rebuilding a table on every refresh, rows are keyed
+by job (see job_steps.job_keys): new jobs are added, changed cells are
+updated in place and finished jobs are removed. Columns, scroll position and
+the selected job survive a refresh.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from textual._two_way_dict import TwoWayDict
+from textual.widgets import DataTable
+from textual.widgets.data_table import RowDoesNotExist, RowKey
+
+class SyncResult(NamedTuple):
+    """Number of rows touched by a reconciliation."""
+    added: int
+    updated: int
+    removed: int
+
+def ensure_columns(table: DataTable, columns: List[Tuple[str, str]]) -> None:
+    """Add (key, label) columns once; later calls leave existing columns alone."""
+    if table.columns:
+        return
+    for key, label in columns:
+        table.add_column(label, key=key)
+
+def sync_table(table: DataTable, columns: List[Tuple[str, str]],
+               rows: Iterable[Tuple[str, tuple]]) -> SyncResult:
+    """Reconcile a table with (key, cells) pairs given in display order."""
+    ensure_columns(table, columns)
+    column_keys = [key for key, _ in columns]
+    # Later duplicates win, as with a dict
+    wanted: Dict[str, tuple] = dict(rows)
+
+    selected_key = None
+    if table.row_count and table.is_valid_row_index(table.cursor_row):
+        selected_key = table.ordered_rows[table.cursor_row].key.value
+
+    removed = 0
+    for row_key in [row.key for row in table.ordered_rows]:
+        if row_key.value not in wanted:
+            table.remove_row(row_key)
+            removed += 1
+
+    added = updated = 0
+    for key, cells in wanted.items():
+        try:
+            current = table.get_row(key)
+        except RowDoesNotExist:
+            table.add_row(*cells, key=key)
+            added += 1
+            continue
+        changed = False
+        for column_key, old, new in zip(column_keys, current, cells):
+            if old != new:
+                table.update_cell(key, column_key, new)
+                changed = True
+        updated += changed
+
+    # New rows are appended, so if they belong elsewhere (e.g. a history window
+    # that moved backwards) move the rows into place rather than rebuild them
+    if [row.key.value for row in table.ordered_rows] != list(wanted):
+        _reorder(table, list(wanted))
+
+    # Keep the cursor on the same job even if rows above it were removed
+    if selected_key is not None and selected_key in wanted:
+        index = table.get_row_index(selected_key)
+        if index != table.cursor_row:
+            table.move_cursor(row=index)
+
+    return SyncResult(added, updated, removed)
+
+def _reorder(table: DataTable, keys: List[str]) -> None:
+    """Move every row to its position in `keys`, as DataTable.sort does, keeping scroll and cursor."""
+    table._row_locations = TwoWayDict({RowKey(key): index for index, key in enumerate(keys)})
+    table._update_count += 1
+    table.refresh()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Per-job cache of sstat usage samples.
+
+sstat has to reach slurmd on every node a job runs on, so asking for all
+running jobs on every refresh is slow and one unresponsive node holds up the
+whole query. A UsageCache keeps the last sample seen for each running job
+(memory, CPU time, disk I/O) and hands out only the jobs whose sample is
+older than the TTL for the next fetch. Jobs that stop running are evicted,
+and a job is never fetched twice at the same time, so a fetch stuck on a
+slow node does not pile up behind the next refresh.
+
+sstat only reports cumulative CPU time, so the cache also turns two
+consecutive samples of a job into its current CPU rate (CPU seconds per
+second).
+"""
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple
+import pandas as pd
+
+# Derived from consecutive samples that have a 'cpu_time' column
+CPU_RATE = 'cpu_rate'
+
+class UsageCache:
+    """Last known usage sample of running jobs, refreshed per job after `ttl` seconds (thread safe).
+
+    Samples are tuples of floats in the order of `columns`.
+    """
+    def __init__(self, ttl: float = 60, clock: Callable[[], float] = time.monotonic,
+                 columns: Sequence[str] = ('used_memory',)):
+        self.ttl = ttl
+        self.clock = clock
+        self.columns = list(columns)
+        self._cpu = self.columns.index('cpu_time') if 'cpu_time' in self.columns else None
+        if self._cpu is not None:
+            self.columns.append(CPU_RATE)
+        # Last sample per job and when it was taken
+        self._usage: Dict[str, Tuple[Tuple[float, ...], float]] = {}
+        # When each job was last asked for, whether or not a sample came back
+        self._fetched_at: Dict[str, float] = {}
+        self._in_flight: Set[str] = set()
+        # Jobs running at the last refresh, so their fetch can start before squeue returns
+        self.running: List[str] = []
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def claim(self, job_ids: Iterable[str]) -> List[str]:
+        """Jobs with no value or an expired one that are not being fetched; they count as in flight until completed."""
+        now = self.clock()
+        with self._lock:
+            due = [
+                job_id for job_id in dict.fromkeys(job_ids)
+                if job_id not in self._in_flight and now - self._fetched_at.get(job_id, -math.inf) >= self.ttl
+            ]
+            self._in_flight.update(due)
+        return due
+
+    def complete(self, job_ids: Iterable[str], samples: Dict[str, Tuple[float, ...]]) -> None:
+        """Store a finished fetch; jobs it had no sample for (no steps yet) keep their last one.
+
+        With a cpu_time column, each sample gets a cpu_rate from the job's
+        previous sample, over the time between the two samples: NaN for the
+        first one, or when the CPU time went down (a step ended and its time
+        dropped out of sstat).
+        """
+        now = self.clock()
+        with self._lock:
+            for job_id in job_ids:
+                self._in_flight.discard(job_id)
+                if job_id not in self._running:
+                    # Ended while the fetch was running
+                    continue
+                self._fetched_at[job_id] = now
+                if job_id not in samples:
+                    continue
+                sample = tuple(samples[job_id])
+                if self._cpu is not None:
+                    rate = math.nan
+                    if job_id in self._usage:
+                        previous, sampled_at = self._usage[job_id]
+                        used = sample[self._cpu] - previous[self._cpu]
+                        if now > sampled_at and used >= 0:
+                            rate = used / (now - sampled_at)
+                    sample += (rate,)
+                self._usage[job_id] = (sample, now)
+
+    def fail(self, job_ids: Iterable[str]) -> None:
+        """Release a failed fetch so its jobs are retried on the next refresh."""
+        with self._lock:
+            self._in_flight.difference_update(job_ids)
+
+    def retain(self, running: Iterable[str]) -> None:
+        """Evict jobs that are no longer running."""
+        running = list(running)
+        with self._lock:
+            self.running, self._running = running, set(running)
+            for table in (self._usage, self._fetched_at):
+                for job_id in [job_id for job_id in table if job_id not in self._running]:
+                    del table[job_id]
+
+    def values(self) -> Dict[str, Tuple[float, ...]]:
+        """Last known sample per job."""
+        with self._lock:
+            return {job_id: sample for job_id, (sample, _) in self._usage.items()}
+
+    def frame(self) -> pd.DataFrame:
+        """Last known samples as float columns indexed by job id."""
+        usage = self.values()
+        frame = pd.DataFrame.from_records(list(usage.values()), columns=self.columns, coerce_float=True)
+        return frame.astype(float).set_axis(pd.Index(list(usage), dtype=str, name='job_id'))
+
+    def __len__(self) -> int:
+        return len(self._usage)
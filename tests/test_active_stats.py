@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 """Test active job stats"""
 
+import pandas as pd
 from slurmsmac.slurm_data import MockSlurmDataCollector
 
 def test_active_stats():
@@ -29,7 +30,7 @@ def test_active_stats():
         print(f"  Req Mem: {job['memory']}")
         print(f"  Used Mem: {job['used_memory']}")
         
-        if job['used_memory'] == 'N/A':
+        if pd.isna(job['used_memory']):
              print("  ✗ Used memory is N/A for running job (unexpected for mock)")
              return False
     else:
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Smoke test for the benchmark suite"""
+
+import importlib.util
+import json
+from pathlib import Path
+
+def _load_benchmarks():
+    path = Path(__file__).parent.parent / 'benchmarks' / 'run.py'
+    spec = importlib.util.spec_from_file_location('benchmarks_run', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_benchmark_suite_runs(tmp_path):
+    """Test that every benchmark runs at a small size and results round-trip."""
+    print("Testing benchmark suite...")
+
+    bench = _load_benchmarks()
+    output = tmp_path / 'results.json'
+    assert bench.main(['--sizes', '200', '--repeat', '1', '--output', str(output)]) == 0
+
+    report = json.loads(output.read_text())
+    names = {result['name'] for result in report['results']}
+    print(f"  Benchmarks: {sorted(names)}")
+    assert names == set(bench.BENCHMARKS)
+    assert all(result['median'] > 0 for result in report['results'])
+    assert report['metadata']['python']
+
+    # A baseline that was ten times faster shows up as a regression
+    for result in report['results']:
+        result['median'] /= 10
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(report))
+    assert bench.main(['--sizes', '200', '--repeat', '1', '--only', 'efficiency',
+                       '--output', str(output), '--compare', str(baseline)]) == 1
+    print("  ✓ Results written and compared")
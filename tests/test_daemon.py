@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the shared collector daemon and snapshot cache"""
+
+import json
+import os
+import pytest
+import pandas as pd
+from slurmsmac.daemon import SnapshotDaemon, SharedSnapshotCollector, read_heartbeat
+from slurmsmac.serialization import decode_frame, encode_frame
+from slurmsmac.slurm_data import MockSlurmDataCollector
+
+# Test users all map to the uid running the tests, except an impostor no file can belong to
+USER_IDS = {'ann': os.getuid(), 'bob': os.getuid(), 'carl': os.getuid() + 1}.get
+
+def test_frame_round_trip():
+    """Test that typed frames survive JSON encoding."""
+    print("Testing frame serialization...")
+
+    history = MockSlurmDataCollector(users=['ann']).get_job_history()
+    decoded = decode_frame(json.loads(json.dumps(encode_frame(history))))
+    assert list(decoded.columns) == list(history.columns)
+    assert decoded['elapsed'].dtype == history['elapsed'].dtype
+    assert decoded['start'].dtype.kind == 'M'
+    pd.testing.assert_series_equal(decoded['max_rss'], history['max_rss'].reset_index(drop=True),
+                                   check_names=False)
+    print("  ✓ Durations, timestamps and byte sizes round-trip")
+
+def test_daemon_publishes_for_interested_users(tmp_path):
+    """Test that dashboards read the daemon's snapshot instead of polling."""
+    print("Testing daemon snapshots...")
+
+    polled = []
+    def factory(users):
+        polled.append(users)
+        return MockSlurmDataCollector(users=users)
+
+    daemon = SnapshotDaemon(directory=tmp_path, interval=30, collector_factory=factory, user_ids=USER_IDS)
+    assert daemon.poll_once() == {}
+    assert read_heartbeat(tmp_path) is not None
+
+    fallback = MockSlurmDataCollector(users=['ann'])
+    ann = SharedSnapshotCollector(fallback, 'ann', directory=tmp_path)
+    SharedSnapshotCollector(MockSlurmDataCollector(users=['bob']), 'bob', directory=tmp_path)
+    (tmp_path / 'interest' / 'bad name').touch()
+    # Registering someone else does not get their jobs polled
+    (tmp_path / 'interest' / 'carl').touch()
+
+    published = daemon.poll_once()
+    print(f"  Published: {published}")
+    assert sorted(published) == ['ann', 'bob']
+    # One batched squeue for both users, and a history collector each
+    assert polled == [['ann', 'bob'], ['ann'], ['bob']]
+    assert ann._read_snapshot() is not None
+    assert os.stat(tmp_path / 'snapshots' / 'ann.json').st_mode & 0o777 == 0o600
+
+    snapshot = ann.get_snapshot(days=7)
+    assert set(snapshot.active['user']) <= {'ann'}
+    assert set(snapshot.history['user']) <= {'ann'}
+    assert 'cpu_eff' in snapshot.history
+    assert snapshot.history['elapsed'].dtype.kind == 'm'
+
+    # A user leaving does not rebuild the others' history collectors (and their job stores)
+    (tmp_path / 'interest' / 'bob').unlink()
+    history_collector = daemon._history['ann']
+    assert sorted(daemon.poll_once()) == ['ann']
+    assert polled[3:] == [['ann']] and daemon._history == {'ann': history_collector}
+    print("  ✓ Client reads its own typed snapshot")
+
+def test_client_falls_back_without_daemon(tmp_path):
+    """Test fallback to direct collection when the daemon is gone."""
+    print("Testing fallback to direct collection...")
+
+    daemon = SnapshotDaemon(directory=tmp_path, interval=30, user_ids=USER_IDS,
+                            collector_factory=lambda users: MockSlurmDataCollector(users=users))
+    client = SharedSnapshotCollector(MockSlurmDataCollector(users=['ann']), 'ann', directory=tmp_path)
+    daemon.poll_once()
+    assert client._read_snapshot() is not None
+
+    # A wider window than the daemon keeps goes straight to Slurm
+    assert not client.get_job_history(days=30).empty
+
+    # A heartbeat that stopped updating means the daemon died
+    heartbeat = json.loads((tmp_path / 'daemon.json').read_text())
+    heartbeat['updated_at'] -= 3600
+    (tmp_path / 'daemon.json').write_text(json.dumps(heartbeat))
+    assert read_heartbeat(tmp_path) is None
+    assert client._read_snapshot() is None
+    assert not client.get_snapshot().history.empty
+    print("  ✓ Stale daemon falls back to direct queries")
+
+def test_untrusted_shared_dir(tmp_path, monkeypatch):
+    """Test that a shared directory others could write to, or a symlink, is never trusted."""
+    print("Testing shared directory checks...")
+
+    monkeypatch.delenv('SLURMSMAC_SHARED_DIR', raising=False)
+    with pytest.raises(ValueError):
+        SnapshotDaemon()
+
+    shared = tmp_path / 'shared'
+    daemon = SnapshotDaemon(directory=shared, interval=30, user_ids=USER_IDS,
+                            collector_factory=lambda users: MockSlurmDataCollector(users=users))
+    client = SharedSnapshotCollector(MockSlurmDataCollector(users=['ann']), 'ann', directory=shared)
+    daemon.poll_once()
+    assert client._read_snapshot() is not None
+
+    # A snapshot others can read is not used
+    os.chmod(shared / 'snapshots' / 'ann.json', 0o644)
+    assert client._read_snapshot() is None
+    daemon.poll_once()
+    assert client._read_snapshot() is not None
+
+    link = tmp_path / 'link'
+    link.symlink_to(shared)
+    assert read_heartbeat(link) is None
+    with pytest.raises(PermissionError):
+        SnapshotDaemon(directory=link)
+
+    os.chmod(shared, 0o777)
+    assert read_heartbeat(shared) is None
+    # The daemon does not take over (or chmod) a directory others can write to
+    with pytest.raises(PermissionError):
+        SnapshotDaemon(directory=shared)
+    assert os.stat(shared).st_mode & 0o777 == 0o777
+    print("  ✓ Untrusted directories ignored")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the vectorized efficiency engine"""
+
+import time
+import numpy as np
+import pandas as pd
+from slurmsmac.efficiency import history_efficiency, requested_memory, with_history_efficiency
+from slurmsmac.rollups import aggregate, contributions, summarize
+
+GIB = 1024 ** 3
+
+def _history():
+    return pd.DataFrame({
+        'ncpus': [4, 8, 2],
+        'nnodes': 2,
+        'elapsed': pd.to_timedelta([3600] * 3, unit='s'),
+        'total_cpu': pd.to_timedelta([7200] * 3, unit='s'),
+        'max_rss': [2 * GIB, GIB, np.nan],
+        'req_mem': [4 * GIB, GIB / 8, GIB],
+        'req_mem_per': ['', 'c', 'n'],
+    })
+
+def test_efficiency_values():
+    """Test memory/CPU efficiency and waste on known values."""
+    print("Testing efficiency values...")
+
+    jobs = _history()
+    assert list(requested_memory(jobs)) == [4 * GIB, GIB, 2 * GIB]
+    eff = history_efficiency(jobs)
+    print(eff)
+    assert eff['mem_eff'].tolist()[:2] == [0.5, 1.0]
+    assert pd.isna(eff['mem_eff'][2])
+    assert eff['cpu_eff'].tolist() == [0.5, 0.25, 1.0]
+    assert eff['wasted_core_hours'].tolist() == [2.0, 6.0, 0.0]
+    assert eff['wasted_gb_hours'][0] == 2.0
+    print("  ✓ Efficiencies match hand calculations")
+
+    # The stats panel averages and totals them through the history rollups
+    stats = summarize(aggregate(contributions(with_history_efficiency(jobs))))
+    assert stats['avg_mem_eff'] == 0.75
+    assert stats['wasted_core_hours'] == 8.0
+    print("  ✓ Summary aggregates")
+
+def test_efficiency_scale():
+    """Test that a 100k-row history is processed quickly."""
+    print("Testing efficiency at scale...")
+
+    jobs = _history()
+    jobs = jobs.loc[np.repeat(jobs.index, 33334)].reset_index(drop=True)
+    started = time.perf_counter()
+    eff = history_efficiency(jobs)
+    elapsed = time.perf_counter() - started
+    print(f"  {len(jobs)} rows in {elapsed * 1000:.1f} ms")
+    assert len(eff) == len(jobs)
+    assert elapsed < 1.0
+
+if __name__ == "__main__":
+    try:
+        test_efficiency_values()
+        test_efficiency_scale()
+        print("\n✓ Efficiency tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
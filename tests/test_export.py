@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the headless export mode"""
+
+import contextlib
+import getpass
+import io
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+from slurmsmac import build_parser
+from slurmsmac.export import export_once, export_snapshot, plan_outputs
+from slurmsmac.fake_slurm import FakeSlurmRunner
+from slurmsmac.job_steps import collapse_steps, is_step
+from slurmsmac.job_store import JobStore
+from slurmsmac.slurm_data import HISTORY_COLUMNS, MockSlurmDataCollector, RealSlurmDataCollector
+from slurmsmac.synthetic import SyntheticCluster
+
+NOW = datetime(2025, 3, 3, 12, 0, 0)
+
+def _collector() -> MockSlurmDataCollector:
+    return MockSlurmDataCollector(cluster=SyntheticCluster([getpass.getuser()], jobs_per_day=300, seed=5,
+                                                           clock=lambda: NOW))
+
+def test_export_files():
+    """Test one file per source in chunks, read back with the same rows."""
+    print("Testing export to files...")
+    expected = _collector().get_snapshot(days=3)
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = export_once(_collector(), days=3, sources=['active', 'history', 'steps', 'stats'],
+                               fmt='csv', output=directory + '/', rows=100)
+        assert not snapshot.errors and snapshot.history.empty
+        assert sorted(path.name for path in Path(directory).iterdir()) == \
+            ['active.csv', 'history.csv', 'stats.csv', 'steps.csv']
+
+        history = pd.read_csv(Path(directory) / 'history.csv', dtype={'job_id': str})
+        print(f"  {len(history)} history rows in chunks of 100")
+        assert len(expected.history) > 100
+        assert history['job_id'].tolist() == expected.history['job_id'].tolist()
+        # Durations are seconds, times ISO 8601
+        assert history['elapsed'].tolist() == expected.history['elapsed'].dt.total_seconds().tolist()
+        assert pd.to_datetime(history['start']).notna().any()
+        assert history['mem_eff'].notna().any()
+
+        stats = pd.read_csv(Path(directory) / 'stats.csv')
+        assert len(stats) == 1 and stats['total_jobs'][0] == expected.stats['total_jobs']
+        assert abs(stats['avg_mem_eff'][0] - expected.stats['avg_mem_eff']) < 1e-9
+
+        export_snapshot(expected, ['history'], output=str(Path(directory) / 'history.jsonl'), rows=7)
+        lines = (Path(directory) / 'history.jsonl').read_text().splitlines()
+        assert len(lines) == len(expected.history) and 'source' not in json.loads(lines[0])
+    print("  ✓ Files match the snapshot")
+
+def test_export_streams_history():
+    """Test that history is exported a chunk of whole jobs at a time, from sacct or the job store."""
+    print("Testing streamed history export...")
+    runner = FakeSlurmRunner(SyntheticCluster([getpass.getuser()], jobs_per_day=5000, seed=3))
+    chunks = list(RealSlurmDataCollector(use_store=False, runner=runner).iter_job_history(days=2))
+    print(f"  {len(chunks)} chunks from sacct's output batches")
+    assert len(chunks) > 1
+    seen, folded = set(), 0
+    for chunk in chunks:
+        jobs, steps = collapse_steps(chunk)
+        # Every step is folded into its job within the chunk
+        assert len(jobs) + len(steps) == len(chunk)
+        assert not seen & set(jobs['job_id'])
+        seen |= set(jobs['job_id'])
+        folded += jobs['num_steps'].sum()
+    assert folded > 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(HISTORY_COLUMNS, path=Path(directory) / 'jobs.sqlite')
+        collector = RealSlurmDataCollector(job_store=store, runner=runner)
+        chunks = list(collector.iter_job_history(days=2, rows=1000))
+        assert len(chunks) > 1
+        ids = pd.concat([chunk['job_id'] for chunk in chunks])
+        assert sum(len(collapse_steps(chunk)[0]) for chunk in chunks) == (~is_step(ids)).sum()
+
+        snapshot = export_once(collector, days=2, sources=['history', 'steps', 'stats'], fmt='csv',
+                               output=directory + '/out/', rows=1000)
+        assert not snapshot.errors
+        history = pd.read_csv(Path(directory) / 'out' / 'history.csv', dtype={'job_id': str})
+        steps = pd.read_csv(Path(directory) / 'out' / 'steps.csv', dtype={'job_id': str})
+        # Taken after the export, so the window can only have lost jobs since
+        stored = store.load(collector.scope, collector.window_start(2))['job_id']
+        print(f"  {len(history)} jobs and {len(steps)} steps from the job store")
+        assert history['job_id'].is_unique and set(stored[~is_step(stored)]) <= set(history['job_id'])
+        assert set(stored[is_step(stored)]) <= set(steps['job_id'])
+        stats = pd.read_csv(Path(directory) / 'out' / 'stats.csv')
+        assert stats['history_jobs'][0] == len(history)
+    print("  ✓ Whole jobs per chunk, stats over all of them")
+
+def test_export_stdout():
+    """Test that sources sharing stdout are tagged, and that formats needing files say so."""
+    print("Testing export to stdout...")
+    snapshot = _collector().get_snapshot(days=3)
+    stream = io.StringIO()
+    with contextlib.redirect_stdout(stream):
+        export_snapshot(snapshot)
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    sources = pd.Series([record['source'] for record in records]).value_counts()
+    assert sources.to_dict() == {'history': len(snapshot.history), 'active': len(snapshot.active), 'stats': 1}
+
+    for fmt in ('csv', 'parquet'):
+        try:
+            plan_outputs(['active', 'history'], fmt, None)
+        except ValueError as e:
+            print(f"  {fmt}: {e}")
+        else:
+            raise AssertionError(f"{fmt} accepted several sources in one stream")
+    assert plan_outputs(['history'], None, 'jobs.parquet') == ('parquet', {'history': Path('jobs.parquet')})
+    print("  ✓ Tagged JSON Lines on stdout")
+
+def test_export_options():
+    """Test the export subcommand's options."""
+    args = build_parser().parse_args(['-u', 'alice', 'export', 'history', '-f', 'csv', '--history-days', '30'])
+    assert args.command == 'export' and args.sources == ['history'] and args.format == 'csv'
+    assert args.users == ['alice'] and args.history_days == 30 and args.output == '-'
+    assert build_parser().parse_args(['--once']).once
+
+if __name__ == "__main__":
+    try:
+        test_export_files()
+        test_export_streams_history()
+        test_export_stdout()
+        test_export_options()
+        print("\n✓ Export tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the real collector against fake squeue/sacct/sstat commands"""
+
+import getpass
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from slurmsmac.fake_slurm import FakeSlurmRunner
+from slurmsmac.job_store import JobStore
+from slurmsmac.slurm_data import CommandRunner, RealSlurmDataCollector, HISTORY_COLUMNS
+from slurmsmac.synthetic import SyntheticCluster
+
+NOW = datetime(2025, 3, 3, 12, 0, 0)
+
+def _runner(**kwargs):
+    cluster = SyntheticCluster([getpass.getuser(), 'bob'], jobs_per_day=2000, seed=3, clock=lambda: NOW)
+    return FakeSlurmRunner(cluster, **kwargs)
+
+def test_real_parsing_path():
+    """Test that fake command output goes through the real collector."""
+    print("Testing real collector with fake commands...")
+
+    runner = _runner()
+    collector = RealSlurmDataCollector(use_store=False, runner=runner)
+    snapshot = collector.get_snapshot(days=2)
+    print(f"  Commands: {[call[0] for call in runner.calls]}")
+    assert [call[0] for call in runner.calls] == ['squeue', 'sstat', 'sacct']
+    assert not snapshot.errors
+
+    active = snapshot.active
+    assert not active.empty and set(active['user']) == {collector.username}
+    running = active[active['state'] == 'RUNNING']
+    assert running['used_memory'].notna().all()
+    assert running['mem_eff'].between(0, 1).all()
+
+    history = snapshot.history
+    assert set(history['user']) == {collector.username}
+    assert history['elapsed'].notna().all() and history['req_mem'].notna().all()
+    assert history['cpu_eff'].notna().any()
+    print(f"  ✓ {len(active)} active and {len(history)} history rows parsed")
+
+def test_incremental_sync_with_fake_sacct():
+    """Test the job store flow against the fake sacct."""
+    print("Testing incremental sync...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = _runner()
+        store = JobStore(HISTORY_COLUMNS, path=Path(tmp) / 'jobs.sqlite')
+        collector = RealSlurmDataCollector(job_store=store, users=['bob'], runner=runner)
+        first = collector.get_job_history(days=2)
+        second = collector.get_job_history(days=2)
+        selections = [call[call.index('-S') + 1] for call in runner.calls if '-S' in call]
+        print(f"  sacct -S: {selections}")
+        assert selections[1] > selections[0]
+        assert set(first['job_id']) == set(second['job_id'])
+        assert set(second['user']) == {'bob'}
+    print("  ✓ Second refresh only asks for recent changes")
+
+def test_latency_failures_and_recordings():
+    """Test artificial latency, failing commands and replayed output."""
+    print("Testing latency, failures and recordings...")
+
+    runner = _runner(latency={'sacct': 0.2}, failing={'squeue'})
+    snapshot = RealSlurmDataCollector(use_store=False, runner=runner).get_snapshot()
+    print(f"  Timings: {snapshot.timings}, errors: {snapshot.errors}")
+    assert snapshot.timings['history'] >= 0.2
+    assert 'squeue failed' in snapshot.errors['active']
+    assert not snapshot.history.empty
+
+    recorded = '42|replayed|RUNNING|1-02:03:04|node7|4|8G|None|ann|lab|gpu\n'
+    runner = _runner(recordings={'squeue': recorded, 'sstat': '42.batch|2097152K\n'})
+    active = RealSlurmDataCollector(use_store=False, runner=runner).get_active_jobs()
+    job = active.iloc[0]
+    assert job['name'] == 'replayed'
+    assert job['time'].total_seconds() == 93784
+    assert job['used_memory'] == 2 * 1024 ** 3
+    print("  ✓ Recorded output is replayed verbatim")
+
+def test_streaming_history():
+    """Test that sacct output is parsed in batches while it streams."""
+    print("Testing streamed sacct...")
+
+    script = 'import sys\nfor i in range(20000): sys.stdout.write(f"{i}|job\\x1b|COMPLETED\\n")\nsys.exit(3)'
+    chunks = []
+    try:
+        for chunk in CommandRunner().stream([sys.executable, '-c', script], chunk_size=4096):
+            chunks.append(chunk)
+    except subprocess.CalledProcessError as e:
+        assert e.returncode == 3
+    else:
+        raise AssertionError('exit status not reported')
+    output = b''.join(chunks)
+    assert len(chunks) > 1 and output.count(b'\n') == 20000
+
+    cluster = SyntheticCluster(['bob'], jobs_per_day=5_000, seed=3)
+    collector = RealSlurmDataCollector(use_store=False, users=['bob'], runner=FakeSlurmRunner(cluster))
+    batches = []
+    history = collector.get_job_history(days=2, progress=batches.append)
+    print(f"  {len(history)} rows arrived in {len(batches)} batches")
+    assert len(batches) > 1
+    assert sum(len(batch) for batch in batches) == len(history)
+    print("  ✓ Rows delivered before sacct finished")
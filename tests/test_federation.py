@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test collecting from several clusters at once"""
+
+import asyncio
+import getpass
+import time
+from datetime import datetime
+from typing import Optional
+from slurmsmac import build_parser
+from slurmsmac.fake_slurm import FakeSlurmRunner
+from slurmsmac.federation import FederatedSlurmDataCollector
+from slurmsmac.job_arrays import TASKS_COLUMN
+from slurmsmac.job_steps import STEPS_COLUMN, job_keys
+from slurmsmac.main import Dashboard
+from slurmsmac.slurm_data import RealSlurmDataCollector
+from slurmsmac.synthetic import SyntheticCluster
+
+NOW = datetime(2025, 3, 3, 12, 0, 0)
+
+def _member(name: str, index: int, sample_usage: bool = True, seed: Optional[int] = None,
+            **kwargs) -> RealSlurmDataCollector:
+    # Every cluster's job ids start at the same number, so they collide
+    cluster = SyntheticCluster([getpass.getuser()], jobs_per_day=2000, seed=index if seed is None else seed,
+                               clock=lambda: NOW)
+    return RealSlurmDataCollector(use_store=False, cluster=name, sample_usage=sample_usage,
+                                  runner=FakeSlurmRunner(cluster, **kwargs))
+
+def test_slow_cluster():
+    """Test that a slow cluster is waited for only up to its timeout and shows up later."""
+    print("Testing per-cluster timeouts...")
+    members = {'hpc': _member('hpc', 0), 'gpu': _member('gpu', 1, sample_usage=False, latency=1.0)}
+    collector = FederatedSlurmDataCollector(members, timeouts={'gpu': 0.3})
+    started = time.perf_counter()
+    snapshot = collector.get_snapshot(days=2)
+    elapsed = time.perf_counter() - started
+    print(f"  First refresh: {elapsed:.2f}s, {snapshot.cluster_health['gpu'].describe()}")
+    assert elapsed < 0.9
+    # One cluster answering is enough for the source to count as refreshed
+    assert not snapshot.errors
+    assert set(snapshot.active['cluster']) == {'hpc'} and set(snapshot.history['cluster']) == {'hpc'}
+    assert snapshot.cluster_health['hpc'].ok and not snapshot.cluster_health['gpu'].ok
+
+    time.sleep(1.0)
+    snapshot = collector.get_snapshot(days=2)
+    assert set(snapshot.active['cluster']) == {'hpc', 'gpu'}
+    assert all(health.ok for health in snapshot.cluster_health.values())
+    assert job_keys(snapshot.active).is_unique and job_keys(snapshot.history).is_unique
+    # The late answer was picked up instead of asking the slow cluster again
+    gpu_calls = [call for call in members['gpu'].runner.calls]
+    assert [call[0] for call in gpu_calls] == ['squeue', 'sacct']
+    assert all(call[1:3] == ['-M', 'gpu'] for call in gpu_calls)
+    assert 'sstat' in [call[0] for call in members['hpc'].runner.calls]
+    print("  ✓ Slow cluster flagged, then merged")
+
+def test_failing_cluster():
+    """Test that a failing cluster keeps its last rows and only a total outage is an error."""
+    print("Testing failing clusters...")
+    members = {'hpc': _member('hpc', 0), 'gpu': _member('gpu', 1)}
+    collector = FederatedSlurmDataCollector(members)
+    first = collector.get_snapshot(days=2, sources=['active'])
+    members['gpu'].runner.failing = {'squeue'}
+    second = collector.get_snapshot(days=2, sources=['active'])
+    assert not second.errors
+    assert 'squeue failed' in second.cluster_health['gpu'].errors['active']
+    gpu = second.active[second.active['cluster'] == 'gpu']
+    assert set(gpu['job_id']) == set(first.active.loc[first.active['cluster'] == 'gpu', 'job_id'])
+
+    members['hpc'].runner.failing = {'squeue'}
+    third = collector.get_snapshot(days=2, sources=['active'])
+    print(f"  {third.errors['active']}")
+    assert 'hpc:' in third.errors['active'] and 'gpu:' in third.errors['active']
+    print("  ✓ Stale rows kept per cluster")
+
+def test_shared_job_ids():
+    """Test that jobs of two clusters with the same ids are all kept apart."""
+    print("Testing clusters sharing job ids...")
+    # The same workload on both clusters: every job, step and array task id exists twice
+    members = {'hpc': _member('hpc', 0), 'gpu': _member('gpu', 1, seed=0)}
+    single = _member('hpc', 0).get_snapshot(days=2)
+    snapshot = FederatedSlurmDataCollector(members).get_snapshot(days=2)
+    print(f"  {len(snapshot.history)} history rows, {snapshot.history['job_id'].nunique()} distinct ids")
+    assert len(snapshot.history) == 2 * len(single.history)
+    assert snapshot.history['job_id'].nunique() == len(single.history)
+    assert job_keys(snapshot.history).is_unique
+
+    # Steps are folded into their own cluster's job, and stats count both clusters' jobs
+    for name in members:
+        jobs = snapshot.history[snapshot.history['cluster'] == name]
+        assert jobs[STEPS_COLUMN].tolist() == single.history[STEPS_COLUMN].tolist()
+        assert jobs['max_rss'].fillna(-1).tolist() == single.history['max_rss'].fillna(-1).tolist()
+    assert len(snapshot.steps) == 2 * len(single.steps)
+    assert snapshot.stats['history_jobs'] == 2 * single.stats['history_jobs']
+
+    # Array summaries per cluster, each with its own tasks
+    rows, tasks = snapshot.history_view
+    single_rows, single_tasks = single.history_view
+    assert len(rows) == 2 * len(single_rows) and len(tasks) == 2 * len(single_tasks)
+    assert job_keys(rows).is_unique
+    assert rows[TASKS_COLUMN].sum() == 2 * single_rows[TASKS_COLUMN].sum()
+    print("  ✓ Steps, array tasks and stats kept per cluster")
+
+def test_cluster_options():
+    """Test parsing of -M with per-cluster timeouts."""
+    args = build_parser().parse_args(['-M', 'hpc,gpu:5', '-M', 'old:0.5', '--cluster-timeout', '30'])
+    assert args.clusters == [('hpc', None), ('gpu', 5.0), ('old', 0.5)]
+    assert args.cluster_timeout == 30
+
+async def _run_dashboard():
+    app = Dashboard(clusters={'hpc': 5, 'gpu': 5})
+    async with app.run_test(size=(200, 60)) as pilot:
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+        # No Slurm here, so each cluster gets its own mock workload
+        assert app.is_mock_mode
+        table = app.query_one("#active-jobs-table")
+        assert "Cluster" in [str(column.label) for column in table.columns.values()]
+        health = app.query_one("#cluster-health")
+        assert not health.has_class("hidden")
+        assert "hpc ✓" in str(health.content) and "gpu ✓" in str(health.content)
+        assert set(app.snapshot.active['cluster']) == {'hpc', 'gpu'}
+        # The mock clusters' job ids overlap; every row still gets its own table row
+        rows, _ = app.snapshot.active_view
+        assert rows['job_id'].nunique() < len(rows) == table.row_count
+        history = app.query_one("#history-table")
+        assert history.row_count == len(app.history_pager.window())
+
+def test_dashboard_clusters():
+    """Test the cluster column and health line in the dashboard."""
+    print("Testing multi-cluster dashboard...")
+    asyncio.run(_run_dashboard())
+    print("  ✓ Cluster column and health shown")
+
+if __name__ == "__main__":
+    try:
+        test_slow_cluster()
+        test_failing_cluster()
+        test_shared_job_ids()
+        test_cluster_options()
+        test_dashboard_clusters()
+        print("\n✓ Federation tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the paged history view"""
+
+import pandas as pd
+from slurmsmac.history_view import HistoryPager
+
+def _history(n):
+    return pd.DataFrame({
+        'job_id': [str(i) for i in range(n)],
+        'name': ['train' if i % 2 else 'analysis' for i in range(n)],
+        'state': 'COMPLETED',
+        'elapsed': pd.to_timedelta(range(n), unit='s'),
+    })
+
+def test_history_window():
+    """Test that only a window of rows is materialized and it slides with the cursor."""
+    print("Testing history window...")
+
+    pager = HistoryPager(window_size=100, edge=5)
+    pager.set_data(_history(50000))
+    assert len(pager.window()) == 100
+    print(f"  {pager.describe()}")
+
+    assert pager.slide_for_cursor(96)
+    assert pager.offset == 50
+    assert not pager.slide_for_cursor(50)
+    assert pager.slide_for_cursor(2)
+    assert pager.offset == 0
+    print("  ✓ Window slides near its edges")
+
+    # Position survives a data refresh
+    pager.offset = 49950
+    pager.set_data(_history(50000))
+    assert pager.window()['job_id'].iloc[-1] == '49999'
+    assert not pager.slide_for_cursor(99)
+
+def test_history_sort_filter():
+    """Test that sorting and filtering happen on the data side."""
+    print("Testing history sort and filter...")
+
+    pager = HistoryPager(window_size=10)
+    pager.set_data(_history(1000))
+    pager.set_filter('TRAIN')
+    assert pager.total == 500
+    assert set(pager.window()['name']) == {'train'}
+
+    assert pager.cycle_sort() == 'elapsed'
+    pager.reverse()
+    assert pager.window()['job_id'].iloc[0] == '999'
+    print(f"  {pager.describe()}")
+    print("  ✓ Sorted and filtered")
+
+def test_step_expansion():
+    """Test that an expanded job's steps follow it, whatever the sort order."""
+    print("Testing step expansion...")
+
+    jobs = _history(20).assign(num_steps=[2 if i % 5 == 0 else 0 for i in range(20)])
+    parents = jobs.loc[jobs['num_steps'] > 0, 'job_id']
+    steps = pd.DataFrame({
+        'job_id': [f'{job}.{step}' for job in parents for step in ('batch', '0')],
+        'name': 'batch', 'state': 'COMPLETED', 'elapsed': pd.Timedelta(seconds=1),
+        'parent_id': [job for job in parents for _ in range(2)],
+    })
+    pager = HistoryPager(window_size=10)
+    pager.set_data(jobs, steps)
+    assert not pager.toggle('1')
+    assert pager.toggle('5')
+    pager.reverse()
+    window = pager.window()
+    assert list(window['job_id']) == ['19', '18', '17', '16', '15', '14', '13', '12', '11', '10']
+    pager.offset = 10
+    window = pager.window()
+    assert list(window['job_id'][:4]) == ['9', '8', '7', '6']
+    assert list(window['job_id'][4:7]) == ['5', '5.batch', '5.0']
+    labels = list(pager.job_labels(window))
+    assert labels[3] == '6' and labels[4] == '5 ▾' and labels[5] == '  └ 5.batch'
+    assert pager.job_labels(jobs.head(1)).iloc[0] == '0 ▸'
+    assert pager.total == 22
+
+    pager.set_data(jobs, steps)
+    assert pager.total == 22
+    assert pager.toggle('5')
+    assert pager.total == 20
+    print("  ✓ Steps shown under their job and collapsed again")
+
+if __name__ == "__main__":
+    try:
+        test_history_window()
+        test_history_sort_filter()
+        test_step_expansion()
+        print("\n✓ History view tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
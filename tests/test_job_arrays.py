@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test compression of job arrays into summary rows"""
+
+import asyncio
+import pandas as pd
+from textual.widgets import DataTable
+from slurmsmac.efficiency import with_active_efficiency
+from slurmsmac.history_view import HistoryPager
+from slurmsmac.job_arrays import compress_active_arrays, compress_history_arrays, describe_array, task_counts
+from slurmsmac.main import Dashboard
+from slurmsmac.parsing import read_parsable, type_active_jobs, type_job_history
+from slurmsmac.slurm_data import ACTIVE_COLUMNS, BaseSlurmDataCollector, HISTORY_COLUMNS
+
+SACCT_OUTPUT = """\
+100|solo|COMPLETED|2025-01-01T09:00:00|2025-01-01T10:00:00|01:00:00|1G||1|node1|2G|00:30:00|1|ann|lab|gpu
+200_1|sweep|COMPLETED|2025-01-01T10:00:00|2025-01-01T11:00:00|01:00:00|1G||2|node2|4G|01:00:00|1|ann|lab|gpu
+200_2|sweep|FAILED|2025-01-01T10:00:00|2025-01-01T12:00:00|02:00:00|2G||2|node3|4G|04:00:00|1|ann|lab|gpu
+300_1|other|COMPLETED|2025-01-01T10:30:00|2025-01-01T11:00:00|00:30:00|1G||1|node2|2G|00:30:00|1|ann|lab|gpu
+200_3|sweep|COMPLETED|2025-01-01T10:00:00|2025-01-01T13:00:00|03:00:00|3G||2|node4|4G|03:00:00|1|ann|lab|gpu
+"""
+
+SQUEUE_OUTPUT = """\
+400_[5-5000%10]|scan|PENDING|0:00|(Priority)|2|4G|None|ann|lab|gpu
+400_1|scan|RUNNING|10:00|node1|2|4G|None|ann|lab|gpu
+400_2|scan|RUNNING|30:00|node2|2|4G|None|ann|lab|gpu
+500|single|RUNNING|1:00:00|node3|8|16G|None|ann|lab|gpu
+"""
+
+def test_compress_history():
+    """Test that array tasks collapse into one summary row in place of the first task."""
+    print("Testing history array compression...")
+
+    jobs, _ = BaseSlurmDataCollector.history_frames(type_job_history(read_parsable(SACCT_OUTPUT, HISTORY_COLUMNS)))
+    rows, tasks = compress_history_arrays(jobs)
+    print(f"  {len(jobs)} jobs -> {len(rows)} rows")
+    assert list(rows['job_id']) == ['100', '200', '300_1']
+    assert list(tasks['job_id']) == ['200_1', '200_2', '200_3']
+    assert set(tasks['array_id']) == {'200'}
+
+    array = rows[rows['job_id'] == '200'].iloc[0]
+    assert array['num_tasks'] == 3
+    assert array['state'] == '2 CD, 1 F'
+    assert array['elapsed'] == pd.Timedelta(hours=2)
+    assert array['elapsed_p90'] == pd.Timedelta(hours=2, minutes=48)
+    assert array['ncpus'] == 6 and array['max_rss'] == 3 * 1024 ** 3
+    assert array['start'] == pd.Timestamp('2025-01-01T10:00:00')
+    assert array['end'] == pd.Timestamp('2025-01-01T13:00:00')
+    assert array['mem_eff_p50'] == 0.5 and array['cpu_eff'] == 0.5
+    description = describe_array(array)
+    print(f"  {description}")
+    assert description.startswith('Array 200: 3 tasks (2 CD, 1 F)')
+    assert 'runtime p10/p50/p90 01:12:00 / 02:00:00 / 02:48:00' in description
+    print("  ✓ Counts, totals and percentiles aggregated")
+
+    pager = HistoryPager()
+    pager.set_data(rows, tasks=tasks)
+    assert pager.array_summary('200') is not None and pager.array_summary('100') is None
+    assert pager.toggle('200') and not pager.toggle('100')
+    assert list(pager.window()['job_id']) == ['100', '200', '200_1', '200_2', '200_3', '300_1']
+    assert list(pager.job_labels(pager.window()))[1:3] == ['200_[3 tasks] ▾', '  200_1']
+    print("  ✓ Tasks shown under their array on demand")
+
+def test_compress_active():
+    """Test that pending ranges count all their tasks and runtimes only count running tasks."""
+    print("Testing active array compression...")
+
+    assert list(task_counts(pd.Series(['1_[1-5000%10]', '2_[1,3,5-9:2]', '3_4', '5']))) == [5000, 5, 1, 1]
+    active = type_active_jobs(read_parsable(SQUEUE_OUTPUT, ACTIVE_COLUMNS))
+    active['used_memory'] = [None, 1024 ** 3, 3 * 1024 ** 3, None]
+    rows, tasks = compress_active_arrays(with_active_efficiency(active))
+    assert list(rows['job_id']) == ['400', '500']
+    array = rows.iloc[0]
+    print(f"  {describe_array(array)}")
+    assert array['num_tasks'] == 4998 and array['state'] == '4996 PD, 2 R'
+    assert array['cpus'] == 2 * 4998
+    assert array['time'] == pd.Timedelta(minutes=20)
+    assert array['mem_eff'] == 0.5 and array['used_memory'] == 3 * 1024 ** 3
+    assert len(tasks) == 3
+    print("  ✓ Pending range counted")
+
+async def _expand_active_array():
+    app = Dashboard()
+    async with app.run_test() as pilot:
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+        table = app.query_one("#active-jobs-table", DataTable)
+        labels = [table.get_row_at(i)[0] for i in range(table.row_count)]
+        row = next(i for i, label in enumerate(labels) if 'tasks] ▸' in label)
+        table.move_cursor(row=row)
+        await pilot.pause()
+        detail = app.query_one("#active-array-detail")
+        assert not detail.has_class("hidden")
+        assert str(detail.render()).startswith('Array ')
+        await pilot.press("enter")
+        await pilot.pause()
+        assert table.get_row_at(row)[0].endswith(' ▾')
+        assert table.get_row_at(row + 1)[0].startswith('  ')
+        assert table.row_count > len(labels)
+
+def test_dashboard_arrays(monkeypatch):
+    """Test that arrays show as one row with a detail line and expand with Enter."""
+    print("Testing arrays in the dashboard...")
+    monkeypatch.setenv('SLURMSMAC_MOCK_JOBS', '20000')
+    asyncio.run(_expand_active_array())
+    print("  ✓ Array expanded")
+
+if __name__ == "__main__":
+    try:
+        test_compress_history()
+        test_compress_active()
+        print("\n✓ Job array tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
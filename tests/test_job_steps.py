@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test folding of job steps into their jobs"""
+
+import asyncio
+import pandas as pd
+from textual.widgets import DataTable
+from slurmsmac.main import Dashboard
+from slurmsmac.efficiency import with_history_efficiency
+from slurmsmac.job_steps import collapse_steps
+from slurmsmac.parsing import read_parsable, type_job_history
+from slurmsmac.slurm_data import HISTORY_COLUMNS
+
+SACCT_OUTPUT = """\
+101|train|COMPLETED|2025-01-01T10:00:00|2025-01-01T12:00:00|02:00:00|||4|node1|16G|02:00:00|1|ann|lab|gpu
+101.batch|batch|COMPLETED|2025-01-01T10:00:00|2025-01-01T12:00:00|02:00:00|1G|2G|4|node1||01:00:00|1|ann|lab|gpu
+101.extern|extern|COMPLETED|2025-01-01T10:00:00|2025-01-01T12:00:00|02:00:00|1M|1M|4|node1||00:00:00|1|ann|lab|gpu
+101.0|train|COMPLETED|2025-01-01T10:00:00|2025-01-01T12:00:00|02:00:00|8G|9G|4|node1||05:00:00|1|ann|lab|gpu
+102_3|sweep|FAILED|2025-01-01T10:00:00|2025-01-01T11:00:00|01:00:00|||1|node2|1Gn|00:30:00|1|ann|lab|gpu
+102_3.batch|batch|FAILED|2025-01-01T10:00:00|2025-01-01T11:00:00|01:00:00|512M|600M|1|node2||00:20:00|1|ann|lab|gpu
+103.batch|batch|COMPLETED|2025-01-01T10:00:00|2025-01-01T11:00:00|01:00:00|2G|2G|1|node3|4G|00:10:00|1|ann|lab|gpu
+"""
+
+def test_collapse_steps():
+    """Test that steps are folded into one row per job with aggregated peaks."""
+    print("Testing step collapsing...")
+
+    jobs, steps = collapse_steps(type_job_history(read_parsable(SACCT_OUTPUT, HISTORY_COLUMNS)))
+    jobs = jobs.set_index('job_id')
+    print(f"  {len(jobs)} jobs, {len(steps)} steps")
+    assert list(jobs.index) == ['101', '102_3', '103.batch']
+    assert list(jobs['num_steps']) == [3, 1, 0]
+    assert list(steps['parent_id']) == ['101', '101', '101', '102_3']
+
+    assert jobs.loc['101', 'max_rss'] == 8 * 1024 ** 3
+    assert jobs.loc['101', 'max_vmsize'] == 9 * 1024 ** 3
+    assert jobs.loc['101', 'total_cpu'].total_seconds() == 6 * 3600
+    assert jobs.loc['102_3', 'total_cpu'].total_seconds() == 30 * 60
+    assert (steps['req_mem'] == [16 * 1024 ** 3] * 3 + [1024 ** 3]).all()
+    print("  ✓ Peak memory and CPU time aggregated, orphan step kept")
+
+    jobs = with_history_efficiency(jobs)
+    assert jobs.loc['101', 'mem_eff'] == 0.5
+    assert jobs.loc['101', 'cpu_eff'] == 0.75
+    print("  ✓ Efficiencies use the aggregated values")
+
+    # Collapsed jobs and their steps (as the daemon publishes them) collapse to the same rows
+    once, once_steps = collapse_steps(type_job_history(read_parsable(SACCT_OUTPUT, HISTORY_COLUMNS)))
+    twice, _ = collapse_steps(pd.concat([once, once_steps.drop(columns=['parent_id'])]))
+    pd.testing.assert_frame_equal(twice, once)
+    empty_jobs, empty_steps = collapse_steps(type_job_history(read_parsable('', HISTORY_COLUMNS)))
+    assert empty_jobs.empty and empty_steps.empty and 'num_steps' in empty_jobs
+
+async def _expand_in_dashboard():
+    app = Dashboard()
+    async with app.run_test() as pilot:
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+        assert not app.snapshot.history['job_id'].str.contains('.', regex=False).any()
+        table = app.query_one("#history-table", DataTable)
+        rows = table.row_count
+        labels = [table.get_row_at(i)[0] for i in range(rows)]
+        row = next(i for i, label in enumerate(labels) if label.endswith(' ▸') and 'tasks]' not in label)
+        print(f"  Expanding {labels[row]}")
+        table.focus()
+        table.move_cursor(row=row)
+        await pilot.press("enter")
+        await pilot.pause()
+        assert table.get_row_at(row)[0].endswith(' ▾')
+        assert table.get_row_at(row + 1)[0].startswith('  └ ')
+        await pilot.press("enter")
+        await pilot.pause()
+        assert [table.get_row_at(i)[0] for i in range(rows)] == labels
+
+def test_dashboard_step_expansion():
+    """Test that Enter shows and hides a history job's steps."""
+    print("Testing step expansion in the dashboard...")
+    asyncio.run(_expand_in_dashboard())
+    print("  ✓ Steps toggled")
+
+if __name__ == "__main__":
+    try:
+        test_collapse_steps()
+        test_dashboard_step_expansion()
+        print("\n✓ Job step tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the incremental job history store"""
+
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+import pandas as pd
+from slurmsmac.job_store import JobStore
+from slurmsmac.slurm_data import RealSlurmDataCollector, HISTORY_COLUMNS
+
+def _job(job_id, state, start, end):
+    job = dict.fromkeys(HISTORY_COLUMNS, '0')
+    job.update({'job_id': job_id, 'name': 'test', 'state': state, 'start': start, 'end': end})
+    return job
+
+class ScriptedCollector(RealSlurmDataCollector):
+    """Real collector whose sacct calls return scripted results."""
+    def __init__(self, store, responses):
+        super().__init__(job_store=store)
+        self.responses = list(responses)
+        self.selections = []
+        self.streamed = []
+
+    def _query_sacct(self, selection, progress=None):
+        self.selections.append(selection)
+        if progress is not None:
+            self.streamed.append(selection)
+        return pd.DataFrame(self.responses.pop(0), columns=HISTORY_COLUMNS)
+
+def test_incremental_history():
+    """Test that only changed jobs are requested after the first sync."""
+    print("Testing incremental job store...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JobStore(HISTORY_COLUMNS, path=Path(tmp) / 'jobs.sqlite')
+        now = datetime.now()
+        t = lambda hours: (now - timedelta(hours=hours)).strftime('%Y-%m-%dT%H:%M:%S')
+        collector = ScriptedCollector(store, [
+            # First sync: the whole window
+            [_job('1', 'COMPLETED', t(30), t(29)), _job('2', 'RUNNING', t(2), 'Unknown')],
+            # Incremental sync: job 2 is not reported, so it is re-queried by id
+            [_job('3', 'PENDING', 'Unknown', 'Unknown')],
+            [_job('2', 'COMPLETED', t(2), t(0))],
+        ])
+
+        batches = []
+        history = collector.get_job_history(days=7, progress=batches.append)
+        print(f"  First sync selection: {collector.selections[0]}")
+        assert list(history['job_id']) == ['1', '2']
+        assert collector.streamed == collector.selections
+
+        # Only the whole window is streamed; an incremental sync shows the stored rows up front instead
+        history = collector.get_job_history(days=7, progress=batches.append)
+        print(f"  Incremental selections: {collector.selections[1:]}")
+        assert len(collector.streamed) == 1
+        assert list(batches[-1]['job_id']) == ['1', '2']
+        since = datetime.strptime(collector.selections[1][1], '%Y-%m-%dT%H:%M:%S')
+        assert since > now - timedelta(hours=1)
+        assert collector.selections[2] == ['-j', '2']
+        states = dict(zip(history['job_id'], history['state']))
+        print(f"  States: {states}")
+        assert states == {'1': 'COMPLETED', '2': 'COMPLETED', '3': 'PENDING'}
+        assert store.unfinished_job_ids(collector.username) == {'3'}
+
+        # A one-day window is answered from the store without job 1
+        store_only = store.load(collector.username, now - timedelta(days=1))
+        assert '1' not in set(store_only['job_id'])
+        print("  ✓ History served incrementally from the store")
+
+def test_widened_window():
+    """Test that widening the window only fetches the part before the stored one, plus the changes."""
+    print("Testing a widened window...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JobStore(HISTORY_COLUMNS, path=Path(tmp) / 'jobs.sqlite')
+        now = datetime.now()
+        t = lambda hours: (now - timedelta(hours=hours)).strftime('%Y-%m-%dT%H:%M:%S')
+        collector = ScriptedCollector(store, [
+            [_job('2', 'COMPLETED', t(30), t(29))],
+            # The days before the stored window, then what changed since the last sync
+            [_job('1', 'COMPLETED', t(100), t(99)), _job('2', 'COMPLETED', t(30), t(29))],
+            [_job('3', 'COMPLETED', t(1), t(0))],
+        ])
+        collector.get_job_history(days=2)
+        coverage_start = collector.selections[0][1]
+        history = collector.get_job_history(days=7)
+        print(f"  Selections: {collector.selections}")
+        backfill, delta = collector.selections[1:]
+        assert backfill[2:] == ['-E', coverage_start] and backfill[1] < coverage_start
+        assert len(delta) == 2 and delta[1] > coverage_start
+        assert list(history['job_id']) == ['1', '2', '3']
+
+        # The stored window now reaches back 7 days
+        collector.responses.append([])
+        collector.get_job_history(days=7)
+        assert len(collector.selections[-1]) == 2 and collector.selections[-1][1] > coverage_start
+        print("  ✓ Only the missing days are fetched")
+
+if __name__ == "__main__":
+    try:
+        test_incremental_history()
+        test_widened_window()
+        print("\n✓ Job store test passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the downsampled metrics history behind the trend sparklines"""
+
+import asyncio
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from slurmsmac.formatting import format_sparklines
+from slurmsmac.main import Dashboard
+from slurmsmac.metrics import MetricsHistory
+
+START = datetime(2025, 3, 3, 0, 0, 0)
+
+def _active(running: dict, pending: int = 0) -> pd.DataFrame:
+    """Typed-enough active jobs: running job id -> used bytes, plus pending jobs."""
+    ids = list(running) + [f'p{i}' for i in range(pending)]
+    return pd.DataFrame({
+        'job_id': ids,
+        'state': ['RUNNING'] * len(running) + ['PENDING'] * pending,
+        'cpus': [4] * len(ids),
+        'used_memory': list(running.values()) + [np.nan] * pending,
+    })
+
+def test_downsampling():
+    """Test that samples are consolidated into minute and hour means within fixed memory."""
+    print("Testing metrics tiers...")
+    metrics = MetricsHistory(aggregate_tiers=((0, 10), (60, 5), (3600, 3)), job_tiers=((0, 4), (60, 2)))
+    metrics.record(_active({'1': 100.0}, pending=2), START)
+    size = metrics.nbytes
+    for i in range(1, 6 * 360):
+        # One refresh every 10 seconds for six hours, with running jobs cycling
+        at = START + timedelta(seconds=10 * i)
+        metrics.record(_active({str(i // 30): float(i)}, pending=i % 3), at)
+    assert metrics.nbytes == size
+
+    raw = metrics.trend('pending')
+    assert len(raw) == 10 and list(raw[-3:]) == [(6 * 360 - 3 + k) % 3 for k in range(3)]
+    times, minutes = metrics.aggregates.latest(tier=1)
+    assert len(minutes) == 5 and np.all(np.diff(times) == 60)
+    # Each minute holds six samples cycling through 0, 1, 2 pending jobs
+    assert np.allclose(minutes[:, 1], 1.0)
+    hours = metrics.trend('running', tier=2)
+    assert len(hours) == 3 and np.allclose(hours, 1.0)
+    print(f"  {metrics.nbytes:,} bytes after {6 * 360:,} samples")
+
+def test_job_slots():
+    """Test that per-job series follow their jobs and ended jobs free their column."""
+    print("Testing per-job series...")
+    metrics = MetricsHistory(job_tiers=((0, 4),), job_slots=2)
+    metrics.record(_active({'a': 1.0, 'b': 2.0}), START)
+    metrics.record(_active({'a': 3.0, 'b': 4.0, 'c': 5.0}), START + timedelta(seconds=30))
+    metrics.record(_active({'a': 6.0, 'd': 7.0}), START + timedelta(seconds=60))
+    trends = metrics.job_trends(['a', 'd', 'b', 'unknown'], 3)
+    assert np.array_equal(trends[0], [1, 3, 6])
+    # d took over the column of an ended job but none of its samples
+    assert np.isnan(trends[1][:2]).all() and trends[1][2] == 7
+    assert np.isnan(trends[2]).all() and np.isnan(trends[3]).all()
+    assert metrics.jobs.width == 4
+    assert list(format_sparklines(trends)) == ['▂▅█', '  █', '   ', '   ']
+    print("  ✓ Slots reused without leaking samples")
+
+async def _run_dashboard():
+    app = Dashboard()
+    async with app.run_test(size=(200, 60)) as pilot:
+        await app.workers.wait_for_complete()
+        app.action_refresh_now()
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+        assert len(app.metrics.trend('running')) == 2
+        table = app.query_one("#active-jobs-table")
+        assert "Mem Trend" in [str(column.label) for column in table.columns.values()]
+        labels = app.query_one("#status-plot").content.columns[0].cells
+        assert "Cores in use" in labels
+
+def test_dashboard_trends():
+    """Test that refreshes feed the active table and status panel sparklines."""
+    print("Testing dashboard sparklines...")
+    asyncio.run(_run_dashboard())
+    print("  ✓ Sparklines drawn from recorded refreshes")
+
+if __name__ == "__main__":
+    try:
+        test_downsampling()
+        test_job_slots()
+        test_dashboard_trends()
+        print("\n✓ Metrics tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
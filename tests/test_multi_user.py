@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test multi-user / account / partition monitoring"""
+
+import pandas as pd
+from slurmsmac.grouping import summarize_by_user
+from slurmsmac.slurm_data import RealSlurmDataCollector, MockSlurmDataCollector
+
+def test_batched_selection():
+    """Test that several users/accounts/partitions go into one command."""
+    print("Testing batched selection arguments...")
+
+    collector = RealSlurmDataCollector(use_store=False)
+    assert not collector.is_multi_user
+    assert collector._selection_args('squeue') == ['-u', collector.username]
+    assert collector.scope == collector.username
+
+    collector = RealSlurmDataCollector(use_store=False, users=['ann', 'bob'], partitions=['gpu'])
+    assert collector.is_multi_user
+    assert collector._selection_args('squeue') == ['-u', 'ann,bob', '-p', 'gpu']
+    assert collector._selection_args('sacct') == ['-u', 'ann,bob', '-r', 'gpu']
+    print(f"  Scope: {collector.scope}")
+
+    collector = RealSlurmDataCollector(use_store=False, accounts=['lab1', 'lab2'])
+    assert collector._selection_args('sacct') == ['--allusers', '-A', 'lab1,lab2']
+    print("  ✓ One comma-separated query per command")
+
+def test_user_summary():
+    """Test per-user grouping of active jobs."""
+    print("Testing per-user summary...")
+
+    active = pd.DataFrame({
+        'user': ['ann', 'bob', 'ann', 'bob', 'cat'],
+        'state': ['RUNNING', 'PENDING', 'RUNNING', 'RUNNING', 'PENDING'],
+        'cpus': [4, 8, 2, 16, 1],
+    })
+    summary = summarize_by_user(active)
+    print(summary)
+    assert list(summary.index) == ['ann', 'bob', 'cat']
+    assert summary.loc['ann', 'running'] == 2 and summary.loc['ann', 'cores'] == 6
+    assert summary.loc['bob', 'pending'] == 1 and summary.loc['bob', 'cores'] == 16
+
+    mock = MockSlurmDataCollector(users=['ann', 'bob'])
+    assert mock.is_multi_user
+    assert set(mock.get_job_history()['user']) <= {'ann', 'bob'}
+    print("  ✓ Jobs grouped per user")
+
+if __name__ == "__main__":
+    try:
+        test_batched_selection()
+        test_user_summary()
+        print("\n✓ Multi-user tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test typed parsing of parsable Slurm output"""
+
+from datetime import datetime
+import pandas as pd
+from slurmsmac.parsing import (
+    BYTES_PER_JOB_TARGET, iter_parsable, read_parsable, parse_duration, parse_memory, type_job_history,
+)
+from slurmsmac.slurm_data import BaseSlurmDataCollector, HISTORY_COLUMNS
+from slurmsmac.synthetic import SyntheticCluster
+
+SACCT_OUTPUT = """\
+101|my analysis run|COMPLETED|2025-01-01T10:00:00|2025-01-01T12:30:00|02:30:00|||4|node1|16Gn|09:00:00
+101.batch|batch|COMPLETED|2025-01-01T10:00:00|2025-01-01T12:30:00|02:30:00|2048000K|4096000K|4|node1||08:59:59.500
+102|train|RUNNING|2025-01-02T08:00:00|Unknown|1-01:00:00|||32|node[1-2]|2000Mc|05:00.123
+"""
+
+def test_read_sacct():
+    """Test that sacct --parsable2 output is read and typed in one pass."""
+    print("Testing sacct parsing...")
+
+    raw = read_parsable(SACCT_OUTPUT, HISTORY_COLUMNS)
+    assert len(raw) == 3
+    assert raw.loc[0, 'name'] == 'my analysis run'
+    print("  ✓ Job names with spaces preserved")
+
+    jobs = type_job_history(raw)
+    print(f"  dtypes: {dict(jobs.dtypes.astype(str))}")
+    assert jobs.loc[0, 'elapsed'] == pd.Timedelta(hours=2, minutes=30)
+    assert jobs.loc[2, 'elapsed'] == pd.Timedelta(days=1, hours=1)
+    assert jobs.loc[2, 'total_cpu'] == pd.Timedelta(minutes=5, seconds=0.123)
+    assert jobs.loc[1, 'max_rss'] == 2048000 * 1024
+    assert pd.isna(jobs.loc[0, 'max_rss'])
+    assert jobs.loc[0, 'req_mem'] == 16 * 1024 ** 3 and jobs.loc[0, 'req_mem_per'] == 'n'
+    assert jobs.loc[2, 'req_mem'] == 2000 * 1024 ** 2 and jobs.loc[2, 'req_mem_per'] == 'c'
+    assert jobs.loc[2, 'ncpus'] == 32
+    assert jobs.loc[0, 'start'] == pd.Timestamp('2025-01-01T10:00:00')
+    assert pd.isna(jobs.loc[2, 'end'])
+    print("  ✓ Columns typed")
+
+def test_pipe_in_name():
+    """Test that a '|' inside a job name does not shift the fields after it."""
+    print("Testing '|' in job names...")
+
+    # sacct prints every field, so lines with extra ones are the only ones that overflow
+    full = SACCT_OUTPUT.replace('\n', '|1|ann|lab|cpu\n')
+    odd = full.replace('my analysis run', 'a|b||c', 1)
+    for output in (odd, full + odd):
+        raw = read_parsable(output, HISTORY_COLUMNS)
+        expected = read_parsable(full * (output.count('\n') // 3), HISTORY_COLUMNS)
+        expected.loc[len(expected) - 3, 'name'] = 'a|b||c'
+        assert raw['partition'].eq('cpu').all()
+        pd.testing.assert_frame_equal(raw, expected)
+    print("  ✓ Extra fields joined back into the name")
+
+def test_parse_helpers():
+    """Test duration and memory conversions on edge cases."""
+    print("Testing parse helpers...")
+
+    durations = parse_duration(pd.Series(['00:45', '1:02:03', 'UNLIMITED', '']))
+    assert durations[0] == pd.Timedelta(seconds=45)
+    assert durations[1] == pd.Timedelta(hours=1, minutes=2, seconds=3)
+    assert durations[2:].isna().all()
+
+    memory = parse_memory(pd.Series(['1.5G', '512', '0', 'N/A']), default_unit='M')
+    assert memory['bytes'][0] == 1.5 * 1024 ** 3
+    assert memory['bytes'][1] == 512 * 1024 ** 2
+    assert memory['bytes'][2] == 0
+    assert pd.isna(memory['bytes'][3])
+    print("  ✓ Edge cases handled")
+
+def test_iter_parsable():
+    """Test that output arriving in arbitrary chunks parses like the whole text."""
+    print("Testing streamed parsing...")
+
+    data = SACCT_OUTPUT.replace('train', 'tr\x1bain\x07').encode() * 50
+    chunks = [data[i:i + 37] for i in range(0, len(data), 37)]
+    batches = list(iter_parsable(chunks, HISTORY_COLUMNS, batch_bytes=1000))
+    print(f"  {len(chunks)} chunks parsed in {len(batches)} batches")
+    assert len(batches) > 1
+    streamed = pd.concat(batches, ignore_index=True)
+    expected = read_parsable(SACCT_OUTPUT * 50, HISTORY_COLUMNS)
+    pd.testing.assert_frame_equal(streamed, expected)
+    assert list(iter_parsable([b'', b'\n'], HISTORY_COLUMNS)) == []
+    print("  ✓ Control bytes dropped and lines split across chunks rejoined")
+
+def test_compact_memory():
+    """Test that typed jobs use compact columns and stay within the per-job memory target."""
+    print("Testing memory per job...")
+
+    cluster = SyntheticCluster(['ann', 'bob', 'cat'], jobs_per_day=20_000, seed=2, clock=lambda: datetime(2025, 3, 3))
+    raw = cluster.job_history(days=1)
+    jobs, steps = BaseSlurmDataCollector.history_frames(type_job_history(raw))
+    assert isinstance(jobs['state'].dtype, pd.CategoricalDtype)
+    assert isinstance(jobs['partition'].dtype, pd.CategoricalDtype)
+    assert jobs['ncpus'].dtype == 'int32'
+    per_job = jobs.memory_usage(deep=True).sum() / len(jobs)
+    per_step = steps.memory_usage(deep=True).sum() / len(steps)
+    per_raw = raw.memory_usage(deep=True).sum() / len(raw)
+    print(f"  {per_job:.0f} bytes per job, {per_step:.0f} per step, {per_raw:.0f} per raw row")
+    assert per_job < BYTES_PER_JOB_TARGET
+    assert per_step < BYTES_PER_JOB_TARGET
+    print("  ✓ Within target")
+
+if __name__ == "__main__":
+    try:
+        test_read_sacct()
+        test_pipe_in_name()
+        test_parse_helpers()
+        test_iter_parsable()
+        test_compact_memory()
+        print("\n✓ Parsing tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
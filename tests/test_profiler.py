@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the refresh profiler"""
+
+import asyncio
+import csv
+import getpass
+import json
+import time
+from datetime import datetime
+from slurmsmac.fake_slurm import FakeSlurmRunner
+from slurmsmac.main import Dashboard
+from slurmsmac.profiler import RefreshProfiler, instrument_collector
+from slurmsmac.slurm_data import RealSlurmDataCollector
+from slurmsmac.synthetic import SyntheticCluster
+
+def test_collector_stages(tmp_path):
+    """Test that commands and parsing are timed separately and exported."""
+    print("Testing collector instrumentation...")
+
+    cluster = SyntheticCluster([getpass.getuser()], jobs_per_day=2000, clock=lambda: datetime(2025, 3, 3, 12))
+    runner = FakeSlurmRunner(cluster, latency={'sacct': 0.05})
+    collector = RealSlurmDataCollector(use_store=False, runner=runner)
+    profiler = RefreshProfiler()
+    instrument_collector(collector, profiler)
+
+    profiler.begin(['active', 'history'])
+    snapshot = collector.get_snapshot()
+    profile = profiler.end()
+    stages = {stage.stage: stage for stage in profile.stages}
+    print(f"  Stages: {list(stages)}")
+    assert {'squeue', 'sstat', 'sacct', 'parse active', 'parse history'} <= set(stages)
+    assert stages['sacct'].kind == 'command' and stages['sacct'].seconds >= 0.05
+    assert stages['sacct'].bytes > 0
+    assert stages['parse history'].rows == len(snapshot.history) + len(snapshot.steps)
+    assert stages['parse history'].seconds < stages['sacct'].seconds + profile.total
+    assert 'Refresh #1' in profiler.describe()
+
+    profiler.export_json(tmp_path / 'profile.json')
+    profiler.export_csv(tmp_path / 'profile.csv')
+    exported = json.loads((tmp_path / 'profile.json').read_text())
+    assert len(exported) == 1 and len(exported[0]['stages']) == len(profile.stages)
+    with (tmp_path / 'profile.csv').open() as f:
+        rows = list(csv.DictReader(f))
+    assert [row['stage'] for row in rows] == [stage.stage for stage in profile.stages]
+    print("  ✓ Stages recorded and exported")
+
+def test_late_command():
+    """Test that a command is charged to the refresh that started it, and not to parsing."""
+    print("Testing a command outliving its refresh...")
+    cluster = SyntheticCluster([getpass.getuser()], jobs_per_day=2000, clock=lambda: datetime(2025, 3, 3, 12))
+    runner = FakeSlurmRunner(cluster, latency={'sstat': 0.3})
+    collector = RealSlurmDataCollector(use_store=False, runner=runner, sstat_timeout=0.05)
+    profiler = RefreshProfiler()
+    instrument_collector(collector, profiler)
+
+    profiler.begin(['active'])
+    collector.get_active_jobs()
+    first = profiler.end()
+    profiler.begin(['active'])
+    time.sleep(0.4)
+    collector.get_active_jobs()
+    second = profiler.end()
+    stages = [{stage.stage: stage for stage in profile.stages} for profile in (first, second)]
+    print(f"  Stages: {[list(s) for s in stages]}")
+    assert 'sstat' in stages[0] and 'sstat' not in stages[1]
+    # The refresh waited on sstat, but not by parsing
+    assert 0 <= stages[0]['parse active'].seconds < 0.3
+    print("  ✓ Late sstat kept with its own refresh")
+
+async def _run_dashboard():
+    app = Dashboard()
+    async with app.run_test() as pilot:
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+        profile = app.profiler.last
+        assert profile is not None
+        kinds = {stage.stage: stage.kind for stage in profile.stages}
+        print(f"  Stages: {kinds}")
+        assert kinds['update_active_jobs'] == 'render'
+        assert kinds['update_status_plot'] == 'render'
+        assert kinds['parse active'] == 'parse'
+
+        panel = app.query_one("#profiler-panel")
+        assert panel.has_class("hidden")
+        await pilot.press("p")
+        assert not panel.has_class("hidden")
+        assert "Refresh #" in str(panel.render())
+
+def test_dashboard_profiler():
+    """Test that refreshes are profiled and the panel toggles."""
+    print("Testing dashboard profiling...")
+    asyncio.run(_run_dashboard())
+    print("  ✓ Profiler panel shows the last refresh")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test background refresh of the dashboard"""
+
+import asyncio
+import threading
+import time
+from slurmsmac.main import Dashboard
+from textual.widgets import DataTable
+
+async def _run_refresh():
+    app = Dashboard()
+    async with app.run_test() as pilot:
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+
+        status = str(app.query_one("#refresh-status").render())
+        print(f"  Status line: {status}")
+        assert status.startswith("Last updated")
+        assert app.last_updated is not None
+
+        history_table = app.query_one("#history-table", DataTable)
+        print(f"  History rows: {history_table.row_count}")
+        assert history_table.row_count > 0
+
+        # A second refresh while one is in flight is skipped
+        app.scheduler.force()
+        app.refresh_data()
+        worker = app._refresh_worker
+        assert worker.is_running
+        app.refresh_data()
+        assert app._refresh_worker is worker
+        print("  ✓ Overlapping refresh skipped")
+        await app.workers.wait_for_complete()
+
+async def _run_window_change():
+    app = Dashboard()
+    async with app.run_test() as pilot:
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+
+        # Hold collections in sacct until released, recording how many run at once
+        release = threading.Event()
+        running, overlaps, windows = [], [], []
+        get_snapshot = app.data_collector.get_snapshot
+
+        def blocking_snapshot(days=7, **kwargs):
+            running.append(days)
+            overlaps.append(len(running))
+            windows.append(days)
+            release.wait(10)
+            try:
+                return get_snapshot(days=days, **kwargs)
+            finally:
+                running.remove(days)
+        app.data_collector.get_snapshot = blocking_snapshot
+        app.data_collector.rewindow = lambda snapshot, days: None
+
+        app.scheduler.force(['history'])
+        app.refresh_data()
+        while not running:
+            await asyncio.sleep(0.01)
+        # Changing the window cancels the refresh, but its thread is still in sacct
+        app.query_one("#time-filter").value = 30
+        await pilot.pause()
+        assert app._refresh_worker.is_cancelled
+        app.refresh_data()
+        assert windows == [7]
+        print("  ✓ New window waits for the cancelled refresh")
+
+        release.set()
+        deadline = time.monotonic() + 10
+        while (app.snapshot.days != 30 or app.workers) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        print(f"  Windows collected: {windows}")
+        assert windows == [7, 30] and max(overlaps) == 1
+        assert app.snapshot.days == 30
+
+def test_refresh_worker():
+    """Test that data is collected in a worker and applied to the widgets."""
+    print("Testing background refresh...")
+    asyncio.run(_run_refresh())
+    print("  ✓ Refresh applied to widgets")
+
+def test_window_change_during_refresh():
+    """Test that changing the window never runs two collections at once."""
+    print("Testing window change during a refresh...")
+    asyncio.run(_run_window_change())
+
+if __name__ == "__main__":
+    try:
+        test_refresh_worker()
+        test_window_change_during_refresh()
+        print("\n✓ Refresh worker test passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the incrementally maintained history rollups"""
+
+import asyncio
+import getpass
+import math
+from datetime import datetime, timedelta
+from slurmsmac.main import Dashboard
+from slurmsmac.slurm_data import BaseSlurmDataCollector, MockSlurmDataCollector
+from slurmsmac.synthetic import SyntheticCluster
+
+class Clock:
+    """Synthetic time that only moves when told to."""
+    def __init__(self):
+        self.now = datetime(2025, 3, 3, 12, 0, 0)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+class CountingCollector(MockSlurmDataCollector):
+    """Mock collector on a settable clock that counts history queries."""
+    def __init__(self):
+        self.clock = Clock()
+        super().__init__(cluster=SyntheticCluster([getpass.getuser()], jobs_per_day=400, seed=3, clock=self.clock))
+        self.history_calls = 0
+
+    def get_job_history(self, days: int = 7, progress=None):
+        self.history_calls += 1
+        return super().get_job_history(days, progress)
+
+def _assert_same_stats(stats, expected):
+    for key in ('total_jobs', 'active_jobs', 'completed_jobs', 'failed_jobs', 'cancelled_jobs'):
+        assert stats[key] == expected[key], key
+    for key in ('avg_cpu_usage', 'avg_memory_usage', 'avg_mem_eff', 'avg_cpu_eff', 'core_hours',
+                'wasted_core_hours', 'wasted_gb_hours'):
+        assert math.isclose(stats[key], expected[key], rel_tol=1e-9, abs_tol=1e-6) or \
+            (math.isnan(stats[key]) and math.isnan(expected[key])), key
+    assert stats['state_counts'].to_dict() == expected['state_counts'].to_dict()
+    assert (stats['mem_eff_hist'] == expected['mem_eff_hist']).all()
+
+def test_incremental_updates():
+    """Test that rollups updated refresh after refresh match stats computed from scratch."""
+    print("Testing incremental rollups...")
+    collector = CountingCollector()
+    snapshot = None
+    for _ in range(4):
+        snapshot = collector.get_snapshot(days=7, previous=snapshot)
+        expected = BaseSlurmDataCollector.compute_stats(snapshot.active, snapshot.history)
+        _assert_same_stats(snapshot.stats, expected)
+        assert snapshot.stats['total_jobs'] == len(snapshot.active) + len(snapshot.history)
+        collector.clock.now += timedelta(minutes=47)
+    print(f"  {len(collector.rollups)} buckets for {len(snapshot.history)} jobs")
+
+    # Finished jobs are folded in once; refolding the same rows changes nothing
+    buckets = collector.rollups.buckets.copy()
+    collector.rollups.update(snapshot.history, collector.window_start(7), collector.window_start(0))
+    assert collector.rollups.buckets.sort_index().equals(buckets.sort_index())
+    print("  ✓ Same stats as a full recount")
+
+def test_rewindow():
+    """Test that switching to a covered window needs no sacct query."""
+    print("Testing window switches...")
+    collector = CountingCollector()
+    week = collector.get_snapshot(days=7)
+    assert collector.history_calls == 1
+
+    day = collector.rewindow(week, 1)
+    assert collector.history_calls == 1 and day.days == 1
+    fetched = collector.get_snapshot(days=1)
+    assert set(day.history['job_id']) == set(fetched.history['job_id'])
+    assert set(day.steps['job_id']) == set(fetched.steps['job_id'])
+    _assert_same_stats(day.stats, fetched.stats)
+    print("  ✓ Narrower window filtered in memory")
+
+    # Wider windows get their stats now, but keep their rows until history is refreshed
+    wider = collector.rewindow(day, 7)
+    assert wider.days == 1 and len(wider.history) == len(day.history)
+    assert wider.stats['completed_jobs'] == week.stats['completed_jobs']
+    assert collector.rewindow(week, 30) is None
+    print("  ✓ Wider window stats from the rollups")
+
+async def _run_dashboard():
+    app = Dashboard()
+    async with app.run_test(size=(200, 60)) as pilot:
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+        app.data_collector.get_job_history = None  # any sacct query would now fail
+        total = app.snapshot.stats['history_jobs']
+        worker = app._refresh_worker
+        app.query_one("#time-filter").value = 1
+        await pilot.pause()
+        assert app.snapshot.days == 1 and app.snapshot.stats['history_jobs'] <= total
+        assert app._refresh_worker is worker
+        labels = app.query_one("#status-plot").content.columns[0].cells
+        assert "Core-h" in labels
+
+def test_dashboard_time_filter():
+    """Test that narrowing the time filter is answered without a refresh."""
+    print("Testing time filter...")
+    asyncio.run(_run_dashboard())
+    print("  ✓ Time filter answered from the rollups")
+
+if __name__ == "__main__":
+    try:
+        test_incremental_updates()
+        test_rewindow()
+        test_dashboard_time_filter()
+        print("\n✓ Rollup tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the per-source refresh scheduler"""
+
+from slurmsmac.scheduler import RefreshScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_independent_cadences():
+    """Test that sources are due on their own intervals."""
+    print("Testing refresh cadences...")
+
+    clock = FakeClock()
+    scheduler = RefreshScheduler({'active': 10, 'history': 60}, clock=clock)
+    assert scheduler.due() == ['active', 'history']
+    scheduler.record('active', 0.1)
+    scheduler.record('history', 0.5)
+
+    clock.now += 15
+    assert scheduler.due() == ['active']
+    scheduler.record('active', 0.1)
+    clock.now += 50
+    assert scheduler.due() == ['active', 'history']
+    print("  ✓ Independent intervals")
+
+def test_backoff_and_pause():
+    """Test exponential backoff, pausing and manual refresh."""
+    print("Testing backoff and pause...")
+
+    clock = FakeClock()
+    scheduler = RefreshScheduler({'history': 60}, max_backoff=4, clock=clock)
+    scheduler.record('history', 1.0, error='sacct failed')
+    assert scheduler.sources['history'].current_interval == 120
+    scheduler.record('history', 45.0)  # slow
+    assert scheduler.sources['history'].current_interval == 240
+    scheduler.record('history', 40.0, error='sacct failed')
+    assert scheduler.sources['history'].current_interval == 240  # capped
+    scheduler.record('history', 1.0)
+    assert scheduler.sources['history'].current_interval == 60
+    print(f"  {scheduler.describe()}")
+    print("  ✓ Backoff grows, caps and resets")
+
+    scheduler.set_paused('history', True)
+    clock.now += 600
+    assert scheduler.due() == []
+    scheduler.force()
+    assert scheduler.due() == ['history']
+    scheduler.record('history', 1.0)
+    assert scheduler.due() == []
+    print("  ✓ Paused sources only refresh on demand")
+
+def test_slowed_while_hidden():
+    """Test that a source with a paused interval keeps refreshing, less often, while paused."""
+    print("Testing slowed sources...")
+
+    clock = FakeClock()
+    scheduler = RefreshScheduler({'active': 30}, clock=clock, paused_intervals={'active': 120})
+    scheduler.record('active', 0.1)
+    scheduler.set_paused('active', True)
+    clock.now += 60
+    assert scheduler.due() == []
+    clock.now += 60
+    assert scheduler.due() == ['active']
+    scheduler.record('active', 0.1)
+    print(f"  {scheduler.describe()}")
+    assert 'every 120s while hidden' in scheduler.describe()
+    scheduler.set_paused('active', False)
+    clock.now += 30
+    assert scheduler.due() == ['active']
+    print("  ✓ Hidden source refreshed at the slower interval")
+
+if __name__ == "__main__":
+    try:
+        test_independent_cadences()
+        test_backoff_and_pause()
+        test_slowed_while_hidden()
+        print("\n✓ Scheduler tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
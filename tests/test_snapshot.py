@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test single-fetch snapshots"""
+
+from slurmsmac.slurm_data import MockSlurmDataCollector, SlurmSnapshot
+
+class CountingCollector(MockSlurmDataCollector):
+    """Mock collector that counts how often each query runs."""
+    def __init__(self):
+        super().__init__()
+        self.calls = {'active': 0, 'history': 0}
+
+    def get_active_jobs(self):
+        self.calls['active'] += 1
+        return super().get_active_jobs()
+
+    def get_job_history(self, days: int = 7, progress=None):
+        self.calls['history'] += 1
+        return super().get_job_history(days, progress)
+
+def test_snapshot_single_fetch():
+    """Test that a snapshot runs each query exactly once."""
+    print("Testing snapshot collection...")
+
+    collector = CountingCollector()
+    snapshot = collector.get_snapshot(days=30)
+    print(f"  Calls: {collector.calls}")
+    assert isinstance(snapshot, SlurmSnapshot)
+    assert collector.calls == {'active': 1, 'history': 1}
+    assert snapshot.days == 30
+    print("  ✓ One squeue and one sacct per snapshot")
+
+    stats = snapshot.stats
+    print(f"  Stats: {stats}")
+    assert stats['active_jobs'] == len(snapshot.active)
+    assert stats['total_jobs'] == len(snapshot.active) + len(snapshot.history)
+    print("  ✓ Stats derived from the snapshot frames")
+
+if __name__ == "__main__":
+    try:
+        test_snapshot_single_fetch()
+        print("\n✓ Snapshot test passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the synthetic cluster behind mock mode"""
+
+from datetime import datetime, timedelta
+import pandas as pd
+from slurmsmac.parsing import type_active_jobs, type_job_history
+from slurmsmac.synthetic import SyntheticCluster
+
+NOW = datetime(2025, 3, 3, 12, 0, 0)
+
+def test_seeded_and_reproducible():
+    """Test that the same seed and time give the same workload."""
+    print("Testing reproducibility...")
+
+    first = SyntheticCluster(['ann', 'bob'], jobs_per_day=2000, seed=7)
+    second = SyntheticCluster(['ann', 'bob'], jobs_per_day=2000, seed=7)
+    pd.testing.assert_frame_equal(first.job_history(days=2, now=NOW), second.job_history(days=2, now=NOW))
+    pd.testing.assert_frame_equal(first.active_jobs(now=NOW), second.active_jobs(now=NOW))
+
+    other = SyntheticCluster(['ann', 'bob'], jobs_per_day=2000, seed=8)
+    assert not other.job_history(days=2, now=NOW).equals(first.job_history(days=2, now=NOW))
+    print("  ✓ Seeded frames match")
+
+def test_state_evolves_consistently():
+    """Test that jobs move forward through their states between refreshes."""
+    print("Testing state transitions...")
+
+    cluster = SyntheticCluster(['ann'], jobs_per_day=5000, steps=False)
+    before = cluster.job_history(days=1, now=NOW).set_index('job_id')['state']
+    later = cluster.job_history(days=1, now=NOW + timedelta(hours=2)).set_index('job_id')['state']
+    common = before.index.intersection(later.index)
+    order = {'PENDING': 0, 'RUNNING': 1}
+    rank_before = before[common].map(order).fillna(2)
+    rank_later = later[common].map(order).fillna(2)
+    print(f"  {int((rank_later > rank_before).sum())} of {len(common)} jobs advanced")
+    assert (rank_later >= rank_before).all()
+    assert (rank_later > rank_before).any()
+    finished = rank_before == 2
+    assert (before[common][finished] == later[common][finished]).all()
+    print("  ✓ No job moves backwards and final states stick")
+
+def test_arrays_steps_and_units():
+    """Test that the raw output looks like squeue/sacct and parses."""
+    print("Testing synthetic output shape...")
+
+    cluster = SyntheticCluster(['ann', 'bob'], jobs_per_day=3000, seed=1)
+    raw = cluster.job_history(days=1, now=NOW)
+    assert raw['job_id'].str.contains('_').any()
+    assert raw['job_id'].str.endswith('.batch').any()
+    assert raw['job_id'].str.endswith('.extern').any()
+    assert raw['req_mem'].str.endswith('c').any() and raw['req_mem'].str.endswith('n').any()
+    units = raw['max_rss'].str[-1:]
+    assert {'K', 'M', 'G'} <= set(units)
+
+    history = type_job_history(raw)
+    finished_steps = history[history['job_id'].str.contains('.', regex=False)
+                             & history['end'].notna()]
+    assert finished_steps['max_rss'].notna().all()
+    assert history['req_mem'].notna().all()
+    assert history['elapsed'].notna().all()
+
+    active = type_active_jobs(cluster.active_jobs(now=NOW))
+    running = active[active['state'] == 'RUNNING']
+    assert not running.empty and running['used_memory'].notna().all()
+    assert (running['used_memory'] <= running['memory']).all()
+    print("  ✓ Arrays, steps and memory units parse")
+
+def test_scales_to_large_workloads():
+    """Test that the job rate controls the size of the workload."""
+    print("Testing workload size...")
+
+    cluster = SyntheticCluster(['ann', 'bob', 'cat'], jobs_per_day=100_000, steps=False)
+    history = cluster.job_history(days=1, now=NOW)
+    print(f"  {len(history):,} jobs in one day")
+    assert 80_000 < len(history) < 130_000
+    assert history['job_id'].is_unique
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test keyed DataTable reconciliation"""
+
+import asyncio
+from textual.app import App, ComposeResult
+from textual.widgets import DataTable
+from slurmsmac.table_sync import sync_table
+
+COLUMNS = [("job_id", "Job ID"), ("state", "State")]
+
+class TableApp(App):
+    def compose(self) -> ComposeResult:
+        yield DataTable()
+
+async def _run_sync():
+    app = TableApp()
+    async with app.run_test() as pilot:
+        table = app.query_one(DataTable)
+        result = sync_table(table, COLUMNS, [(j, (j, 'RUNNING')) for j in ['1', '2', '3']])
+        print(f"  Initial: {result}")
+        assert result.added == 3
+
+        table.move_cursor(row=2)
+        column_keys = list(table.columns)
+        result = sync_table(table, COLUMNS, [('2', ('2', 'RUNNING')), ('3', ('3', 'COMPLETED')), ('4', ('4', 'PENDING'))])
+        print(f"  Refresh: {result}")
+        assert result == (1, 1, 1)
+        assert list(table.columns) == column_keys
+        assert table.get_row('3') == ['3', 'COMPLETED']
+        # Job 3 stays selected although job 1 above it was removed
+        assert table.ordered_rows[table.cursor_row].key.value == '3'
+
+        result = sync_table(table, COLUMNS, [('2', ('2', 'RUNNING')), ('3', ('3', 'COMPLETED')), ('4', ('4', 'PENDING'))])
+        assert result == (0, 0, 0)
+
+        # New rows, and rows changing places, keep the selected job and the scroll position
+        keys = [str(j) for j in range(200)]
+        sync_table(table, COLUMNS, [(j, (j, 'RUNNING')) for j in keys])
+        table.move_cursor(row=120)
+        await pilot.pause()
+        keys = ['new'] + keys[:100] + keys[100:][::-1]
+        result = sync_table(table, COLUMNS, [(j, (j, 'RUNNING')) for j in keys])
+        print(f"  Reordered: {result}")
+        assert [row.key.value for row in table.ordered_rows] == keys
+        assert table.ordered_rows[table.cursor_row].key.value == '120'
+        assert table.get_row('new') == ['new', 'RUNNING']
+
+        table.move_cursor(row=0)
+        await pilot.pause()
+        table.scroll_to(y=100, animate=False)
+        await pilot.pause()
+        keys = keys[:1] + keys[1:][::-1]
+        sync_table(table, COLUMNS, [(j, (j, 'RUNNING')) for j in keys])
+        await pilot.pause()
+        print(f"  Scrolled to {table.scroll_y} after reordering")
+        assert table.scroll_y == 100
+
+def test_sync_table():
+    """Test that rows are added, updated and removed by key."""
+    print("Testing table reconciliation...")
+    asyncio.run(_run_sync())
+    print("  ✓ Rows reconciled and selection kept")
+
+if __name__ == "__main__":
+    try:
+        test_sync_table()
+        print("\n✓ Table sync test passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
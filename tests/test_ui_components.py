@@ -16,7 +16,7 @@ def test_ui_components():
     print(f"  ✓ Dashboard created")
     print(f"  ✓ Data collector type: {type(app.data_collector).__name__}")
     print(f"  ✓ Is mock mode: {app.is_mock_mode}")
-    print(f"  ✓ Refresh interval: {app.refresh_interval}s")
+    print(f"  ✓ Refresh interval: {app.scheduler.sources['active'].interval}s")
 
     # Test that we can call compose (creates the UI structure)
     print("\n2. Testing compose method...")
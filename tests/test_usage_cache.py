@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the per-job sstat usage cache"""
+
+import getpass
+import time
+from datetime import datetime, timedelta
+from slurmsmac.efficiency import with_active_efficiency
+from slurmsmac.fake_slurm import FakeSlurmRunner
+from slurmsmac.slurm_data import MockSlurmDataCollector, RealSlurmDataCollector
+from slurmsmac.synthetic import SyntheticCluster
+from slurmsmac.usage_cache import UsageCache
+
+SQUEUE = ''.join(f'{job}|job{job}|RUNNING|10:00|node{job}|1|4G|None|ann|lab|normal\n' for job in (41, 42, 43))
+SSTAT = '41.batch|1024K\n42.batch|2048K\n42.0|4096K\n43.extern|8K\n'
+# JobID|MaxRSS|AveRSS|AveCPU|NTasks|MaxDiskRead|MaxDiskWrite
+SSTAT_FULL = '42.batch|2048K|1024K|00:01:00|1|10M|5M\n42.0|4096K|2048K|00:00:30|4|1M|1M\n'
+MIB = 1024 ** 2
+
+def test_ttl_and_eviction():
+    """Test that jobs are handed out once per TTL and evicted when they end."""
+    print("Testing usage cache...")
+    now = [0.0]
+    cache = UsageCache(ttl=30, clock=lambda: now[0])
+    cache.retain(['1', '2'])
+    assert cache.claim(['1', '2']) == ['1', '2']
+    # In flight: not handed out again
+    assert cache.claim(['1', '2']) == []
+    cache.complete(['1', '2'], {'1': (100.0,)})
+    assert cache.values() == {'1': (100.0,)}
+    now[0] = 10
+    assert cache.claim(['1', '2']) == []
+    now[0] = 30
+    assert cache.claim(['1']) == ['1']
+    # A failed fetch keeps the last value and is retried
+    cache.fail(['1'])
+    assert cache.values() == {'1': (100.0,)}
+    assert cache.claim(['1']) == ['1']
+    cache.retain(['2'])
+    cache.complete(['1'], {'1': (200.0,)})
+    assert cache.values() == {} and len(cache) == 0
+    print("  ✓ Expired jobs refetched, ended jobs evicted")
+
+def test_collector_reuses_usage():
+    """Test that sstat only runs for jobs whose usage expired or that just started."""
+    print("Testing cached sstat lookups...")
+    runner = FakeSlurmRunner(recordings={'squeue': SQUEUE, 'sstat': SSTAT})
+    collector = RealSlurmDataCollector(use_store=False, runner=runner)
+    active = collector.get_active_jobs()
+    assert active.set_index('job_id')['used_memory'].to_dict() == {'41': 1024 ** 2, '42': 4 * 1024 ** 2, '43': 8192}
+    collector.get_active_jobs()
+    sstat_calls = [call for call in runner.calls if call[0] == 'sstat']
+    assert len(sstat_calls) == 1
+
+    # Job 41 ended and 44 started: only 44 is queried
+    runner.recordings['squeue'] = SQUEUE.replace('41|job41', '44|job44').replace('node41', 'node44')
+    active = collector.get_active_jobs()
+    sstat_calls = [call for call in runner.calls if call[0] == 'sstat']
+    assert sstat_calls[-1][2] == '44'
+    assert '41' not in collector.usage.values()
+    assert active.set_index('job_id')['used_memory'].isna().to_dict() == {'44': True, '42': False, '43': False}
+    print("  ✓ One sstat per TTL, new jobs only")
+
+def test_step_usage():
+    """Test that the usage of a job's steps is combined into one sample."""
+    print("Testing per-step sstat usage...")
+    runner = FakeSlurmRunner(recordings={'squeue': SQUEUE, 'sstat': SSTAT_FULL})
+    collector = RealSlurmDataCollector(use_store=False, runner=runner)
+    usage = collector.get_active_jobs().set_index('job_id').loc['42']
+    assert usage['used_memory'] == 4 * MIB
+    # Averages are per task, so they are scaled by each step's task count
+    assert usage['ave_rss'] == 9 * MIB and usage['cpu_time'] == 180
+    assert usage['disk_read'] == 11 * MIB and usage['disk_write'] == 6 * MIB
+    print("  ✓ Steps summed, peak memory kept")
+
+def test_live_cpu_rates():
+    """Test that consecutive samples give each running job its current CPU efficiency."""
+    print("Testing live CPU efficiency...")
+    now = [datetime(2025, 3, 3, 12, 0, 0)]
+    cluster = SyntheticCluster([getpass.getuser()], jobs_per_day=4000, seed=3, clock=lambda: now[0])
+    real = RealSlurmDataCollector(use_store=False, runner=FakeSlurmRunner(cluster), usage_ttl=0)
+    real.usage.clock = lambda: now[0].timestamp()
+    mock = MockSlurmDataCollector(cluster=cluster)
+    for collector in (real, mock):
+        first = with_active_efficiency(collector.get_active_jobs())
+        assert first['live_cpu_eff'].isna().all() and not first['idle'].any()
+        now[0] += timedelta(minutes=10)
+        active = with_active_efficiency(collector.get_active_jobs())
+        running = active[active['state'] == 'RUNNING']
+        rated = running['live_cpu_eff'].notna()
+        # Jobs that just started have a single sample so far
+        assert rated.mean() > 0.5 and running.loc[rated, 'live_cpu_eff'].between(0, 1).all()
+        assert running['idle'].any() and not running.loc[~rated, 'idle'].any()
+        assert (running['disk_read'] >= running['disk_write']).all()
+        print(f"  {type(collector).__name__}: {rated.sum()} of {len(running)} rated, {running['idle'].sum()} idle")
+    print("  ✓ CPU rates from consecutive samples")
+
+def test_skipped_sample():
+    """Test that a fetch without a sample for a job leaves the CPU rate's interval to the last sample."""
+    print("Testing a skipped sample...")
+    now = [0.0]
+    cache = UsageCache(ttl=0, clock=lambda: now[0], columns=['used_memory', 'cpu_time'])
+    cache.retain(['1'])
+    cache.complete(cache.claim(['1']), {'1': (1.0, 0.0)})
+    now[0] = 60
+    # The job had no step to report on this time
+    cache.complete(cache.claim(['1']), {})
+    assert cache.values()['1'][:2] == (1.0, 0.0)
+    now[0] = 120
+    cache.complete(cache.claim(['1']), {'1': (1.0, 120.0)})
+    rate = cache.values()['1'][2]
+    print(f"  Rate over both intervals: {rate:.2f} CPU s/s")
+    assert rate == 1.0
+    print("  ✓ Rate measured from the previous sample")
+
+def test_slow_sstat():
+    """Test that a slow sstat runs alongside squeue and falls back to the last known usage."""
+    print("Testing slow sstat...")
+    runner = FakeSlurmRunner(recordings={'squeue': SQUEUE, 'sstat': SSTAT}, latency={'squeue': 0.3, 'sstat': 0.3})
+    collector = RealSlurmDataCollector(use_store=False, runner=runner, usage_ttl=0.2)
+    first = collector.get_active_jobs()
+    time.sleep(0.2)
+    started = time.perf_counter()
+    second = collector.get_active_jobs()
+    elapsed = time.perf_counter() - started
+    print(f"  Refresh with sstat alongside squeue: {elapsed:.2f}s")
+    assert elapsed < 0.5
+    assert second['used_memory'].equals(first['used_memory'])
+
+    runner.latency = {'sstat': 2.0}
+    collector.sstat_timeout = 0.1
+    time.sleep(0.2)
+    started = time.perf_counter()
+    third = collector.get_active_jobs()
+    elapsed = time.perf_counter() - started
+    print(f"  Refresh with a stuck sstat: {elapsed:.2f}s")
+    assert elapsed < 0.5
+    assert third['used_memory'].equals(first['used_memory'])
+    print("  ✓ Slow nodes show the last known usage")
+
+if __name__ == "__main__":
+    try:
+        test_ttl_and_eviction()
+        test_collector_reuses_usage()
+        test_step_usage()
+        test_live_cpu_rates()
+        test_skipped_sample()
+        test_slow_sstat()
+        print("\n✓ Usage cache tests passed!")
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()